@@ -0,0 +1,59 @@
+"""Benchmark the baseline removal methods for speed and beat accuracy.
+
+Times baseline.remove_baseline on synthetic traces of 10^4 to 10^7 samples,
+then reports the total number of beats ECG finds on the bundled test_data
+with each method against the expected total of test_heart_rate.
+
+Usage: python benchmarks/bench_baseline.py [--max-size N]
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../code'))
+from baseline import remove_baseline, METHODS  # noqa: E402
+from heart_rate import ECG  # noqa: E402
+from synthetic import synthetic_ecg  # noqa: E402
+
+EXPECTED_TOTAL_BEATS = 996  # sum of num_beats_actual in test_heart_rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--max-size', type=int, default=10**7)
+    args = parser.parse_args()
+
+    warm_up = synthetic_ecg(1000)
+    for method in METHODS:
+        remove_baseline(warm_up[0], warm_up[1], method)
+
+    print('%10s' % 'samples' + ''.join('%12s' % m for m in METHODS))
+    size = 10**4
+    while size <= args.max_size:
+        t, v, _ = synthetic_ecg(size)
+        row = '%10d' % size
+        for method in METHODS:
+            start = time.perf_counter()
+            try:
+                remove_baseline(t, v, method)
+                row += '%11.3fs' % (time.perf_counter() - start)
+            except Exception as err:
+                row += '%12s' % type(err).__name__
+        print(row)
+        size *= 10
+
+    csv_loc = os.path.join(os.path.dirname(__file__), '../test_data/*.csv')
+    files = [os.path.basename(f) for f in glob.glob(csv_loc)]
+    print('\n%10s %12s %9s' % ('method', 'total beats', 'error'))
+    for method in METHODS:
+        total = sum(ECG(filename=f, baseline=method).num_beats
+                    for f in files)
+        print('%10s %12d %8.2f%%' % (method, total, 100*(
+            total - EXPECTED_TOTAL_BEATS)/EXPECTED_TOTAL_BEATS))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Benchmark detect_peaks against its original implementation.
+
+Compares the mask based suppression against the original O(k**2) loop on
+noisy sinusoids of 10^4 to 10^7 samples. The original loop is only timed
+up to --max-reference samples since it takes minutes beyond that. Then
+compares the whole of detect_peaks, with the single-pass candidate search
+(compiled if Numba is installed), against the original implementation
+with the same suppression, in time and peak memory.
+
+Usage: python benchmarks/bench_detect_peaks.py [--max-reference N]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../code'))
+from detect_peaks import (_detect_peaks_reference,  # noqa: E402
+                          _peak_loop_compiled, _suppress_close_peaks,
+                          _suppress_close_peaks_reference, detect_peaks)
+
+
+def _best_time(func, repeat=3):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _peak_memory(func):
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--max-reference', type=int, default=10**5,
+                        help='largest size the original loop is timed at')
+    parser.add_argument('--mpd', type=float, default=5)
+    args = parser.parse_args()
+
+    rand = np.random.RandomState(0)
+    print('%10s %10s %12s %12s %9s' % ('samples', 'candidates', 'fast (s)',
+                                       'original (s)', 'speedup'))
+    for exponent in range(4, 8):
+        n = 10**exponent
+        x = np.sin(np.linspace(0, n/50, n)) + 0.5*rand.randn(n)
+        ind = detect_peaks(x)
+        fast, fast_ind = _best_time(
+            lambda: _suppress_close_peaks(x, ind, args.mpd, False))
+        if n <= args.max_reference:
+            slow, slow_ind = _best_time(
+                lambda: _suppress_close_peaks_reference(x, ind, args.mpd,
+                                                        False), repeat=1)
+            assert np.array_equal(fast_ind, slow_ind)
+            print('%10d %10d %12.4f %12.4f %8.0fx'
+                  % (n, ind.size, fast, slow, slow/fast))
+        else:
+            print('%10d %10d %12.4f %12s %9s'
+                  % (n, ind.size, fast, 'skipped', '-'))
+
+    print()
+    print('candidate search: %s' % ('numba' if _peak_loop_compiled
+                                    else 'numpy'))
+    print('%10s %12s %12s %9s %12s %12s' % ('samples', 'new (s)',
+                                            'original (s)', 'speedup',
+                                            'new (MB)', 'original (MB)'))
+    for exponent in range(4, 8):
+        n = 10**exponent
+        x = np.sin(np.linspace(0, n/50, n)) + 0.5*rand.randn(n)
+        new, new_ind = _best_time(lambda: detect_peaks(x, mpd=args.mpd))
+        old, old_ind = _best_time(
+            lambda: _detect_peaks_reference(x, mpd=args.mpd))
+        assert np.array_equal(new_ind, old_ind)
+        new_mem = _peak_memory(lambda: detect_peaks(x, mpd=args.mpd))
+        old_mem = _peak_memory(
+            lambda: _detect_peaks_reference(x, mpd=args.mpd))
+        print('%10d %12.4f %12.4f %8.1fx %12.1f %12.1f'
+              % (n, new, old, old/new, new_mem/1e6, old_mem/1e6))
+
+
+if __name__ == '__main__':
+    main()
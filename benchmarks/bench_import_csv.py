@@ -0,0 +1,101 @@
+"""Benchmark CSV ingest on a synthetic trace with sprinkled bad values.
+
+Writes a temporary CSV of --rows rows (10 million by default) in which a
+small fraction of the entries are text or empty, then times
+ecg_io.read_csv against the original per-element float() validation and
+against re-opening the trace from its trace_cache memory map.
+
+Usage: python benchmarks/bench_import_csv.py [--rows N] [--skip-original]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../code'))
+from ecg_io import read_csv  # noqa: E402
+from trace_cache import load_trace  # noqa: E402
+
+
+def write_trace(path, rows, bad_fraction=1e-4, seed=0):
+    '''Writes a synthetic trace with text and empty entries sprinkled in
+    '''
+    rand = np.random.RandomState(seed)
+    time_col = (np.arange(rows)*0.003).round(3).astype(str).astype(object)
+    voltage_col = rand.randn(rows).round(4).astype(str).astype(object)
+    for column in [time_col, voltage_col]:
+        bad = rand.rand(rows) < bad_fraction
+        column[bad] = np.where(rand.rand(bad.sum()) < 0.5, 'bad data', '')
+    pandas.DataFrame({'t': time_col, 'v': voltage_col}).to_csv(
+        path, header=False, index=False)
+
+
+def read_csv_original(path):
+    '''The per-element validation that ECG.import_csv used before ecg_io
+    '''
+    imported_file = pandas.read_csv(path, header=None,
+                                    names=['time', 'voltage'],
+                                    skipinitialspace=True)
+    time_vec = imported_file.time.values
+    voltage_vec = imported_file.voltage.values
+    bad_vals = []
+    if isinstance(time_vec[0], str) or time_vec.dtype == object:
+        for n, i in enumerate(time_vec):
+            try:
+                float(i)
+            except ValueError:
+                bad_vals.append(n)
+        for n, i in enumerate(voltage_vec):
+            try:
+                float(i)
+            except ValueError:
+                bad_vals.append(n)
+    time_vec = np.delete(time_vec, bad_vals)
+    voltage_vec = np.delete(voltage_vec, bad_vals)
+    time_vec = np.ndarray.astype(time_vec, float)
+    voltage_vec = np.ndarray.astype(voltage_vec, float)
+    all_nans = np.vstack((np.argwhere(np.isnan(time_vec)),
+                          np.argwhere(np.isnan(voltage_vec))))
+    return np.delete(time_vec, all_nans), np.delete(voltage_vec, all_nans)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10**7)
+    parser.add_argument('--skip-original', action='store_true')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'trace.csv')
+        write_trace(path, args.rows)
+
+        start = time.perf_counter()
+        time_vec, voltage_vec, dropped = read_csv(path)
+        fast = time.perf_counter() - start
+        print('ecg_io.read_csv: %.2f s, %d rows kept, dropped %s'
+              % (fast, time_vec.size, dropped))
+
+        load_trace(path)
+        start = time.perf_counter()
+        cached = load_trace(path)
+        reopen = time.perf_counter() - start
+        assert np.array_equal(cached[1], voltage_vec)
+        print('cached reopen:   %.4f s' % reopen)
+
+        if not args.skip_original:
+            start = time.perf_counter()
+            original = read_csv_original(path)
+            slow = time.perf_counter() - start
+            assert np.array_equal(original[0], time_vec)
+            assert np.array_equal(original[1], voltage_vec)
+            print('original loop:   %.2f s (%.1fx slower)'
+                  % (slow, slow/fast))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Benchmark multi-lead analysis against one ECG object per lead.
+
+Writes a synthetic recording with --leads leads of --size samples as one
+multi-lead CSV and as one two-column CSV per lead, then times
+MultiLeadECG on the former against an ECG per file on the latter, both
+from parsing to the beats of every lead.
+
+Usage: python benchmarks/bench_multilead.py [--leads N] [--size N]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../code'))
+from heart_rate import ECG  # noqa: E402
+from multilead import MultiLeadECG  # noqa: E402
+from synthetic import synthetic_ecg  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--leads', type=int, default=12)
+    parser.add_argument('--size', type=int, default=10**5)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    leads = []
+    for lead in range(args.leads):
+        t, v, _ = synthetic_ecg(args.size, seed=lead)
+        leads.append(v*(0.5 + lead/args.leads))
+
+    with tempfile.TemporaryDirectory() as scratch:
+        multi_file = os.path.join(scratch, 'multi.csv')
+        np.savetxt(multi_file, np.column_stack([t] + leads), fmt='%.6g',
+                   delimiter=',')
+        lead_files = []
+        for lead, v in enumerate(leads):
+            lead_files.append(os.path.join(scratch, 'lead%d.csv' % lead))
+            np.savetxt(lead_files[-1], np.column_stack((t, v)), fmt='%.6g',
+                       delimiter=',')
+
+        def separate():
+            return [ECG(filename=f).beats for f in lead_files]
+
+        def batched():
+            return MultiLeadECG(multi_file).lead_beats
+
+        timings = {}
+        for name, run in (('separate', separate), ('batched', batched)):
+            best = np.inf
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                beats = run()
+                best = min(best, time.perf_counter() - start)
+            timings[name] = (best, beats)
+
+    same = all(np.array_equal(a, b) for a, b in zip(timings['separate'][1],
+                                                    timings['batched'][1]))
+    print('%d leads of %d samples' % (args.leads, args.size))
+    for name, (seconds, _) in timings.items():
+        print('%10s %9.3f s %9.4f s/lead' % (name, seconds,
+                                             seconds/args.leads))
+    print('speed-up %.2fx, identical lead beats: %s' % (
+        timings['separate'][0]/timings['batched'][0], same))
+
+
+if __name__ == '__main__':
+    main()
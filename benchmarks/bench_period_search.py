@@ -0,0 +1,101 @@
+"""Compare the period search of find_beats with the original retry loop.
+
+For every bundled CSV (and each baseline method) this counts how many full
+peak detections the original while loop ran, times it against
+autocorrelation.estimate_period followed by the single final detection,
+and checks that both give the same beats. Times are the best of three
+runs. A ten minute synthetic trace with a strong respiratory amplitude
+modulation shows a case where the original loop needs many retries.
+
+Usage: python benchmarks/bench_period_search.py
+"""
+
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../code'))
+from autocorrelation import autocorrelate, estimate_period  # noqa: E402
+from baseline import remove_baseline  # noqa: E402
+from detect_peaks import detect_peaks  # noqa: E402
+from heart_rate import ECG  # noqa: E402
+from synthetic import synthetic_ecg  # noqa: E402
+
+
+def _best_time(func, repeat=3):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def original_search(auto_corr, duration):
+    '''The retry loop find_beats used before estimate_period
+    '''
+    pre_peak_index = detect_peaks(auto_corr, mpd=5, mph=0)
+    sorted_auto_corr = sorted(auto_corr[pre_peak_index])
+    beat_ind = np.asarray([0])
+    index = -1
+    iterations = 0
+    while (beat_ind.size/duration < 0.3):
+        first_dist = np.where(auto_corr == sorted_auto_corr[index])[0][0]
+        beat_ind = detect_peaks(np.insert(auto_corr, 0, 0),
+                                mpd=0.8*first_dist, mph=0) - 1
+        index = index - 1
+        iterations += 1
+    return beat_ind, iterations
+
+
+def single_pass_search(auto_corr, duration):
+    pre_peak_index = detect_peaks(auto_corr, mpd=5, mph=0)
+    first_dist = estimate_period(auto_corr, pre_peak_index, duration)
+    return detect_peaks(np.insert(auto_corr, 0, 0), mpd=0.8*first_dist,
+                        mph=0) - 1
+
+
+def main():
+    csv_loc = os.path.join(os.path.dirname(__file__), '../test_data/*.csv')
+    files = sorted(os.path.basename(f) for f in glob.glob(csv_loc))
+    for method in ['polyfit', 'median', 'highpass']:
+        print('baseline=%s' % method)
+        print('%18s %10s %12s %12s %6s' % ('file', 'iterations',
+                                           'original (s)', 'single (s)',
+                                           'same'))
+        total_old = total_new = 0
+        for filename in files:
+            ecg = ECG(filename=filename, baseline=method)
+            voltage = remove_baseline(ecg.time, ecg.voltage, method)
+            auto_corr = autocorrelate(voltage - np.mean(voltage))
+
+            old_time, (old, iterations) = _best_time(
+                lambda: original_search(auto_corr, ecg.duration))
+            new_time, new = _best_time(
+                lambda: single_pass_search(auto_corr, ecg.duration))
+
+            total_old += old_time
+            total_new += new_time
+            print('%18s %10d %12.4f %12.4f %6s'
+                  % (filename, iterations, old_time, new_time,
+                     np.array_equal(old, new)))
+        print('%18s %10s %12.4f %12.4f\n' % ('total', '', total_old,
+                                             total_new))
+
+    t, v, _ = synthetic_ecg(360*600, noise=0.3, drift=0)
+    v = v*(1 + 0.8*np.sin(2*np.pi*t/7.0))
+    auto_corr = autocorrelate(v - np.mean(v))
+    old_time, (old, iterations) = _best_time(
+        lambda: original_search(auto_corr, t[-1] - t[0]))
+    new_time, new = _best_time(
+        lambda: single_pass_search(auto_corr, t[-1] - t[0]))
+    print('%18s %10d %12.4f %12.4f %6s' % ('modulated 10 min', iterations,
+                                           old_time, new_time,
+                                           np.array_equal(old, new)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Benchmark beat finding on resampled traces.
+
+Times ECG beat finding on a synthetic 360 Hz trace as imported, through
+the uniform pass-through, and decimated to lower rates, and checks is_uniform
+and the pass-through on a uniform and a jittered copy of the time axis.
+
+Usage: python benchmarks/bench_resample.py [--size N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../code'))
+from heart_rate import ECG  # noqa: E402
+from resample import is_uniform, resample  # noqa: E402
+from synthetic import synthetic_ecg  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=10**6)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    t, v, _ = synthetic_ecg(args.size)
+    jittered = t + np.random.default_rng(0).uniform(-0.49, 0.49, t.size)/360
+
+    for name, times in (('uniform', t), ('jittered', jittered)):
+        start = time.perf_counter()
+        uniform = is_uniform(times)
+        check = time.perf_counter() - start
+        start = time.perf_counter()
+        new_time, _ = resample(times, v)
+        print('%8s time axis: is_uniform %s in %.4f s, resample %.4f s, '
+              'copied: %s' % (name, uniform, check,
+                              time.perf_counter() - start,
+                              new_time is not times))
+
+    print('%d samples at 360 Hz' % args.size)
+    reference = None
+    for rate in (None, 'uniform', 180, 120, 90):
+        best = np.inf
+        for _ in range(args.repeat):
+            ecg = ECG.from_arrays(t, v, resample_rate=rate)
+            start = time.perf_counter()
+            beats = ecg.beats
+            best = min(best, time.perf_counter() - start)
+        if reference is None:
+            reference = beats
+        print('%10s %9.3f s %6d beats, %.4f s largest beat shift' % (
+            rate, best, beats.size,
+            np.max(np.abs(beats - reference)) if beats.size == reference.size
+            else np.nan))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Benchmark segmented beat finding against the whole-trace search.
+
+Builds a synthetic recording whose heart rate steps from 60 to 110 bpm
+halfway, then compares ECG beat finding on the whole trace with the
+segmented search, serially and in a process pool: time, peak traced
+memory and the number of beats against the number of spikes. The memory
+of the pool run is that of the calling process only.
+
+Usage: python benchmarks/bench_segmented.py [--minutes N] [--workers N]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../code'))
+from heart_rate import ECG  # noqa: E402
+from synthetic import synthetic_ecg  # noqa: E402
+
+RATE = 360.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--minutes', type=float, default=60)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    half = int(args.minutes*30*RATE)
+    t1, v1, _ = synthetic_ecg(half, heart_rate=60, seed=1)
+    t2, v2, _ = synthetic_ecg(half, heart_rate=110, seed=2)
+    t = np.concatenate((t1, t2 + t1[-1] + 1/RATE))
+    v = np.concatenate((v1, v2))
+    spikes = np.ceil(t1[-1]*60/60) + np.ceil(t2[-1]*110/60)
+
+    print('%d samples, %d spikes' % (t.size, spikes))
+    for name, segment in (('whole', None), ('segmented', 20),
+                          ('pool', {'workers': args.workers})):
+        ecg = ECG.from_arrays(t, v, segment=segment)
+        tracemalloc.start()
+        start = time.perf_counter()
+        beats = ecg.beats
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print('%10s %8.3f s %8.1f MB %7d beats' % (name, seconds, peak/1e6,
+                                                   beats.size))
+
+
+if __name__ == '__main__':
+    main()
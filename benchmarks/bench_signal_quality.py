@@ -0,0 +1,62 @@
+"""Benchmark the fused signal statistics against separate array passes.
+
+Times signal_quality.signal_stats, which also checks the sampling and
+clipping, against the passes it replaces in ECG: np.amin and np.amax for
+the voltage extremes, and np.mean followed by the builtin sum of the
+squared deviations for the autocorrelation norm. The mean and energy alone
+are timed as well, since find_beats computes them from the baseline-free
+voltage with signal_quality.mean_energy.
+
+Usage: python benchmarks/bench_signal_quality.py [--max-size N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../code'))
+from signal_quality import mean_energy, signal_stats  # noqa: E402
+from synthetic import synthetic_ecg  # noqa: E402
+
+
+def separate(t, v):
+    extremes = (np.amin(v), np.amax(v))
+    unbias = v - np.mean(v)
+    return extremes, sum(unbias**2)
+
+
+def best_of(run, repeat):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--max-size', type=int, default=10**7)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print('%10s %12s %12s %12s' % ('samples', 'separate', 'stats',
+                                   'mean_energy'))
+    size = 10**4
+    while size <= args.max_size:
+        t, v, _ = synthetic_ecg(size)
+        stats = signal_stats(t, v)
+        energy = separate(t, v)[1]
+        assert np.isclose(stats['voltage_energy'], energy)
+        print('%10d %10.4f s %10.4f s %10.4f s' % (
+            size, best_of(lambda: separate(t, v), args.repeat),
+            best_of(lambda: signal_stats(t, v), args.repeat),
+            best_of(lambda: mean_energy(v), args.repeat)))
+        size *= 10
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Benchmark a parameter sweep against one analysis per grid point.
+
+Runs a grid of beat detection parameters over the bundled recordings,
+once with sweep.sweep, which shares the import, baselines,
+autocorrelations and candidate peaks between grid points, and once
+importing and analyzing every recording from scratch for every point.
+
+Usage: python benchmarks/bench_sweep.py [--files N] [--repeat N]
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../code'))
+from sweep import parameter_grid, sweep, sweep_recording  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    pattern = os.path.join(os.path.dirname(__file__), '../test_data/*.csv')
+    paths = sorted(glob.glob(pattern))[:args.files]
+    points = parameter_grid(degree=(5, 7, 9), mpd=(3, 5, 8), mph=(0, 0.1),
+                            min_rate=(0.2, 0.3))
+
+    def separate():
+        return [row for path in paths for point in points
+                for row in sweep_recording(path, [point])]
+
+    def shared():
+        return sweep(paths, points, workers=1)
+
+    timings = {}
+    for name, run in (('separate', separate), ('shared', shared)):
+        best = np.inf
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            rows = run()
+            best = min(best, time.perf_counter() - start)
+        timings[name] = (best, rows)
+
+    print('%d recordings x %d parameter points' % (len(paths), len(points)))
+    for name, (seconds, _) in timings.items():
+        print('%10s %9.3f s %9.5f s/point' % (
+            name, seconds, seconds/(len(paths)*len(points))))
+    print('speed-up %.1fx, identical results: %s' % (
+        timings['separate'][0]/timings['shared'][0],
+        timings['separate'][1] == timings['shared'][1]))
+
+
+if __name__ == '__main__':
+    main()
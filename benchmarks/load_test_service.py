@@ -0,0 +1,107 @@
+"""Load test of the ECG analysis service on the bundled test_data files.
+
+Starts the service in-process (or targets a running one with --port) and
+sends --requests analysis requests, --concurrency at a time, alternating
+between requests by path and CSV uploads. While the load runs, /health is
+polled to check that the event loop keeps answering. Reports throughput,
+latency percentiles and the count of every HTTP status; 503 responses are
+the backpressure of the service.
+
+Usage: python benchmarks/load_test_service.py [--requests N]
+           [--concurrency N] [--workers N] [--max-pending N] [--port N]
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../code'))
+from service import AnalysisService, fetch  # noqa: E402
+
+
+async def load(args, port):
+    csv_loc = os.path.join(os.path.dirname(__file__), '../test_data/*.csv')
+    files = sorted(glob.glob(csv_loc))
+    uploads = []
+    for path in files:
+        with open(path, 'rb') as fp:
+            uploads.append(fp.read())
+
+    limit = asyncio.Semaphore(args.concurrency)
+    latencies = []
+    statuses = Counter()
+
+    async def one(i):
+        if i % 2:
+            body, content_type = uploads[i % len(files)], 'text/csv'
+        else:
+            body = json.dumps({'path': os.path.basename(
+                files[i % len(files)])}).encode()
+            content_type = 'application/json'
+        async with limit:
+            start = time.perf_counter()
+            status, _ = await fetch('POST', '/analyze', body, port=port,
+                                    content_type=content_type)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] += 1
+
+    health = []
+    done = asyncio.Event()
+
+    async def poll():
+        while not done.is_set():
+            start = time.perf_counter()
+            await fetch('GET', '/health', port=port)
+            health.append(time.perf_counter() - start)
+            await asyncio.sleep(0.05)
+
+    poller = asyncio.ensure_future(poll())
+    start = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(args.requests)])
+    elapsed = time.perf_counter() - start
+    done.set()
+    await poller
+
+    latencies = np.array(latencies)
+    print('%d requests, concurrency %d: %.2f s, %.1f requests/s' % (
+        args.requests, args.concurrency, elapsed, args.requests/elapsed))
+    print('latency p50 %.3f s, p95 %.3f s, max %.3f s' % tuple(
+        np.percentile(latencies, [50, 95, 100])))
+    print('statuses: %s' % dict(sorted(statuses.items())))
+    print('/health during load: max %.4f s over %d polls' % (
+        max(health), len(health)))
+
+
+async def main_async(args):
+    if args.port:
+        await load(args, args.port)
+        return
+    service = AnalysisService(workers=args.workers,
+                              max_pending=args.max_pending)
+    server = await service.start(port=0)
+    try:
+        await load(args, server.sockets[0].getsockname()[1])
+    finally:
+        await service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--max-pending', type=int, default=64)
+    parser.add_argument('--port', type=int, default=None,
+                        help='port of a running service to test instead')
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""Per-stage timing and memory benchmarks of the ECG pipeline.
+
+Each stage (CSV import, baseline removal, autocorrelation, peak detection
+and JSON export) is timed and memory-profiled on its own, on the bundled
+test_data files and on synthetic traces of 10^4 up to --max-size samples.
+Times are the best of --repeat runs; peak memory is the largest traced
+allocation (tracemalloc) during a separate run of the stage.
+
+The results are written as JSON. Given a --baseline results file, the run
+fails (exit status 1) when a stage got slower or used more memory than the
+baseline by more than the thresholds.
+
+Usage:
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --baseline results.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../code'))
+from autocorrelation import autocorrelate  # noqa: E402
+from baseline import remove_baseline  # noqa: E402
+from detect_peaks import detect_peaks  # noqa: E402
+from ecg_io import read_csv  # noqa: E402
+from heart_rate import ECG  # noqa: E402
+from synthetic import synthetic_ecg  # noqa: E402
+
+
+class Recording:
+    '''One input of the benchmark with the intermediates of every stage
+    precomputed, so that each stage can be measured on its own
+    '''
+    def __init__(self, path, scratch):
+        self.path = path
+        self.scratch = scratch
+        self.time, self.voltage, _ = read_csv(path)
+        detrended = remove_baseline(self.time, self.voltage)
+        self.unbias = detrended - np.mean(detrended)
+        self.auto_corr = autocorrelate(self.unbias)
+        self.ecg = ECG(filename=os.path.abspath(path))
+        self.ecg.num_beats  # computes the beats outside of the stages
+
+
+STAGES = {
+    'import_csv': lambda rec: read_csv(rec.path),
+    'baseline_polyfit': lambda rec: remove_baseline(rec.time, rec.voltage,
+                                                    'polyfit'),
+    'baseline_median': lambda rec: remove_baseline(rec.time, rec.voltage,
+                                                   'median'),
+    'autocorrelation': lambda rec: autocorrelate(rec.unbias),
+    'detect_peaks': lambda rec: detect_peaks(rec.auto_corr, mpd=5, mph=0),
+    'export_json': lambda rec: rec.ecg.export_json(
+        path=os.path.join(rec.scratch, 'export.json')),
+    'export_json_stream': lambda rec: rec.ecg.export_json(
+        mode='stream', path=os.path.join(rec.scratch, 'export.json')),
+}
+
+
+def measure(stage, recordings, repeat):
+    '''Best wall time and peak traced memory of a stage over recordings
+
+    :return result (dict): 'seconds' and 'peak_bytes'
+    '''
+    def run():
+        for recording in recordings:
+            STAGES[stage](recording)
+
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'seconds': best, 'peak_bytes': peak}
+
+
+def build_inputs(scratch, max_size):
+    '''Bundled recordings plus synthetic CSVs of growing size
+
+    :return inputs (dict): input name to list of Recording
+    '''
+    csv_loc = os.path.join(os.path.dirname(__file__), '../test_data/*.csv')
+    inputs = {'bundled': [Recording(path, scratch)
+                          for path in sorted(glob.glob(csv_loc))]}
+    size = 10**4
+    while size <= max_size:
+        path = os.path.join(scratch, 'synthetic_%d.csv' % size)
+        t, v, _ = synthetic_ecg(size)
+        np.savetxt(path, np.column_stack((t, v)), fmt='%.6g', delimiter=',')
+        inputs['synthetic_%d' % size] = [Recording(path, scratch)]
+        size *= 10
+    return inputs
+
+
+def compare(results, baseline, time_threshold, memory_threshold):
+    '''Lists the measurements that regressed against a baseline
+
+    Differences below 1 ms or 64 KiB are ignored as noise.
+
+    :return regressions (list): human readable descriptions
+    '''
+    regressions = []
+    for key, result in sorted(results.items()):
+        if key not in baseline:
+            continue
+        old = baseline[key]
+        if (result['seconds'] > old['seconds']*(1 + time_threshold) and
+                result['seconds'] - old['seconds'] > 1e-3):
+            regressions.append('%s: %.4f s -> %.4f s' % (
+                key, old['seconds'], result['seconds']))
+        if (result['peak_bytes'] > old['peak_bytes']*(1 + memory_threshold)
+                and result['peak_bytes'] - old['peak_bytes'] > 65536):
+            regressions.append('%s: %d B -> %d B peak' % (
+                key, old['peak_bytes'], result['peak_bytes']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Per-stage benchmarks of the ECG pipeline')
+    parser.add_argument('--max-size', type=int, default=10**7,
+                        help='largest synthetic trace, in samples')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--stages', nargs='+', default=list(STAGES),
+                        choices=list(STAGES))
+    parser.add_argument('--output', help='JSON file for the results')
+    parser.add_argument('--baseline', help='results JSON to compare to')
+    parser.add_argument('--time-threshold', type=float, default=0.25,
+                        help='allowed relative slowdown (default: 0.25)')
+    parser.add_argument('--memory-threshold', type=float, default=0.10,
+                        help='allowed relative memory growth (default: 0.1)')
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        inputs = build_inputs(scratch, args.max_size)
+        print('%-22s %-20s %12s %14s' % ('stage', 'input', 'seconds',
+                                         'peak bytes'))
+        for stage in args.stages:
+            for name, recordings in inputs.items():
+                result = measure(stage, recordings, args.repeat)
+                results['%s@%s' % (stage, name)] = result
+                print('%-22s %-20s %12.4f %14d' % (
+                    stage, name, result['seconds'], result['peak_bytes']))
+
+    if args.output:
+        report = {'python': platform.python_version(),
+                  'numpy': np.__version__,
+                  'machine': platform.machine(),
+                  'results': results}
+        with open(args.output, 'w') as fp:
+            json.dump(report, fp, indent=4, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as fp:
+            baseline = json.load(fp)['results']
+        regressions = compare(results, baseline, args.time_threshold,
+                              args.memory_threshold)
+        for regression in regressions:
+            print('REGRESSION ' + regression)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,32 @@
+"""Synthetic ECG-like traces for the benchmarks."""
+
+import numpy as np
+
+
+def synthetic_ecg(num_samples, sampling_rate=360.0, heart_rate=75.0,
+                  drift=0.5, noise=0.02, seed=0):
+    '''Builds a trace of Gaussian QRS-like spikes on a wandering baseline
+
+    :param num_samples (int): trace length
+    :param sampling_rate (float, default=360.0): samples per second
+    :param heart_rate (float, default=75.0): beats per minute
+    :param drift (float, default=0.5): amplitude of the slow baseline
+        wander, in the units of the spikes
+    :param noise (float, default=0.02): standard deviation of white noise
+    :param seed (int, default=0): random seed
+    :return time (numpy array): sampled times in seconds
+    :return voltage (numpy array): sampled voltages
+    :return beats (numpy array): true beat times
+    '''
+    rand = np.random.RandomState(seed)
+    time = np.arange(num_samples)/sampling_rate
+    period = 60.0/heart_rate
+    beats = np.arange(period/2, time[-1], period)
+    beats = beats + 0.02*period*rand.randn(beats.size)
+
+    phase = (time + period/2) % period - period/2
+    voltage = np.exp(-0.5*(phase/0.012)**2)
+    voltage -= 0.15*np.exp(-0.5*((phase - 0.25*period)/0.04)**2)
+    voltage += drift*np.sin(2*np.pi*0.05*time + rand.rand()*2*np.pi)
+    voltage += noise*rand.randn(num_samples)
+    return time, voltage, beats
@@ -0,0 +1,195 @@
+"""Autocorrelation backends used for the beat detection in heart_rate."""
+
+import numpy as np
+
+METHODS = ('fft', 'direct')
+
+
+def autocorrelate(x, method='fft', max_lag=None, norm=None, axis=-1):
+    '''Finds the normalized autocorrelation of a signal at non-negative lags
+
+    :param x (array): signal to correlate, should already be mean-removed.
+        Multi-dimensional arrays hold one signal per 1-D slice along axis,
+        which the 'fft' method transforms in one batch. float32 signals are
+        transformed in single precision
+    :param method (str, default='fft'): 'fft' uses the Wiener-Khinchin
+        theorem on a zero-padded transform of fast length, O(n log n).
+        'direct' is the reference time-domain method, O(n*n) for all lags
+    :param max_lag (int, default=None): largest lag (in samples) to compute.
+        None computes every lag up to len(x) - 1. Limiting the lag also
+        shortens the transform length of the 'fft' method. Suits period
+        estimates only, as in streaming: ECG.find_beats needs every lag,
+        since its beats are the autocorrelation peaks
+    :param norm (float or array, default=None): value the correlation is
+        divided by. By default the energy of each signal, so that lag 0
+        equals 1
+    :param axis (int, default=-1): axis along which x is sampled
+    :return auto_corr (numpy array): autocorrelation at lags 0 to max_lag
+        along axis
+    '''
+    x = np.asarray(x)
+    if not np.issubdtype(x.dtype, np.floating):
+        x = x.astype(float)
+    if x.ndim > 1:
+        x = np.moveaxis(x, axis, -1)
+    n = x.shape[-1]
+    if max_lag is None or max_lag > n - 1:
+        max_lag = n - 1
+    max_lag = int(max_lag)
+    if norm is None and x.ndim == 1:
+        norm = np.dot(x, x)
+    elif norm is None:
+        norm = np.einsum('...i,...i->...', x, x)[..., None]
+
+    if method == 'fft':
+        nfft = _next_fast_len(n + max_lag)
+        spectrum = np.fft.rfft(x, nfft)
+        _power_in_place(spectrum)
+        auto_corr = np.fft.irfft(spectrum, nfft)[..., :max_lag + 1]
+        del spectrum
+    elif method == 'direct':
+        if x.ndim > 1:
+            auto_corr = np.array([autocorrelate(row, 'direct', max_lag, 1)
+                                  for row in x.reshape(-1, n)])
+            auto_corr = auto_corr.reshape(x.shape[:-1] + (max_lag + 1,))
+        elif max_lag == n - 1:
+            auto_corr = np.correlate(x, x, mode='full')[n - 1:]
+        else:
+            auto_corr = np.array([np.dot(x[:n - k], x[k:])
+                                  for k in range(max_lag + 1)])
+    else:
+        raise ValueError('Unknown autocorrelation method: %s' % method)
+
+    auto_corr = auto_corr/norm
+    if auto_corr.ndim > 1:
+        auto_corr = np.moveaxis(auto_corr, -1, axis)
+    return auto_corr
+
+
+def _power_in_place(spectrum, block_size=65536):
+    '''Replaces a spectrum by its power, block by block so that the
+    temporaries stay small. Single precision spectra of float32 signals
+    stay in single precision
+    '''
+    for start in range(0, spectrum.shape[-1], block_size):
+        block = spectrum[..., start:start + block_size]
+        block *= block.conj()
+
+
+def cross_correlate(template, x):
+    '''Correlates a short template against a longer signal with FFTs
+
+    :param template (array): reference segment, e.g. the start of a trace
+    :param x (array): signal to search
+    :return correlation (numpy array): sum over t of template[t]*x[t + k]
+        at lags k = 0 to len(x) - 1, x being zero beyond its end
+    '''
+    template = np.asarray(template, dtype=float)
+    x = np.asarray(x, dtype=float)
+    nfft = _next_fast_len(x.size + template.size - 1)
+    spectrum = np.fft.rfft(x, nfft)*np.conj(np.fft.rfft(template, nfft))
+    return np.fft.irfft(spectrum, nfft)[:x.size]
+
+
+def estimate_period(auto_corr, candidates, duration, min_rate=0.3):
+    '''Picks the beat period from the peaks of an autocorrelation
+
+    The period is the lag of the highest candidate peak that still yields at
+    least min_rate beats per second once peaks closer than 0.8 periods are
+    suppressed. The candidates are ranked once, and the number of beats a
+    lag yields is predicted by suppressing the candidate set itself, with a
+    mask over the candidates, rather than by peak detection on the whole
+    autocorrelation. The highest candidates are tried first, as the
+    period usually is one of them. Otherwise, since the number of beats
+    falls as the lag grows, the longest acceptable lag is found by a binary
+    search. The cost is O(k log(k)**2) in the number of candidates k,
+    independent of the length of the autocorrelation
+
+    :param auto_corr (array): autocorrelation at lags 0, 1, 2...
+    :param candidates (array): lags of the autocorrelation peaks,
+        increasing as detect_peaks returns them
+    :param duration (float): duration of the trace, to convert the number
+        of beats to a rate
+    :param min_rate (float, default=0.3): lowest acceptable number of beats
+        per second
+    :return period (int): lag of the beat period, None without candidates
+    '''
+    candidates = np.asarray(candidates, dtype=int)
+    if candidates.size == 0:
+        return None
+    # highest first, ties broken by the shortest lag
+    ranked = candidates[np.lexsort((candidates, -auto_corr[candidates]))]
+    with_origin = np.concatenate(([0], candidates))
+    # visiting order of the suppression in detect_peaks
+    order = np.argsort(auto_corr[with_origin])[::-1]
+    # counting can stop once the rate is met, with a margin for rounding
+    stop = int(np.ceil(min_rate*duration)) + 1
+
+    def acceptable(lag):
+        beats = _count_beats(with_origin, order, 0.8*lag, stop)
+        return beats/duration >= min_rate
+
+    # as many of the highest candidates as the binary search would probe,
+    # which usually include the period
+    for lag in ranked[:int(np.log2(ranked.size)) + 1]:
+        if acceptable(lag):
+            return lag
+    lags = candidates
+    low, high = 0, lags.size  # lags[:low] are acceptable, lags[high:] not
+    while low < high:
+        middle = (low + high)//2
+        if acceptable(lags[middle]):
+            low = middle + 1
+        else:
+            high = middle
+    if low == 0:
+        return lags[0]
+    longest = lags[low - 1]
+    return ranked[np.argmax(ranked <= longest)]
+
+
+def _count_beats(peaks, order, mpd, stop):
+    '''Number of increasing peaks, visited in order, that the suppression
+    of detect_peaks keeps at minimum peak distance mpd, counting up to
+    stop. The mask and the bounds of the peaks each peak blocks are over
+    the peaks rather than the samples
+    '''
+    width = int(np.floor(mpd))
+    low = np.searchsorted(peaks, peaks - width)
+    high = np.searchsorted(peaks, peaks + width, side='right')
+    blocked = np.zeros(peaks.size, dtype=bool)
+    count = 0
+    for i in order:
+        if not blocked[i]:
+            count += 1
+            if count >= stop:
+                break
+            blocked[low[i]:high[i]] = True
+    return count
+
+
+def _next_fast_len(target):
+    '''Smallest transform length >= target that pocketfft handles quickly,
+    the same 5-smooth length (2**a * 3**b * 5**c) as scipy.fft.next_fast_len
+    for real input, without importing scipy
+
+    :param target (int): minimum transform length
+    :return length (int): 5-smooth transform length
+    '''
+    target = int(target)
+    if target <= 6:
+        return max(target, 1)
+    best = 1 << (target - 1).bit_length()
+    power5 = 1
+    while power5 < best:
+        power35 = power5
+        while power35 < best:
+            # smallest power of two bringing power35 up to the target
+            quotient = -(-target//power35)
+            length = (1 << (quotient - 1).bit_length())*power35
+            if length == target:
+                return length
+            best = min(best, length)
+            power35 *= 3
+        power5 *= 5
+    return best
@@ -0,0 +1,213 @@
+"""Baseline (drift) removal for ECG traces."""
+
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+METHODS = ('polyfit', 'median', 'highpass', 'none')
+
+
+def remove_baseline(time, voltage, method='polyfit', out=None, units='sec',
+                    **options):
+    '''Removes the slowly wandering baseline of an ECG trace
+
+    :param time (array): sampled times of the trace
+    :param voltage (array): sampled voltages of the trace, or a 2-D array
+        with the voltages of one lead per row, which the built-in methods
+        process in one batch
+    :param method (str or callable, default='polyfit'): estimator of the
+        baseline. 'polyfit' fits one polynomial to the whole trace,
+        'median' takes a running median of block medians, 'highpass'
+        applies a zero-phase Butterworth filter and 'none' keeps the trace.
+        A callable is called as method(time, voltage, **options) and
+        should return the baseline
+    :param out (array, default=None): array the result is written into,
+        which may be voltage itself, e.g. a float32 scratch buffer. The
+        'polyfit' and 'median' baselines are then subtracted chunk by chunk
+        without full-length float64 temporaries, see subtract_polyfit
+    :param units (str, default='sec'): time units, 'sec' or 'min', which
+        the 'median' and 'highpass' methods convert their lengths and
+        cutoff in seconds to
+    :param options: keyword arguments of the estimator, see polyfit_baseline,
+        median_baseline and highpass_signal
+    :return voltage (numpy array): trace with the baseline subtracted
+    '''
+    if out is not None:
+        return _remove_baseline_into(time, voltage, method, out, units,
+                                     **options)
+    if callable(method):
+        return voltage - method(time, voltage, **options)
+    if method == 'polyfit':
+        return voltage - polyfit_baseline(time, voltage, **options)
+    if method == 'median':
+        return voltage - median_baseline(time, voltage, units=units,
+                                         **options)
+    if method == 'highpass':
+        return highpass_signal(time, voltage, units=units, **options)
+    if method == 'none':
+        return voltage
+    raise ValueError('Unknown baseline method: %s' % method)
+
+
+def _remove_baseline_into(time, voltage, method, out, units, **options):
+    if method == 'polyfit':
+        return subtract_polyfit(time, voltage, out, **options)
+    if method == 'median':
+        centres, smooth = _median_knots(time, voltage, units=units,
+                                        **options)
+        for start, stop in _chunks(len(out)):
+            out[start:stop] = voltage[start:stop] - \
+                np.interp(time[start:stop], centres, smooth)
+        return out
+    if method == 'none':
+        np.copyto(out, voltage)
+        return out
+    out[...] = remove_baseline(time, voltage, method, units=units,
+                               **options)
+    return out
+
+
+def _chunks(size, chunk_size=65536):
+    for start in range(0, size, chunk_size):
+        yield start, min(start + chunk_size, size)
+
+
+def polyfit_baseline(time, voltage, degree=7):
+    '''Baseline from a single polynomial fit over the whole trace. Builds
+    an n by (degree+1) Vandermonde matrix and cannot follow long drifts.
+    The leads of 2-D voltages share that matrix and are fitted together
+
+    :param degree (int, default=7): polynomial degree
+    :return baseline (numpy array): fitted baseline, zero if the fit failed
+    '''
+    voltage = np.asarray(voltage)
+    try:
+        baseline_coeffs = np.polyfit(time, voltage.T, degree)
+    except np.linalg.LinAlgError:
+        print('Could not remove baseline drift (if it exists)')
+        logger.warning('Could not remove baseline drift')
+        return np.zeros_like(voltage)
+    if voltage.ndim == 1:
+        return np.polyval(baseline_coeffs, time)
+    return np.polyval(baseline_coeffs, np.asarray(time)[:, None]).T
+
+
+def subtract_polyfit(time, voltage, out, degree=7, chunk_size=65536):
+    '''Fits and subtracts a polynomial baseline using memory independent
+    of the trace length. The fit is a least-squares fit in the Chebyshev
+    basis over the time span scaled to [-1, 1], whose normal equations are
+    well conditioned and accumulated chunk by chunk in float64. It equals
+    polyfit_baseline up to rounding
+
+    :param out (array): 1-D array the result is written into, may be
+        voltage itself
+    :param degree (int, default=7): polynomial degree
+    :param chunk_size (int, default=65536): samples processed at once
+    :return out (array): the trace with the baseline subtracted
+    '''
+    from numpy.polynomial.chebyshev import chebvander
+
+    time = np.asarray(time)
+    centre = (time[0] + time[-1])/2
+    scale = 2/(time[-1] - time[0]) if time[-1] != time[0] else 1.0
+    gram = np.zeros((degree + 1, degree + 1))
+    moments = np.zeros(degree + 1)
+    for start, stop in _chunks(time.size, chunk_size):
+        basis = chebvander((time[start:stop] - centre)*scale, degree)
+        gram += basis.T @ basis
+        moments += basis.T @ voltage[start:stop]
+    try:
+        coeffs = np.linalg.solve(gram, moments)
+    except np.linalg.LinAlgError:
+        print('Could not remove baseline drift (if it exists)')
+        logger.warning('Could not remove baseline drift')
+        np.copyto(out, voltage)
+        return out
+    for start, stop in _chunks(time.size, chunk_size):
+        basis = chebvander((time[start:stop] - centre)*scale, degree)
+        out[start:stop] = voltage[start:stop] - basis @ coeffs
+    return out
+
+
+def median_baseline(time, voltage, block=0.1, window=0.6, units='sec'):
+    '''Baseline from a running median of decimated block medians
+
+    The trace is cut into blocks of `block` seconds whose medians are
+    smoothed by a running median of `window` seconds and linearly
+    interpolated back onto the sampled times. The work and temporaries are
+    on the block medians, so the cost stays close to one pass over the data
+
+    :param block (float, default=0.1): block length in seconds, roughly one
+        QRS complex wide so that beats do not bias the block medians
+    :param window (float, default=0.6): running median length in seconds,
+        long enough to span a QRS complex and its T wave
+    :param units (str, default='sec'): time units of the trace, 'sec' or
+        'min'
+    :return baseline (numpy array): baseline at the sampled times
+    '''
+    time = np.asarray(time)
+    voltage = np.asarray(voltage)
+    centres, smooth = _median_knots(time, voltage, block, window, units)
+    if voltage.ndim == 1:
+        return np.interp(time, centres, smooth)
+    num_blocks = centres.size
+    if num_blocks < 2:
+        return np.broadcast_to(smooth, voltage.shape).copy()
+    # np.interp is 1-D only, the interpolation weights are shared by leads
+    right = np.clip(np.searchsorted(centres, time), 1, num_blocks - 1)
+    weight = np.clip((time - centres[right - 1]) /
+                     (centres[right] - centres[right - 1]), 0, 1)
+    return smooth[..., right - 1]*(1 - weight) + smooth[..., right]*weight
+
+
+def _median_knots(time, voltage, block=0.1, window=0.6, units='sec'):
+    '''Block centres and smoothed block medians of median_baseline, a
+    single knot holding the median when there are fewer than two blocks
+    '''
+    time = np.asarray(time)
+    voltage = np.asarray(voltage)
+    dt = (time[-1] - time[0])/(time.size - 1)
+    # block and window are in seconds, dt in the time units
+    block_size = max(int(round(block/(60*dt if units == 'min' else dt))), 1)
+    num_blocks = time.size//block_size
+    if num_blocks < 2:
+        return (time[:1], np.median(voltage, axis=-1, keepdims=True))
+
+    usable = num_blocks*block_size
+    blocks = voltage[..., :usable].reshape(voltage.shape[:-1] +
+                                           (num_blocks, block_size))
+    medians = np.median(blocks, axis=-1)
+    centres = time[:usable].reshape(num_blocks, block_size).mean(axis=1)
+
+    width = min(max(int(round(window/block)), 1), num_blocks)
+    pad = [(0, 0)]*(voltage.ndim - 1) + [(width//2, width - 1 - width//2)]
+    padded = np.pad(medians, pad, mode='edge')
+    windows = np.lib.stride_tricks.sliding_window_view(padded, width,
+                                                       axis=-1)
+    smooth = np.median(windows, axis=-1)
+    return centres, smooth
+
+
+def highpass_signal(time, voltage, cutoff=0.5, order=2, units='sec'):
+    '''Removes the baseline with a zero-phase Butterworth high-pass filter
+    (scipy.signal.sosfiltfilt). Requires scipy
+
+    :param cutoff (float, default=0.5): cutoff frequency in Hz
+    :param order (int, default=2): filter order
+    :param units (str, default='sec'): time units of the trace, 'sec' or
+        'min'
+    :return voltage (numpy array): filtered trace
+    '''
+    from scipy.signal import butter, sosfiltfilt
+
+    time = np.asarray(time)
+    # samples per second
+    sampling_rate = (time.size - 1)/(time[-1] - time[0])
+    if units == 'min':
+        sampling_rate /= 60
+    sos = butter(order, cutoff, btype='highpass', fs=sampling_rate,
+                 output='sos')
+    return sosfiltfilt(sos, voltage, axis=-1)
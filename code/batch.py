@@ -0,0 +1,120 @@
+"""Batch analysis of many ECG recordings across a pool of processes.
+
+Usage: python batch.py FILE [FILE ...] [--workers N] [--output FILE]
+                       [--store DIR]
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from heart_rate import ECG, configure_logging
+from results_store import ResultsStore
+
+SUMMARY_FIELDS = ('duration', 'voltage_extremes', 'num_beats', 'mean_hr_bpm')
+
+
+def summarize(path, keep_beats=False, **ecg_args):
+    '''Analyzes one recording and summarizes the results
+
+    :param path (str): CSV file to analyze. Existing paths are used as
+        given, anything else is looked up in the 'test_data' folder as ECG
+        does
+    :param keep_beats (boolean, default=False): also return the beat times
+        under 'beats', e.g. for a ResultsStore
+    :param ecg_args: keyword arguments passed on to ECG
+    :return summary (dict): the filename, the SUMMARY_FIELDS of the
+        analysis and 'error', which is None when the analysis succeeded and
+        a description of the failure otherwise
+    '''
+    summary = {'filename': path, 'error': None}
+    try:
+        if os.path.isfile(path):
+            path = os.path.abspath(path)
+        ecg = ECG(filename=path, **ecg_args)
+        if not hasattr(ecg, 'time'):
+            raise FileNotFoundError('Import file not found: %s' % path)
+        summary['duration'] = float(ecg.duration)
+        summary['voltage_extremes'] = [float(v) for v in ecg.voltage_extremes]
+        summary['num_beats'] = int(ecg.num_beats)
+        summary['mean_hr_bpm'] = float(ecg.mean_hr_bpm)
+        if keep_beats:
+            summary['beats'] = ecg.beats
+    except Exception as err:
+        summary['error'] = '%s: %s' % (type(err).__name__, err)
+    return summary
+
+
+def analyze_many(paths, workers=None, keep_beats=False, **ecg_args):
+    '''Analyzes many recordings in parallel
+
+    :param paths (iterable): CSV files to analyze, see summarize
+    :param workers (int, default=None): number of worker processes. None
+        uses one per CPU, 1 runs serially in the calling process
+    :param keep_beats (boolean, default=False): see summarize
+    :param ecg_args: keyword arguments passed on to ECG
+    :return summaries (list): one summary dict per path, in input order.
+        Files that fail are reported through their 'error' entry instead
+        of stopping the run
+    '''
+    paths = list(paths)
+    task = partial(summarize, keep_beats=keep_beats, **ecg_args)
+    if workers == 1 or len(paths) < 2:
+        return [task(path) for path in paths]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(task, path) for path in paths]
+        summaries = []
+        for path, future in zip(paths, futures):
+            try:
+                summaries.append(future.result())
+            except Exception as err:  # e.g. a worker process died
+                summaries.append({'filename': path,
+                                  'error': '%s: %s' % (type(err).__name__,
+                                                       err)})
+    return summaries
+
+
+def main(argv=None):
+    '''Command line entry point, returns 1 if any file failed
+    '''
+    parser = argparse.ArgumentParser(
+        description='Summarize ECG recordings in parallel')
+    parser.add_argument('paths', nargs='+', help='CSV files to analyze')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes (default: one per CPU)')
+    parser.add_argument('--units', default='sec', help='time units of files')
+    parser.add_argument('--output', help='JSON file for the summaries '
+                                         '(default: standard output)')
+    parser.add_argument('--store', help='folder to save the summaries and '
+                                        'beat times to as a ResultsStore')
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    summaries = analyze_many(args.paths, workers=args.workers,
+                             keep_beats=bool(args.store), units=args.units)
+    if args.store:
+        store = ResultsStore(capacity=len(summaries))
+        store.extend(summaries)
+        store.save(args.store)
+        for summary in summaries:
+            summary.pop('beats', None)
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(summaries, fp, indent=4)
+    else:
+        json.dump(summaries, sys.stdout, indent=4)
+        print()
+
+    failed = [s for s in summaries if s['error'] is not None]
+    for summary in failed:
+        print('%s failed: %s' % (summary['filename'], summary['error']),
+              file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
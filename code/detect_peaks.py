@@ -4,6 +4,11 @@
 from __future__ import division, print_function
 import numpy as np
 
+try:
+    from numba import njit
+except ImportError:  # the NumPy kernels are used instead
+    njit = None
+
 __author__ = "Marcos Duarte, https://github.com/demotu/BMC"
 __version__ = "1.0.4"
 __license__ = "MIT"
@@ -53,6 +58,10 @@ def detect_peaks(x, mph=None, mpd=1, threshold=0, edge='rising',
 
     The function can handle NaN's
 
+    1-D data is searched in one pass by a kernel compiled with Numba when it
+    is installed, and with NumPy otherwise. Both return the indices of the
+    original implementation, kept as `_detect_peaks_reference` for plotting.
+
     See this IPython Notebook [1]_.
 
     References
@@ -90,6 +99,124 @@ def detect_peaks(x, mph=None, mpd=1, threshold=0, edge='rising',
     >>> detect_peaks(x, threshold = 2, show=True)
     """
 
+    x = np.atleast_1d(x)
+    if x.size < 3:
+        return np.array([], dtype=int)
+    if show or x.ndim != 1:
+        return _detect_peaks_reference(x, mph, mpd, threshold, edge, kpsh,
+                                       valley, show, ax)
+    # no copy of float64 data, and the same heights as the reference
+    x = np.asarray(x, dtype=np.float64)
+    edge = _EDGE_CODES.get(edge.lower() if edge else None, -1)
+    mph = -np.inf if mph is None else mph
+    if _peak_loop_compiled is not None:
+        ind = np.empty(x.size, dtype=np.intp)
+        ind = ind[:_peak_loop_compiled(x, -1.0 if valley else 1.0, edge,
+                                       float(mph), float(threshold), ind)]
+    else:
+        ind = _peak_candidates(-x if valley else x, edge, mph, threshold)
+    # detect small peaks closer than minimum peak distance
+    if ind.size and mpd > 1:
+        ind = _suppress_close_peaks(-x if valley else x, ind, mpd, kpsh)
+    return ind
+
+
+# edge option of detect_peaks -> code of the candidate kernels
+_EDGE_CODES = {None: 0, 'rising': 1, 'falling': 2, 'both': 3}
+
+
+def _peak_candidates(x, edge, mph, threshold):
+    """Peaks of float64 data before the `mpd` suppression, see
+    detect_peaks, in NumPy.
+
+    Same result as the reference, without its stacked copies of the
+    differences: the masks compare views of them, around samples 1 to
+    size - 2, so the ends need no special case.
+    """
+    if edge < 0:
+        return np.array([], dtype=int)
+    dx = np.diff(x)
+    nan_x = np.isnan(x)
+    has_nan = nan_x.any()
+    if has_nan:
+        # as the reference, which only does this with NaN's in x
+        dx[np.isnan(dx)] = np.inf
+    before, after = dx[:-1], dx[1:]
+    if edge == 0:
+        is_peak = (after < 0) & (before > 0)
+    else:
+        is_peak = np.zeros(before.size, dtype=bool)
+        if edge in (1, 3):
+            is_peak |= (after <= 0) & (before > 0)
+        if edge in (2, 3):
+            is_peak |= (after < 0) & (before >= 0)
+    ind = np.flatnonzero(is_peak) + 1
+    # NaN's and values close to NaN's cannot be peaks
+    if ind.size and has_nan:
+        near_nan = nan_x[:-2] | nan_x[1:-1] | nan_x[2:]
+        ind = ind[~near_nan[ind - 1]]
+    if ind.size:
+        ind = ind[x[ind] >= mph]
+    if ind.size and threshold > 0:
+        # differences of infinite peaks are NaN, never below threshold
+        dx = np.minimum(x[ind] - x[ind - 1], x[ind] - x[ind + 1])
+        ind = ind[~(dx < threshold)]
+    return ind
+
+
+def _peak_loop(x, sign, edge, mph, threshold, out):
+    """Peaks of sign*x before the `mpd` suppression, see detect_peaks, in
+    one pass over float64 data without temporaries.
+
+    Compiled with Numba when it is installed. Writes the peak indices to
+    `out` and returns their number.
+    """
+    if edge < 0:
+        return 0
+    has_nan = False
+    for i in range(x.size):
+        if x[i] != x[i]:
+            has_nan = True
+            break
+    count = 0
+    for i in range(1, x.size - 1):
+        left = sign*x[i - 1]
+        centre = sign*x[i]
+        right = sign*x[i + 1]
+        # NaN's and values close to NaN's cannot be peaks
+        if left != left or centre != centre or right != right:
+            continue
+        before = centre - left
+        after = right - centre
+        if has_nan and before != before:
+            before = np.inf
+        if has_nan and after != after:
+            after = np.inf
+        if edge == 0:
+            is_peak = after < 0 and before > 0
+        else:
+            is_peak = False
+            if edge == 1 or edge == 3:
+                is_peak = after <= 0 and before > 0
+            if edge == 2 or edge == 3:
+                is_peak = is_peak or (after < 0 and before >= 0)
+        if not is_peak or not centre >= mph:
+            continue
+        if threshold > 0:
+            low = centre - left
+            high = centre - right
+            if min(low, high) < threshold and low == low and high == high:
+                continue
+        out[count] = i
+        count += 1
+    return count
+
+
+def _detect_peaks_reference(x, mph=None, mpd=1, threshold=0, edge='rising',
+                            kpsh=False, valley=False, show=False, ax=None):
+    """Original implementation of detect_peaks, which the kernels are
+    tested against and which draws the plots.
+    """
     x = np.atleast_1d(x).astype('float64')
     if x.size < 3:
         return np.array([], dtype=int)
@@ -116,7 +243,7 @@ def detect_peaks(x, mph=None, mpd=1, threshold=0, edge='rising',
     # handle NaN's
     if ind.size and indnan.size:
         # NaN's and values close to NaN's cannot be peaks
-        ind = ind[np.in1d(ind,
+        ind = ind[np.isin(ind,
                           np.unique(np.hstack((indnan, indnan-1, indnan+1))),
                           invert=True)]
     # first and last values of x cannot be peaks
@@ -133,16 +260,7 @@ def detect_peaks(x, mph=None, mpd=1, threshold=0, edge='rising',
         ind = np.delete(ind, np.where(dx < threshold)[0])
     # detect small peaks closer than minimum peak distance
     if ind.size and mpd > 1:
-        ind = ind[np.argsort(x[ind])][::-1]  # sort ind by peak height
-        idel = np.zeros(ind.size, dtype=bool)
-        for i in range(ind.size):
-            if not idel[i]:
-                # keep peaks with the same height if kpsh is True
-                idel = idel | (ind >= ind[i] - mpd) & (ind <= ind[i] + mpd) \
-                    & (x[ind[i]] > x[ind] if kpsh else True)
-                idel[i] = 0  # Keep current peak
-        # remove the small peaks and sort back the indices by their occurrence
-        ind = np.sort(ind[~idel])
+        ind = _suppress_close_peaks_reference(x, ind, mpd, kpsh)
 
     if show:
         if indnan.size:
@@ -154,6 +272,64 @@ def detect_peaks(x, mph=None, mpd=1, threshold=0, edge='rising',
     return ind
 
 
+def _suppress_close_peaks(x, ind, mpd, kpsh):
+    """Remove peaks closer than `mpd` to a higher peak, see detect_peaks.
+
+    Peaks are visited from the highest down (the same order as the original
+    implementation) and each kept peak blocks the `mpd` samples around it in
+    a boolean mask, so every candidate costs one lookup. Kept peaks are more
+    than `mpd` apart, so the blocked slices mark each sample at most twice
+    and the whole pass is O(k log k + n) instead of O(k**2).
+    """
+    ind = ind[np.argsort(x[ind])][::-1]  # sort ind by peak height
+    keep = np.zeros(ind.size, dtype=bool)
+    suppress = _suppress_loop_compiled or _suppress_loop
+    suppress(ind, x[ind], int(np.floor(mpd)), bool(kpsh),
+             np.zeros(x.size, dtype=bool), keep)
+    # remove the small peaks and sort back the indices by their occurrence
+    return np.sort(ind[keep])
+
+
+def _suppress_loop(ind, height, width, kpsh, blocked, keep):
+    """Marks in `keep` the peaks of `ind`, sorted from the highest down,
+    that no kept peak within `width` samples blocks. Compiled with Numba
+    when it is installed.
+    """
+    group = 0  # first peak of the current height, with kpsh
+    for i in range(ind.size):
+        if kpsh and i and height[i] != height[i-1]:
+            # peaks with the same height do not suppress each other
+            for j in range(group, i):
+                if keep[j]:
+                    blocked[max(ind[j] - width, 0):ind[j] + width + 1] = True
+            group = i
+        if not blocked[ind[i]]:
+            keep[i] = True
+            if not kpsh:
+                blocked[max(ind[i] - width, 0):ind[i] + width + 1] = True
+
+
+if njit is not None:
+    _peak_loop_compiled = njit(cache=True, nogil=True)(_peak_loop)
+    _suppress_loop_compiled = njit(cache=True, nogil=True)(_suppress_loop)
+else:
+    _peak_loop_compiled = _suppress_loop_compiled = None
+
+
+def _suppress_close_peaks_reference(x, ind, mpd, kpsh):
+    """Original O(k**2) implementation of _suppress_close_peaks."""
+    ind = ind[np.argsort(x[ind])][::-1]  # sort ind by peak height
+    idel = np.zeros(ind.size, dtype=bool)
+    for i in range(ind.size):
+        if not idel[i]:
+            # keep peaks with the same height if kpsh is True
+            idel = idel | (ind >= ind[i] - mpd) & (ind <= ind[i] + mpd) \
+                & (x[ind[i]] > x[ind] if kpsh else True)
+            idel[i] = 0  # Keep current peak
+    # remove the small peaks and sort back the indices by their occurrence
+    return np.sort(ind[~idel])
+
+
 def _plot(x, mph, mpd, threshold, edge, valley, ax, ind):
     """Plot results of the detect_peaks function, see its help."""
     try:
@@ -0,0 +1,241 @@
+"""Reading ECG traces from CSV files."""
+
+import math
+
+import numpy as np
+
+COLUMNS = ['time', 'voltage']
+# entries that pandas.read_csv reads as missing by default
+NA_VALUES = frozenset(['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN',
+                       '-NaN', '-nan', '1.#IND', '1.#QNAN', '<NA>', 'N/A',
+                       'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'])
+
+
+def read_csv(source):
+    '''Reads and validates a two column (time, voltage) CSV trace
+
+    Clean files are parsed straight to float64 by numpy.loadtxt, which
+    does not need pandas. Text entries such as 'bad data' or empty fields
+    make that parse fail. The pandas C engine then parses the file once,
+    the columns holding text are coerced with pandas.to_numeric and the
+    bad rows are dropped with a single mask. Without pandas, such files
+    are parsed line by line.
+
+    :param source (str or file-like): CSV file to read
+    :return time (numpy array): valid sampled times as float64
+    :return voltage (numpy array): valid sampled voltages as float64
+    :return dropped (dict): number of rows dropped because an entry was
+        'non_numeric' or because it was 'missing'
+    '''
+    start = source.tell() if hasattr(source, 'seek') else None
+    try:
+        return _read_clean(source, start)
+    except ValueError:
+        pass
+    if _pandas() is None:
+        return _read_lines(source, start)
+    return _read_coerce(source, start)
+
+
+def read_leads(source):
+    '''Reads a multi-lead CSV trace: a shared time column followed by one
+    voltage column per lead. A first line without any number is taken as
+    a header with the column names. Rows with a non-numeric or missing
+    entry in any lead are dropped, as by read_csv. Clean files are parsed
+    by numpy.loadtxt, others line by line
+
+    :param source (str or file-like): CSV file to read
+    :return time (numpy array): valid sampled times as float64
+    :return voltage (numpy array): valid sampled voltages as float64, one
+        row per lead
+    :return names (list): names of the leads from the header, None without
+        header
+    :return dropped (dict): number of rows dropped because an entry was
+        'non_numeric' or because it was 'missing'
+    '''
+    start = source.tell() if hasattr(source, 'seek') else None
+    if start is None:
+        with open(source, 'r') as fp:
+            first = fp.readline()
+    else:
+        first = source.readline()
+    if isinstance(first, bytes):
+        first = first.decode()
+    fields = [field.strip() for field in first.split(',')]
+    names = None
+    if not any(_is_number(field) for field in fields):
+        names = fields[1:]
+
+    skiprows = 0 if names is None else 1
+    try:
+        columns, dropped = _load_clean(source, start, len(fields), skiprows)
+    except ValueError:
+        columns, dropped = _parse_lines(source, start, len(fields), skiprows)
+    return columns[0], np.array(columns[1:]), names, dropped
+
+
+def _is_number(field):
+    try:
+        float(field)
+    except ValueError:
+        return False
+    return True
+
+
+def _pandas():
+    '''pandas if installed, only imported once a file needs it
+    '''
+    try:
+        import pandas
+    except ImportError:
+        return None
+    return pandas
+
+
+def _read_clean(source, start):
+    '''numpy.loadtxt parse of a file without text entries or empty
+    fields, raises ValueError otherwise, see _load_clean
+    '''
+    (time_vec, voltage_vec), dropped = _load_clean(source, start, 2)
+    return time_vec, voltage_vec, dropped
+
+
+def _load_clean(source, start, num_columns, skiprows=0):
+    '''numpy.loadtxt parse into contiguous columns. Blank lines, which
+    loadtxt skips, are counted from the number of lines as missing rows,
+    as are rows with NaN entries
+    '''
+    if start is not None:
+        source.seek(start)
+    values = np.loadtxt(source, delimiter=',', comments=None, ndmin=2,
+                        dtype=float, skiprows=skiprows)
+    if values.shape[1] != num_columns:
+        raise ValueError('expected %d columns' % num_columns)
+    num_blank = _count_lines(source, start) - skiprows - len(values)
+
+    bad = np.isnan(values).any(axis=1)
+    num_bad = int(np.count_nonzero(bad))
+    if num_bad:
+        values = values[~bad]
+    # contiguous columns, as returned by the other readers
+    columns = list(np.ascontiguousarray(values.T))
+    return columns, {'non_numeric': 0, 'missing': num_bad + num_blank}
+
+
+def _count_lines(source, start, block_size=1 << 20):
+    '''Number of lines, counting a last line without a newline
+    '''
+    fp = open(source, 'rb') if start is None else source
+    if start is not None:
+        fp.seek(start)
+    count = 0
+    ends_with_newline = True
+    try:
+        block = fp.read(block_size)
+        while block:
+            newline = b'\n' if isinstance(block, bytes) else '\n'
+            count += block.count(newline)
+            ends_with_newline = block.endswith(newline)
+            block = fp.read(block_size)
+    finally:
+        if start is None:
+            fp.close()
+    return count if ends_with_newline else count + 1
+
+
+def _read_lines(source, start):
+    '''Line by line parse used without pandas for files with text
+    entries, see _parse_lines
+    '''
+    (time_vec, voltage_vec), dropped = _parse_lines(source, start, 2)
+    return time_vec, voltage_vec, dropped
+
+
+def _parse_lines(source, start, num_columns, skiprows=0):
+    '''Line by line parse into columns. Entries are classified like the
+    pandas readers do: pandas' default NA strings and empty fields are
+    missing, other unparseable entries non-numeric
+    '''
+    if start is None:
+        with open(source, 'r') as fp:
+            text = fp.read()
+    else:
+        source.seek(start)
+        text = source.read()
+    if isinstance(text, bytes):
+        text = text.decode()
+
+    rows = []
+    non_numeric = 0
+    missing = 0
+    for line in text.splitlines()[skiprows:]:
+        fields = line.split(',')[:num_columns]
+        fields += [''] * (num_columns - len(fields))
+        row = []
+        text_entry = False
+        for field in fields:
+            field = field.strip()
+            if field in NA_VALUES:
+                continue
+            try:
+                value = float(field)
+            except ValueError:
+                text_entry = True
+                continue
+            if not math.isnan(value):
+                row.append(value)
+        if text_entry:
+            non_numeric += 1
+        elif len(row) < num_columns:
+            missing += 1
+        else:
+            rows.append(row)
+
+    values = np.array(rows, dtype=float).reshape(-1, num_columns)
+    columns = list(np.ascontiguousarray(values.T))
+    return columns, {'non_numeric': non_numeric, 'missing': missing}
+
+
+def _read(source, start):
+    if start is not None:
+        source.seek(start)
+    # low_memory=False infers each column's type from all of it, so a
+    # column with text is read as strings throughout, without DtypeWarning
+    return _pandas().read_csv(source, header=None, names=COLUMNS,
+                              skipinitialspace=True, skip_blank_lines=False,
+                              low_memory=False)
+
+
+def _read_coerce(source, start):
+    '''pandas C engine parse of a file with text entries. Text columns
+    are coerced with pandas.to_numeric, unparseable entries becoming NaN
+    '''
+    pandas = _pandas()
+    imported_file = _read(source, start)
+
+    columns = []
+    missing = np.zeros(len(imported_file), dtype=bool)
+    non_numeric = np.zeros(len(imported_file), dtype=bool)
+    for name in COLUMNS:
+        column = imported_file[name]
+        if pandas.api.types.is_numeric_dtype(column):
+            values = column.to_numpy(dtype=float)
+            missing |= np.isnan(values)
+        else:
+            absent = column.isna().to_numpy()
+            values = pandas.to_numeric(column, errors='coerce')
+            values = values.to_numpy(dtype=float)
+            missing |= absent
+            non_numeric |= np.isnan(values) & ~absent
+        columns.append(values)
+    del imported_file
+
+    bad = missing | non_numeric
+    time_vec, voltage_vec = columns
+    if bad.any():
+        time_vec = time_vec[~bad]
+        voltage_vec = voltage_vec[~bad]
+
+    dropped = {'non_numeric': int(np.count_nonzero(non_numeric)),
+               'missing': int(np.count_nonzero(missing & ~non_numeric))}
+    return time_vec, voltage_vec, dropped
@@ -1,3 +1,144 @@
+import functools
+import io
+import json
+import logging
+import os
+from contextlib import nullcontext
+
+import numpy as np
+
+from autocorrelation import autocorrelate, cross_correlate, estimate_period
+from baseline import remove_baseline
+from detect_peaks import detect_peaks
+from ecg_io import read_csv
+from instrumentation import StageStats
+from resample import resample
+from segmented import find_segmented_beats
+from signal_quality import assess, mean_energy, signal_stats
+from trace_cache import load_trace
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# beat periods at the start of the trace kept as template for ECG.extend
+TEMPLATE_PERIODS = 4
+
+
+def configure_logging(filename='heart_rate.log'):
+    '''Sends the log messages of the analysis to a file. Applications call
+    this once; constructing an ECG does not touch the logging setup
+
+    :param filename (str, default='heart_rate.log'): log file
+    '''
+    logging.basicConfig(filename=filename,
+                        format='%(asctime)s %(message)s',
+                        datefmt='%m/%d/%Y %I:%M:%S %p')
+
+
+def detrend(time, voltage, baseline='polyfit', units='sec', low_memory=False,
+            **options):
+    '''Removes the baseline drift before the beat search, the first step
+    of ECG.find_beats
+
+    :param time (array): sampled times
+    :param voltage (array): sampled voltages
+    :param baseline (str or callable, default='polyfit'): baseline removal,
+        see baseline.remove_baseline
+    :param units (str, default='sec'): time units, 'sec' or 'min'
+    :param low_memory (boolean, default=False): write the result into a
+        float32 buffer, which trace_autocorrelation can then reuse
+    :param options: keyword arguments of the baseline estimator, e.g. the
+        degree of 'polyfit'
+    :return voltage (numpy array): the voltage without its baseline
+    '''
+    # in low memory mode one float32 buffer holds the baseline-free and
+    # then the mean-free voltage, and the FFTs run in single precision
+    out = np.empty(voltage.size, np.float32) if low_memory else None
+    return remove_baseline(time, voltage, baseline, out=out, units=units,
+                           **options)
+
+
+def trace_autocorrelation(voltage, method='fft', in_place=False):
+    '''Autocorrelates a baseline-free voltage about its mean
+
+    :param voltage (array): voltage returned by detrend
+    :param method (str, default='fft'): see autocorrelation.autocorrelate
+    :param in_place (boolean, default=False): subtract the mean from
+        voltage itself, e.g. the float32 buffer of detrend
+    :return unbias (numpy array): the voltage minus its mean
+    :return auto_corr (numpy array): autocorrelation at every lag,
+        normalized to 1 at lag 0
+    '''
+    mean, norm = mean_energy(voltage)
+    if in_place:
+        voltage -= mean
+        unbias = voltage
+    else:
+        unbias = voltage - mean
+    return unbias, autocorrelate(unbias, method=method, norm=norm)
+
+
+def candidate_peaks(auto_corr, mpd=5, mph=0):
+    '''Lags of the autocorrelation peaks the beat period is picked from,
+    see autocorrelation.estimate_period
+
+    :param auto_corr (array): autocorrelation at lags 0, 1, 2...
+    :param mpd (float, default=5): minimum peak distance, in samples
+    :param mph (float, default=0): minimum peak height
+    :return candidates (numpy array): lags of the peaks
+    '''
+    return detect_peaks(auto_corr, mpd=mpd, mph=mph)
+
+
+def beat_indices(auto_corr, period, mph=0):
+    '''Sample indices of the beats, the autocorrelation peaks at least 0.8
+    beat periods apart, lag 0 included
+
+    :param auto_corr (array): autocorrelation at lags 0, 1, 2...
+    :param period (int): beat period in samples, None if none was found
+    :param mph (float, default=0): minimum peak height
+    :return beat_ind (numpy array): indices of the beats, only the first
+        sample without a period
+    '''
+    if period is None:
+        return np.asarray([0])
+    return detect_peaks(np.insert(auto_corr, 0, 0), mpd=0.8*period,
+                        mph=mph) - 1
+
+
+def average_hr_bpm(beat_times, duration, time_dur=60):
+    '''Mean heart rate over the first time_dur seconds of a trace
+
+    :param beat_times (array): times of the beats
+    :param duration (float): duration of the trace in seconds
+    :param time_dur (float, default=60): interval in seconds. The whole
+        trace when it is shorter
+    :return mean_hr_bpm (float): mean heart rate in beats per minute
+    '''
+    if time_dur >= duration:
+        return 60*len(beat_times)/duration
+    beat_num = np.searchsorted(beat_times, time_dur, side='right')
+    return 60*beat_num/time_dur
+
+
+def _stage(name):
+    '''Decorator recording an ECG method as a pipeline stage in the stats
+    of the object. Costs one attribute check when stats are disabled
+    '''
+    def decorate(method):
+        @functools.wraps(method)
+        def timed(self, *args, **kwargs):
+            if self.stats is None:
+                return method(self, *args, **kwargs)
+            with self.stats.stage(name, self._num_samples()) as record:
+                result = method(self, *args, **kwargs)
+                if record['size'] is None:
+                    record['size'] = self._num_samples()
+            return result
+        return timed
+    return decorate
+
+
 class ECG:
     '''Class to describe ECG trace data. Utilizes detect_peaks written by
     Marcos Duarte and made available with the MIT license for the detection of
@@ -6,14 +147,34 @@ class ECG:
     :attribute filename (str): CSV filename from which data was imported
     :attribute time (array): sampled times of the ECG trace
     :attribute voltage (array): sampled voltages of the ECG trace
+    :attribute dropped_rows (dict): number of CSV rows dropped on import
+        because of 'non_numeric' or 'missing' entries
     :attribute voltage_extremes (tuple): minimum and maximum sampled voltage
+    :attribute quality (dict): signal statistics and quality report, see
+        find_quality
     :attribute duration (float): total time of ECG sampling
     :attribute beats (array): array of times when heartbeat was detected
     :attribute num_beats (int): number of heart beats detected in ECG trace
     :attribute mean_hr_bpm (float): average heart rate over a user-specified
         time interval
+    :attribute autocorr (str): autocorrelation backend used to find beats
+    :attribute baseline (str or callable): baseline drift removal method
+    :attribute stats (StageStats): per-stage timings, None when disabled
+    :attribute low_memory (boolean): voltage kept and analyzed in float32
+    :attribute resample_rate (float or str): sampling rate beats are found
+        at, None for the samples as imported
+    :attribute segment (float or dict): window length of the segmented
+        beat search, None to search the whole trace at once
+
+    voltage_extremes, quality, duration, beats, num_beats and mean_hr_bpm are
+    computed on first access and cached. Assigning time or voltage clears the
+    cache, while extend and tail append samples and update the cache
+    incrementally.
     '''
-    def __init__(self, filename='test_data1.csv', units='sec', export=False):
+    def __init__(self, filename='test_data1.csv', units='sec', export=False,
+                 autocorr='fft', cache=False, baseline='polyfit',
+                 stats=None, low_memory=False, resample_rate=None,
+                 segment=None):
         '''__init__ method of the ECG class
 
         :param filename (str, default='test_data1.csv'): CSV file containing
@@ -22,92 +183,377 @@ class ECG:
             than where the module resides
         :param units (str, default='sec'): defines the time scale of the data.
             By default set to 'sec' for seconds. 'Min' can also be passed.
-        :param export (boolean, default=False): exports JSON file based on
-            analysis
+        :param export (boolean or str, default=False): exports JSON file based
+            on analysis. A string selects the mode of export_json
+        :param autocorr (str, default='fft'): autocorrelation backend, 'fft'
+            for the O(n log n) method or 'direct' for the O(n*n) reference.
+            Every lag is computed: the beats are read off the peaks of the
+            whole autocorrelation, and the period search counts them to
+            check the beat rate, so the max_lag of autocorrelate, which
+            StreamingBeatDetector uses, does not apply here
+        :param cache (boolean or str, default=False): import through the
+            binary trace cache, see trace_cache. A string gives the cache
+            folder, True uses a '.trace_cache' folder beside the CSV
+        :param baseline (str or callable, default='polyfit'): baseline drift
+            removal used before finding beats, see baseline.remove_baseline
+        :param stats (StageStats or boolean, default=None): records the wall
+            time, input size and optionally peak memory of every pipeline
+            stage, see instrumentation.StageStats. True creates a new
+            StageStats, a shared instance collects several objects
+        :param low_memory (boolean, default=False): store the voltage as
+            float32 and find beats in single precision with preallocated
+            buffers, roughly halving the peak memory of long traces. Times
+            stay float64, whose precision the beat times need
+        :param resample_rate (float or str, default=None): puts the trace on
+            a uniform grid before finding beats, see resample.resample. A
+            number gives the rate in samples per second, e.g. 100 to
+            decimate a 360 Hz trace, 'uniform' keeps the rate of the trace.
+            Traces uniform at that rate are used without copying. None
+            finds beats in the samples as imported
+        :param segment (float or dict, default=None): finds beats in
+            overlapping windows of this many seconds, each with its own beat
+            period, see segmented.find_segmented_beats. Suits long
+            recordings whose heart rate changes. A dict gives the window,
+            overlap and workers options instead
         '''
-        import logging
-
-        logging.basicConfig(filename="heart_rate.log",
-                            format='%(asctime)s %(message)s',
-                            datefmt='%m/%d/%Y %I:%M:%S %p')
+        self._configure(filename, units, autocorr, cache, baseline, stats,
+                        low_memory, resample_rate, segment)
+        self.import_csv()  # can manipulate __run_flag if import file not found
+        self._export_if(export)
 
+    def _configure(self, filename, units='sec', autocorr='fft', cache=False,
+                   baseline='polyfit', stats=None, low_memory=False,
+                   resample_rate=None, segment=None):
         self.filename = filename
         self.__run_flag = True
         self.units = units
-        self.import_csv()  # can manipulate __run_flag if import file not found
-        if self.__run_flag:
-            self.find_volt_extrema()
-            self.find_duration()
-            self.find_beats()
-            self.find_num_beats()
-            self.find_mean_hr_bpm()
-
-            if export:
-                self.export_json()
+        self.autocorr = autocorr
+        self.cache = cache
+        self.baseline = baseline
+        self.stats = StageStats() if stats is True else stats
+        self.low_memory = low_memory
+        self.resample_rate = resample_rate
+        self.segment = segment
+        self._derived = {}
+        self._source = None
+
+    def _export_if(self, export):
+        if self.__run_flag and export:
+            self.export_json(mode=export if isinstance(export, str)
+                             else 'full')
+
+    @classmethod
+    def from_arrays(cls, time, voltage, filename='arrays.csv', export=False,
+                    **options):
+        '''Class method to create an ECG from samples already in memory.
+        Arrays are used as given, without copying; other sequences are
+        converted, as are voltages other than float32 with low_memory.
+        Unlike CSV imports, NaN samples are not dropped
+
+        :param time (array): sampled times
+        :param voltage (array): sampled voltages, as many as times
+        :param filename (str, default='arrays.csv'): name the exports are
+            derived from
+        :param export (boolean or str, default=False): see __init__
+        :param options: units, autocorr, baseline, stats, low_memory,
+            resample_rate and segment, see __init__
+        :return ecg (ECG): the ECG of the samples
+        '''
+        time = np.asarray(time)
+        voltage = np.asarray(voltage)
+        if time.ndim != 1 or time.shape != voltage.shape:
+            raise ValueError('time and voltage must be 1-D and of the same '
+                             'length')
+        ecg = cls.__new__(cls)
+        ecg._configure(filename, **options)
+        ecg._time = time
+        ecg._voltage = ecg._stored(voltage)
+        ecg.dropped_rows = {'non_numeric': 0, 'missing': 0}
+        ecg._export_if(export)
+        return ecg
+
+    @classmethod
+    def from_buffer(cls, buffer, dtype=np.float64, interleaved=True,
+                    filename='buffer.csv', export=False, **options):
+        '''Class method to create an ECG from binary samples, e.g. bytes
+        received from a socket or a memoryview of a numpy array. time and
+        voltage are views of the buffer, nothing is copied
+
+        :param buffer (bytes-like): the samples in machine byte order
+        :param dtype (numpy dtype, default=float64): type of the samples
+        :param interleaved (boolean, default=True): True for samples stored
+            as time, voltage, time, voltage... False for all times followed
+            by all voltages
+        :param filename (str, default='buffer.csv'): see from_arrays
+        :param export (boolean or str, default=False): see __init__
+        :param options: units, autocorr, baseline, stats, low_memory,
+            resample_rate and segment, see __init__
+        :return ecg (ECG): the ECG of the samples
+        '''
+        samples = np.frombuffer(buffer, dtype=dtype)
+        if samples.size % 2:
+            raise ValueError('buffer holds an odd number of samples')
+        if interleaved:
+            pairs = samples.reshape(-1, 2)
+            time, voltage = pairs[:, 0], pairs[:, 1]
+        else:
+            time, voltage = samples.reshape(2, -1)
+        return cls.from_arrays(time, voltage, filename=filename,
+                               export=export, **options)
+
+    @classmethod
+    def from_path(cls, source, filename=None, export=False, **options):
+        '''Class method to create an ECG from a CSV anywhere on disk or in a
+        file-like object, e.g. io.BytesIO of received text, which is parsed
+        without touching the disk. Paths are used as given rather than
+        looked up in the 'test_data' folder
+
+        :param source (str, path-like or file-like): CSV trace
+        :param filename (str, default=None): name the exports are derived
+            from, by default the name of the path or file
+        :param export (boolean or str, default=False): see __init__
+        :param options: units, autocorr, cache, baseline, stats,
+            low_memory, resample_rate and segment, see __init__. The cache
+            only applies to paths
+        :return ecg (ECG): the ECG of the trace
+        '''
+        if filename is None:
+            name = source if not hasattr(source, 'read') else \
+                getattr(source, 'name', 'stream.csv')
+            filename = os.fspath(name) if isinstance(name, os.PathLike) \
+                else str(name)
+        ecg = cls.__new__(cls)
+        ecg._configure(filename, **options)
+        ecg.import_csv(source)
+        ecg._export_if(export)
+        return ecg
+
+    @property
+    def time(self):
+        return self._time
+
+    @time.setter
+    def time(self, value):
+        self._time = value
+        self.invalidate()
+
+    @property
+    def voltage(self):
+        return self._voltage
+
+    @voltage.setter
+    def voltage(self, value):
+        self._voltage = self._stored(value)
+        self.invalidate()
+
+    def _stored(self, voltage):
+        if self.low_memory and voltage.dtype != np.float32:
+            return voltage.astype(np.float32)
+        return voltage
+
+    @property
+    def voltage_extremes(self):
+        return self._lazy('voltage_extremes', self.find_volt_extrema)
+
+    @property
+    def quality(self):
+        return self._lazy('quality', self.find_quality)
+
+    @property
+    def duration(self):
+        return self._lazy('duration', self.find_duration)
+
+    @property
+    def beats(self):
+        return self._lazy('beats', self.find_beats)
+
+    @property
+    def num_beats(self):
+        return self._lazy('num_beats', self.find_num_beats)
+
+    @property
+    def mean_hr_bpm(self):
+        return self._lazy('mean_hr_bpm', self.find_mean_hr_bpm)
+
+    def _lazy(self, name, find):
+        if name not in self._derived:
+            find()
+        return self._derived[name]
+
+    def _num_samples(self):
+        return self._voltage.size if hasattr(self, '_voltage') else None
+
+    def _substage(self, name):
+        if self.stats is None:
+            return nullcontext()
+        return self.stats.stage(name, self._num_samples())
+
+    def invalidate(self):
+        '''Class method to clear the cached attributes derived from the
+        trace, so that they are recomputed on their next access
+        '''
+        self._derived = {}
 
-    def import_csv(self):
-        '''Class method to import CSV
+    @_stage('import_csv')
+    def import_csv(self, source=None):
+        '''Class method to import CSV. Rows with non-numeric or missing
+        entries are dropped, see ecg_io.read_csv. With the cache enabled
+        the trace is memory-mapped from its binary copy when available
 
+        :param source (str, path-like or file-like, default=None): CSV to
+            import. By default the filename in the 'test_data' folder
         :return time (numpy array): array of the sampled times in ECG trace
         :return voltage (numpy array): array of the sampled voltages in ECG
             trace
+        :return dropped_rows (dict): number of rows dropped because they
+            were 'non_numeric' or 'missing'
         '''
-        import pandas
-        import logging
-        import os
-        import numpy as np
-
+        if hasattr(source, 'read'):
+            self.time, self.voltage, self.dropped_rows = read_csv(source)
+            self._log_dropped()
+            return
         try:
-            full_file = os.path.join(os.path.dirname(__file__),
-                                     '../test_data/',
-                                     self.filename)
-            imported_file = pandas.read_csv(full_file,
-                                            header=None,
-                                            names=['time', 'voltage'],
-                                            skipinitialspace=True)
+            if source is None:
+                full_file = os.path.join(os.path.dirname(__file__),
+                                         '../test_data/',
+                                         self.filename)
+            else:
+                full_file = os.fspath(source)
+            size = os.path.getsize(full_file)  # where tail resumes reading
+            if self.cache:
+                cache_dir = None if self.cache is True else self.cache
+                imported = load_trace(full_file, cache_dir=cache_dir)
+            else:
+                imported = read_csv(full_file)
+            self.time, self.voltage, self.dropped_rows = imported
+            self._source = (full_file, size)
         except FileNotFoundError:
-            logging.error('Import file not found!')
-            logging.info('Terminating execution')
+            logger.error('Import file not found!')
+            logger.info('Terminating execution')
             self.__run_flag = False
             return
-
-        time_vec = imported_file.time.values
-        voltage_vec = imported_file.voltage.values
-
-        bad_vals = []
-        if isinstance(time_vec[0], str):
-            for n, i in enumerate(time_vec):
-                try:
-                    float(i)
-                except ValueError:
-                    bad_vals.append(n)
-
-            for n, i in enumerate(voltage_vec):
-                try:
-                    float(i)
-                except ValueError:
-                    bad_vals.append(n)
-
-        time_vec = np.delete(time_vec, bad_vals)
-        voltage_vec = np.delete(voltage_vec, bad_vals)
-
-        time_vec = np.ndarray.astype(time_vec, float)
-        voltage_vec = np.ndarray.astype(voltage_vec, float)
-
-        nan_index_time = np.argwhere(np.isnan(time_vec))
-        nan_index_voltage = np.argwhere(np.isnan(voltage_vec))
-        all_nans = np.vstack((nan_index_time, nan_index_voltage))
-
-        if all_nans.size != 0:
-            self.time = np.delete(time_vec, all_nans)
-            self.voltage = np.delete(voltage_vec, all_nans)
-            logging.warning('Removed NaN rows from the array')
+        self._log_dropped()
+
+    def _log_dropped(self):
+        if self.dropped_rows['non_numeric']:
+            logger.warning('Removed %d rows with non-numeric entries'
+                           % self.dropped_rows['non_numeric'])
+        if self.dropped_rows['missing']:
+            logger.warning('Removed %d rows with missing entries'
+                           % self.dropped_rows['missing'])
+
+        logger.info('Successfully imported CSV file')
+
+    @_stage('extend')
+    def extend(self, time, voltage):
+        '''Class method to append samples to the trace, e.g. as a recording
+        grows. The trace is kept in buffers with spare capacity, so appending
+        does not copy it every time. Attributes that were already computed
+        are updated from the new samples only: the extremes are compared to
+        the new voltages, and new beats are found with the beat period of
+        the earlier analysis by correlating the start of the trace against
+        the new samples plus a margin of two periods before them. Beats in
+        the margin are replaced. Call invalidate for a full re-analysis
+
+        :param time (array): sampled times following the current trace
+        :param voltage (array): sampled voltages, as many as times
+        '''
+        time = np.asarray(time, dtype=float).ravel()
+        voltage = np.asarray(voltage, dtype=float).ravel()
+        if time.size != voltage.size:
+            raise ValueError('time and voltage have different lengths')
+        if time.size == 0:
+            return
+        if time[0] <= self._time[-1]:
+            raise ValueError('appended times must follow the trace')
+
+        old_size = self._time.size
+        self._append_samples(time, voltage)
+
+        derived = self._derived
+        for name in ('quality', 'duration', 'num_beats', 'mean_hr_bpm'):
+            derived.pop(name, None)
+        if 'voltage_extremes' in derived:
+            low, high = derived['voltage_extremes']
+            derived['voltage_extremes'] = (min(low, np.amin(voltage)),
+                                           max(high, np.amax(voltage)))
+        if 'beat_period' in derived:
+            self._extend_beats(old_size)
         else:
-            self.time = time_vec
-            self.voltage = voltage_vec
+            derived.pop('beats', None)
 
-        logging.info('Successfully imported CSV file')
+    @_stage('tail')
+    def tail(self):
+        '''Class method to analyze the lines appended to the CSV file since
+        it was imported or last tailed, see extend. Only the new bytes are
+        read, and an incomplete last line is left for the next call
 
+        :return num_samples (int): number of samples appended
+        '''
+        if self._source is None:
+            raise ValueError('Only traces imported from a file can be tailed')
+        full_file, offset = self._source
+        with open(full_file, 'rb') as fp:
+            fp.seek(offset)
+            data = fp.read()
+        end = data.rfind(b'\n') + 1
+        if end == 0:
+            return 0
+        self._source = (full_file, offset + end)
+
+        time, voltage, dropped = read_csv(io.BytesIO(data[:end]))
+        for reason, count in dropped.items():
+            self.dropped_rows[reason] += count
+            if count:
+                logger.warning('Removed %d rows with %s entries'
+                               % (count, reason.replace('_', '-')))
+        # samples imported already, if the file grew while it was imported
+        new = time > self._time[-1]
+        self.extend(time[new], voltage[new])
+        return int(np.count_nonzero(new))
+
+    def _append_samples(self, time, voltage):
+        size = self._time.size + time.size
+        buffers = getattr(self, '_buffers', None)
+        if (buffers is None or self._time.base is not buffers[0] or
+                self._voltage.base is not buffers[1] or
+                buffers[0].size < size):
+            capacity = max(2*size, 1024)
+            buffers = (np.empty(capacity, self._time.dtype),
+                       np.empty(capacity, self._voltage.dtype))
+            buffers[0][:self._time.size] = self._time
+            buffers[1][:self._time.size] = self._voltage
+            self._buffers = buffers
+        buffers[0][self._time.size:size] = time
+        buffers[1][self._time.size:size] = voltage
+        self._time = buffers[0][:size]
+        self._voltage = buffers[1][:size]
+
+    def _extend_beats(self, old_size):
+        '''Finds the beats of the samples from old_size on, see extend
+        '''
+        period = self._derived['beat_period']
+        template = self._derived['beat_template']
+        beat_ind = np.searchsorted(self._time, self._derived['beats'])
+        # the last lags of the earlier analysis overlapped little data
+        cut = max(old_size - 2*period, 0)
+        start = max(cut - period, 0)
+
+        # times from zero keep the polynomial fit well conditioned
+        time = self._time[start:] - self._time[start]
+        voltage = remove_baseline(time, self._voltage[start:], self.baseline,
+                                  units=self.units)
+        correlation = cross_correlate(template, voltage - np.mean(voltage))
+        new_ind = detect_peaks(correlation, mpd=0.8*period, mph=0) + start
+
+        beat_ind = beat_ind[beat_ind < cut]
+        new_ind = new_ind[new_ind >= cut]
+        if beat_ind.size:
+            new_ind = new_ind[new_ind - beat_ind[-1] >= 0.8*period]
+        beat_ind = np.concatenate((beat_ind, new_ind))
+        self._derived['beats'] = self._time[beat_ind]
+
+    @_stage('find_mean_hr_bpm')
     def find_mean_hr_bpm(self, time_dur=60):
         '''Class method to find the mean heart rate during the first specified
             interval in data
@@ -119,33 +565,80 @@ class ECG:
                 entire data set is given
             :return mean_hr_bpm (float): the mean heart rate over the interval
         '''
+        self._derived['mean_hr_bpm'] = average_hr_bpm(self.beats,
+                                                      self.duration, time_dur)
+
+    @_stage('heart_rate_series')
+    def heart_rate_series(self, window=60, step=None, instantaneous=False):
+        '''Class method to find the heart rate over time
+
+        :param window (float, default=60): length of the windows over which
+            beats are counted, in the time units of the trace
+        :param step (float, default=None): spacing of consecutive window
+            starts, in the time units of the trace. By default equal to
+            window (tumbling windows), smaller values give overlapping
+            sliding windows
+        :param instantaneous (boolean, default=False): if True, ignore the
+            windows and return the heart rate of every RR interval instead
+        :return times (numpy array): start of each window, or the time of
+            the second beat of each RR interval if instantaneous
+        :return hr_bpm (numpy array): heart rate in beats per minute,
+            whatever the units. Only windows that fit entirely in the trace
+            are returned
+        '''
         beat_times = self.beats
-
-        if time_dur >= self.duration:
-            self.mean_hr_bpm = 60*len(beat_times)/self.duration
-        else:
-            beat_num = len([i for i in beat_times if beat_times <= time_dur])
-            self.mean_hr_bpm = 60*beat_num/time_dur
-
+        # beats per time unit of the trace to beats per minute, with the
+        # units find_duration accepts
+        per_minute = 1 if self.units == 'min' else 60
+        if instantaneous:
+            return beat_times[1:], per_minute/np.diff(beat_times)
+
+        if step is None:
+            step = window
+        if window <= 0 or step <= 0:
+            raise ValueError('window and step must be positive')
+        num_windows = int(np.floor((self.time[-1] - self.time[0] - window) /
+                                   step)) + 1
+        starts = self.time[0] + step*np.arange(max(num_windows, 0))
+        counts = (np.searchsorted(beat_times, starts + window, side='left') -
+                  np.searchsorted(beat_times, starts, side='left'))
+        return starts, per_minute*counts/window
+
+    @_stage('find_volt_extrema')
     def find_volt_extrema(self):
         '''Class method to find the voltage extremes in ECG trace
 
         :return voltage_extremes (tuple): the minimum and maximum voltage
-            values sampled
+            values sampled, from the quality statistics
         '''
-        from numpy import amin, amax
-        import logging
-        self.voltage_extremes = (amin(self.voltage), amax(self.voltage))
+        quality = self.quality
+        voltage_extremes = (quality['voltage_min'], quality['voltage_max'])
+        self._derived['voltage_extremes'] = voltage_extremes
         ecg_range = 300
-        if (self.voltage_extremes[1] - self.voltage_extremes[0]) > ecg_range:
-            logging.warning('Data set exceeds ECG specifications')
+        if (voltage_extremes[1] - voltage_extremes[0]) > ecg_range:
+            logger.warning('Data set exceeds ECG specifications')
+
+    @_stage('find_quality')
+    def find_quality(self):
+        '''Class method to gather the statistics of the trace in one chunked
+        pass and to check its quality, see signal_quality.signal_stats. NaN
+        samples, which only arrays passed to from_arrays can hold, are left
+        out of the voltage statistics
+
+        :return quality (dict): the signal_stats of the trace, 'usable',
+            False if searching for beats is pointless, and 'problems', a
+            list of the issues found, see signal_quality.assess
+        '''
+        quality = signal_stats(self.time, self.voltage)
+        quality['usable'], quality['problems'] = assess(quality)
+        self._derived['quality'] = quality
 
+    @_stage('find_duration')
     def find_duration(self):
         '''Class method to find the duration of ECG trace in seconds
 
         :return duration (float): the total time of the sampled ECG
         '''
-        import logging
         if self.units == 'sec':
             net_dur = self.time[-1] - self.time[0]
         elif self.units == 'min':
@@ -154,78 +647,219 @@ class ECG:
             print('This program is not for hummingbirds')
             net_dur = self.time[-1] - self.time[0]
         else:
-            net_dur = self.duration
+            net_dur = self.time[-1] - self.time[0]
             print('Assuming seconds for time')
-            logging.warning('Assuming seconds for time')
-        self.duration = net_dur
+            logger.warning('Assuming seconds for time')
+        self._derived['duration'] = net_dur
 
+    @_stage('find_num_beats')
     def find_num_beats(self):
         '''Class method to find the total number of beats in the data set
 
             :return num_beats (int): the number of beats found by the program
         '''
-        self.num_beats = len(self.beats)
+        self._derived['num_beats'] = len(self.beats)
 
+    @_stage('find_beats')
     def find_beats(self):
         '''Class method to find the heart beats during the data set
 
         :return beats (list): the times at which a heart beat was found
         '''
-        import numpy as np
-        import logging
-        from math import floor
-        from detect_peaks import detect_peaks
+        quality = self.quality
+        if not quality['usable']:
+            logger.warning('Skipped the beat search: %s'
+                           % ', '.join(quality['problems']))
+            self._derived['beats'] = self.time[:1]
+            return
 
-        voltage = self.voltage
-        time = self.time
+        with self._substage('resample'):
+            time, voltage = self.analysis_samples()
+        if self.segment is not None:
+            self._find_segmented_beats(time, voltage)
+            return
 
-        try:
-            baseline_coeffs = np.polyfit(time, voltage, 7)
-            voltage = voltage - np.polyval(baseline_coeffs, time)
-        except np.linalg.LinAlgError:
-            print('Could not remove baseline drift (if it exists)')
-            logging.warning('Could not remove baseline drift')
-
-        unbias = voltage - np.mean(voltage)
-        norm = sum(unbias**2)
-        auto_corr = np.correlate(unbias, unbias, mode="full")/norm
-        auto_corr = auto_corr[floor(len(auto_corr)/2):]
-
-        pre_peak_index = detect_peaks(auto_corr, mpd=5, mph=0)
-        sorted_auto_corr = sorted(auto_corr[pre_peak_index])
-
-        beat_ind = np.asarray([0])
-        index = -1
-        while (beat_ind.size/self.duration < 0.3):
-            first_dist = np.where(auto_corr == sorted_auto_corr[index])[0][0]
-            beat_ind = detect_peaks(np.insert(auto_corr, 0, 0),
-                                    mpd=0.8*first_dist,
-                                    mph=0)
-            beat_ind = beat_ind - 1
-            index = index - 1
-
-        self.beats = self.time[beat_ind]
-
-    def export_json(self):
-        '''Class method to export the class attributes as a JSON file
+        # the steps are shared with sweep, which varies their parameters
+        with self._substage('baseline'):
+            voltage = detrend(time, voltage, self.baseline, self.units,
+                              self.low_memory)
+        with self._substage('autocorrelation'):
+            unbias, auto_corr = trace_autocorrelation(
+                voltage, self.autocorr, in_place=self.low_memory)
+        with self._substage('candidate_peaks'):
+            pre_peak_index = candidate_peaks(auto_corr)
+        with self._substage('period'):
+            first_dist = estimate_period(auto_corr, pre_peak_index,
+                                         self.duration, min_rate=0.3)
+        if first_dist is None:
+            logger.warning('No beat period found in the autocorrelation')
+        with self._substage('beat_peaks'):
+            beat_ind = beat_indices(auto_corr, first_dist)
+        if beat_ind.size/self.duration < 0.3:
+            logger.warning('Fewer than 0.3 beats per second were found')
+
+        self._derived['beats'] = time[beat_ind]
+        if first_dist is not None and time is self.time:
+            # kept for extend, which reuses the period instead of redoing
+            # the autocorrelation of the whole trace
+            self._derived['beat_period'] = int(first_dist)
+            self._derived['beat_template'] = \
+                unbias[:TEMPLATE_PERIODS*int(first_dist)].copy()
+
+    def _find_segmented_beats(self, time, voltage):
+        '''Beats of the segmented search, see segment
+        '''
+        options = self.segment if isinstance(self.segment, dict) else \
+            {'window': self.segment}
+        with self._substage('segments'):
+            beats = find_segmented_beats(time, voltage, units=self.units,
+                                         baseline=self.baseline,
+                                         autocorr=self.autocorr, **options)
+        if beats.size == 0:
+            logger.warning('No beat period found in any segment')
+            beats = time[:1]
+        if beats.size/self.duration < 0.3:
+            logger.warning('Fewer than 0.3 beats per second were found')
+        self._derived['beats'] = beats
+
+    def analysis_samples(self):
+        '''Class method to get the samples beats are found in, resampled
+        as resample_rate asks
+
+        :return time (numpy array): sampled times, the trace itself
+            without resampling
+        :return voltage (numpy array): voltages at those times
         '''
-        import json
-        import logging
-        import os
+        if self.resample_rate is None:
+            return self.time, self.voltage
+        rate = None
+        if self.resample_rate != 'uniform':
+            # samples per time unit of the trace
+            rate = self.resample_rate*(60 if self.units == 'min' else 1)
+        return resample(self.time, self.voltage, rate)
+
+    @_stage('export_json')
+    def export_json(self, mode='full', path=None, chunk_size=65536):
+        '''Class method to export the class attributes as a JSON file
 
-        savefile = self.filename[:self.filename.rfind('.')] + '.json'
-        full_file = os.path.join(
-                os.path.dirname(__file__), '../JSON/') + savefile
+        :param mode (str, default='full'): 'full' writes every attribute,
+            including the time and voltage arrays, as indented JSON.
+            'summary' leaves out the time and voltage arrays. 'stream'
+            writes the same content as 'full' without indentation, chunk
+            by chunk, so the arrays are never converted to lists at once
+        :param path (str, default=None): output file. By default the name
+            of the CSV with a .json extension in the 'JSON' folder one
+            level higher than where the module resides
+        :param chunk_size (int, default=65536): samples per chunk in
+            'stream' mode
+        '''
+        full_file = path if path is not None else self._export_path('.json')
+        run_dict = self._summary_dict()
+
+        if mode == 'full':
+            run_dict['time'] = self.time.tolist()
+            run_dict['voltage'] = self.voltage.tolist()
+            with open(full_file, 'w') as fp:
+                json.dump(run_dict, fp, sort_keys=True, indent=4)
+        elif mode == 'summary':
+            with open(full_file, 'w') as fp:
+                json.dump(run_dict, fp, sort_keys=True, indent=4)
+        elif mode == 'stream':
+            arrays = {'time': self.time, 'voltage': self.voltage}
+            run_dict.update(arrays)
+            with open(full_file, 'w') as fp:
+                fp.write('{')
+                for n, key in enumerate(sorted(run_dict)):
+                    fp.write('%s%s: ' % (', ' if n else '', json.dumps(key)))
+                    if key in arrays:
+                        _write_json_array(fp, arrays[key], chunk_size)
+                    else:
+                        json.dump(run_dict[key], fp)
+                fp.write('}')
+        else:
+            raise ValueError('Unknown export mode: %s' % mode)
 
-        run_dict = {'time': self.time.tolist(),
-                    'voltage': self.voltage.tolist(),
-                    'duration': self.duration,
-                    'voltage_extremes': self.voltage_extremes,
-                    'num_beats': self.num_beats,
-                    'beats': self.beats.tolist(),
-                    'units': self.units}
+        logger.info('Saved JSON file successfully')
 
-        with open(full_file, 'w') as fp:
-            json.dump(run_dict, fp, sort_keys=True, indent=4)
+    @_stage('export_npz')
+    def export_npz(self, path=None, float32=False, compressed=False):
+        '''Class method to export the trace and attributes as a NumPy .npz
+        archive, which stores the arrays as binary columns
 
-        logging.info('Saved JSON file successfully')
+        :param path (str, default=None): output file, by default as for
+            export_json with a .npz extension
+        :param float32 (boolean, default=False): store time and voltage as
+            float32, halving the file size. Otherwise times are stored as
+            float64 and voltages in their dtype, float32 with low_memory
+        :param compressed (boolean, default=False): compress the archive
+        '''
+        full_file = path if path is not None else self._export_path('.npz')
+        time, voltage = self._columns(float32)
+        save = np.savez_compressed if compressed else np.savez
+        save(full_file,
+             time=time,
+             voltage=voltage,
+             beats=self.beats,
+             duration=self.duration,
+             voltage_extremes=np.asarray(self.voltage_extremes),
+             num_beats=self.num_beats,
+             units=self.units)
+
+        logger.info('Saved NPZ file successfully')
+
+    @_stage('export_parquet')
+    def export_parquet(self, path=None, float32=False):
+        '''Class method to export the trace as a Parquet table with time
+        and voltage columns. The other attributes are stored as JSON in
+        the table metadata. Requires pyarrow
+
+        :param path (str, default=None): output file, by default as for
+            export_json with a .parquet extension
+        :param float32 (boolean, default=False): store time and voltage as
+            float32, see export_npz
+        '''
+        import pyarrow
+        import pyarrow.parquet
+
+        full_file = path if path is not None else \
+            self._export_path('.parquet')
+        time, voltage = self._columns(float32)
+        table = pyarrow.table({'time': time, 'voltage': voltage})
+        metadata = {b'ecg': json.dumps(self._summary_dict(), sort_keys=True)}
+        table = table.replace_schema_metadata(metadata)
+        pyarrow.parquet.write_table(table, full_file)
+
+        logger.info('Saved Parquet file successfully')
+
+    def _columns(self, float32):
+        '''Time and voltage columns of the binary exports. Times stay
+        float64 unless float32 is asked for, as the beat times need
+        '''
+        if float32:
+            return (np.asarray(self.time, dtype=np.float32),
+                    np.asarray(self.voltage, dtype=np.float32))
+        return np.asarray(self.time, dtype=np.float64), self.voltage
+
+    def _summary_dict(self):
+        return {'duration': float(self.duration),
+                'voltage_extremes': [float(v) for v in self.voltage_extremes],
+                'num_beats': int(self.num_beats),
+                'beats': self.beats.tolist(),
+                'units': self.units}
+
+    def _export_path(self, extension):
+        name = os.path.basename(self.filename)
+        savefile = name[:name.rfind('.')] + extension
+        return os.path.join(os.path.dirname(__file__), '../JSON/', savefile)
+
+
+def _write_json_array(fp, array, chunk_size):
+    '''Writes an array as a JSON list, converting chunk_size values at a
+    time
+    '''
+    fp.write('[')
+    for start in range(0, len(array), chunk_size):
+        if start:
+            fp.write(', ')
+        fp.write(json.dumps(array[start:start + chunk_size].tolist())[1:-1])
+    fp.write(']')
@@ -0,0 +1,101 @@
+"""Timing and memory instrumentation of the ECG pipeline stages."""
+
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class StageStats:
+    '''Collects one record per executed pipeline stage.
+
+    Each record holds the stage name, its wall time, the number of samples
+    it worked on, its nesting depth (find_beats contains the baseline,
+    autocorrelation and peak stages) and, with memory tracking, the peak
+    memory allocated during the stage as seen by tracemalloc.
+
+    :attribute records (list): dicts with 'stage', 'seconds', 'size',
+        'depth' and, when tracking memory, 'peak_bytes'
+    :attribute memory (bool): whether peak allocations are tracked
+    :attribute callback (callable): called with each finished record
+    '''
+    def __init__(self, memory=False, callback=None):
+        '''__init__ method of the StageStats class
+
+        :param memory (boolean, default=False): track peak allocations with
+            tracemalloc, which is started if needed. This slows the
+            pipeline down noticeably, timings are best taken without it
+        :param callback (callable, default=None): called with every record
+            once its stage has finished, e.g. to forward it to a metrics
+            system
+        '''
+        self.records = []
+        self.memory = memory
+        self.callback = callback
+        self._open = []  # [start allocation, peak allocation] per stage
+
+    @contextmanager
+    def stage(self, name, size=None):
+        '''Context manager measuring one stage
+
+        :param name (str): stage name
+        :param size (int, default=None): number of samples processed. The
+            yielded record can be updated when it is only known later
+        :return record (dict): the record of the stage, appended to records
+            when the stage finishes
+        '''
+        record = {'stage': name, 'size': size, 'depth': len(self._open)}
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            current, peak = tracemalloc.get_traced_memory()
+            for frame in self._open:
+                frame[1] = max(frame[1], peak)
+            tracemalloc.reset_peak()
+            self._open.append([current, current])
+        else:
+            self._open.append(None)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            frame = self._open.pop()
+            if frame is not None:
+                peak = max(frame[1], tracemalloc.get_traced_memory()[1])
+                record['peak_bytes'] = peak - frame[0]
+                for parent in self._open:
+                    parent[1] = max(parent[1], peak)
+            self.records.append(record)
+            if self.callback is not None:
+                self.callback(record)
+
+    def to_records(self):
+        '''Returns a copy of the records
+
+        :return records (list): one dict per finished stage
+        '''
+        return [dict(record) for record in self.records]
+
+    def totals(self):
+        '''Sums the wall time of every stage name
+
+        :return totals (dict): stage name to total seconds
+        '''
+        totals = {}
+        for record in self.records:
+            totals[record['stage']] = (totals.get(record['stage'], 0) +
+                                       record['seconds'])
+        return totals
+
+    def to_json(self, path=None):
+        '''Exports the records as JSON
+
+        :param path (str, default=None): file to write, if any
+        :return text (str): the JSON document
+        '''
+        text = json.dumps(self.records, indent=4)
+        if path is not None:
+            with open(path, 'w') as fp:
+                fp.write(text)
+        return text
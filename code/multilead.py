@@ -0,0 +1,216 @@
+"""Multi-lead ECG analysis with the leads processed in batches.
+
+All leads of a recording share one time column, so the CSV is parsed once,
+the polynomial baselines of all leads come from one least-squares solve,
+and their autocorrelations from one batched FFT. Only the peak detection
+runs lead by lead. The beats of the leads are then fused into a consensus.
+"""
+
+import os
+
+import numpy as np
+
+from autocorrelation import autocorrelate, estimate_period
+from baseline import remove_baseline
+from ecg_io import read_leads
+from heart_rate import average_hr_bpm, beat_indices, candidate_peaks
+from signal_quality import mean_energy
+
+
+class MultiLeadECG:
+    '''Class to describe multi-lead ECG trace data, the counterpart of
+    heart_rate.ECG for CSV files with a time column and one voltage column
+    per lead
+
+    :attribute filename (str): CSV filename from which data was imported
+    :attribute time (array): sampled times shared by the leads
+    :attribute voltage (array): sampled voltages, one row per lead
+    :attribute lead_names (list): lead names from the CSV header, or
+        'lead 1', 'lead 2'... without header
+    :attribute dropped_rows (dict): number of CSV rows dropped on import
+        because of 'non_numeric' or 'missing' entries
+    :attribute voltage_extremes (tuple): minimum and maximum sampled voltage
+        of every lead
+    :attribute duration (float): total time of ECG sampling
+    :attribute lead_beats (list): beat times found in every lead
+    :attribute beats (array): consensus beat times of the leads
+    :attribute num_beats (int): number of consensus beats
+    :attribute mean_hr_bpm (float): average heart rate over the first
+        minute, from the consensus beats
+
+    The attributes after dropped_rows are computed on first access and
+    cached.
+    '''
+    def __init__(self, filename, units='sec', autocorr='fft',
+                 baseline='polyfit', tolerance=0.1, min_leads=None):
+        '''__init__ method of the MultiLeadECG class
+
+        :param filename (str): CSV file containing the time and voltages of
+            the leads, looked up as by heart_rate.ECG
+        :param units (str, default='sec'): time units, 'sec' or 'min'
+        :param autocorr (str, default='fft'): autocorrelation method
+        :param baseline (str or callable, default='polyfit'): baseline
+            removal, see baseline.remove_baseline
+        :param tolerance (float, default=0.1): largest spread, in the time
+            units, of the lead beats fused into one consensus beat
+        :param min_leads (int, default=None): number of leads a consensus
+            beat needs to be found in, by default a majority of the leads
+        '''
+        self.filename = filename
+        self.units = units
+        self.autocorr = autocorr
+        self.baseline = baseline
+        self.tolerance = tolerance
+        self.min_leads = min_leads
+        self._derived = {}
+        self.import_csv()
+
+    @property
+    def voltage_extremes(self):
+        return self._lazy('voltage_extremes', self.find_volt_extrema)
+
+    @property
+    def duration(self):
+        return self._lazy('duration', self.find_duration)
+
+    @property
+    def lead_beats(self):
+        return self._lazy('lead_beats', self.find_lead_beats)
+
+    @property
+    def beats(self):
+        return self._lazy('beats', self.find_beats)
+
+    @property
+    def num_beats(self):
+        return len(self.beats)
+
+    @property
+    def mean_hr_bpm(self):
+        return self._lazy('mean_hr_bpm', self.find_mean_hr_bpm)
+
+    def _lazy(self, name, find):
+        if name not in self._derived:
+            find()
+        return self._derived[name]
+
+    def import_csv(self):
+        '''Class method to import the CSV, see ecg_io.read_leads
+        '''
+        full_file = os.path.join(os.path.dirname(__file__), '../test_data/',
+                                 self.filename)
+        self.time, self.voltage, names, self.dropped_rows = \
+            read_leads(full_file)
+        if names is None:
+            names = ['lead %d' % (i + 1) for i in range(len(self.voltage))]
+        self.lead_names = names
+        self._derived = {}
+
+    def find_volt_extrema(self):
+        '''Class method to find the voltage extremes of every lead
+
+        :return voltage_extremes (tuple): arrays of the minimum and maximum
+            voltage of the leads
+        '''
+        self._derived['voltage_extremes'] = (np.amin(self.voltage, axis=1),
+                                             np.amax(self.voltage, axis=1))
+
+    def find_duration(self):
+        '''Class method to find the duration of the trace in seconds
+
+        :return duration (float): the total time of the sampled ECG
+        '''
+        duration = self.time[-1] - self.time[0]
+        if self.units == 'min':
+            duration = duration*60
+        self._derived['duration'] = duration
+
+    def find_lead_beats(self):
+        '''Class method to find the beats of every lead, as
+        heart_rate.ECG.find_beats does for a single lead
+
+        :return lead_beats (list): beat times of every lead
+        '''
+        beat_ind = find_lead_beats(self.time, self.voltage, self.duration,
+                                   self.autocorr, self.baseline, self.units)
+        self._derived['lead_beats'] = [self.time[ind] for ind in beat_ind]
+
+    def find_beats(self):
+        '''Class method to fuse the beats of the leads, see consensus_beats
+
+        :return beats (array): consensus beat times
+        '''
+        min_leads = self.min_leads
+        if min_leads is None:
+            min_leads = len(self.voltage)//2 + 1
+        self._derived['beats'] = consensus_beats(self.lead_beats,
+                                                 self.tolerance, min_leads)
+
+    def find_mean_hr_bpm(self, time_dur=60):
+        '''Class method to find the mean heart rate during the first specified
+        interval, as heart_rate.ECG.find_mean_hr_bpm
+
+        :param time_dur (default=60): interval in seconds
+        :return mean_hr_bpm (float): the mean heart rate over the interval
+        '''
+        self._derived['mean_hr_bpm'] = average_hr_bpm(self.beats,
+                                                      self.duration, time_dur)
+
+
+def find_lead_beats(time, voltage, duration, autocorr='fft',
+                    baseline='polyfit', units='sec'):
+    '''Finds the beats of several leads sampled at the same times. The
+    baseline removal and autocorrelation process all leads at once
+
+    :param time (array): sampled times
+    :param voltage (array): sampled voltages, one row per lead
+    :param duration (float): duration of the trace in seconds
+    :param autocorr (str, default='fft'): autocorrelation method
+    :param baseline (str or callable, default='polyfit'): baseline removal
+    :param units (str, default='sec'): time units, 'sec' or 'min'
+    :return beat_ind (list): sample indices of the beats of every lead
+    '''
+    voltage = remove_baseline(time, np.atleast_2d(voltage), baseline,
+                              units=units)
+    # the steps of heart_rate.ECG.find_beats, with one batched FFT
+    mean, norm = np.array([mean_energy(lead) for lead in voltage]).T
+    unbias = voltage - mean[:, np.newaxis]
+    auto_corr = autocorrelate(unbias, method=autocorr,
+                              norm=norm[:, np.newaxis], axis=1)
+
+    beat_ind = []
+    for lead_corr in auto_corr:
+        period = estimate_period(lead_corr, candidate_peaks(lead_corr),
+                                 duration, min_rate=0.3)
+        beat_ind.append(beat_indices(lead_corr, period))
+    return beat_ind
+
+
+def consensus_beats(lead_beats, tolerance=0.1, min_leads=1):
+    '''Fuses the beats found in several leads. The beats of all leads are
+    sorted and split into clusters wherever consecutive beats are more than
+    tolerance apart. Clusters found in at least min_leads different leads
+    become a beat at the median time of the cluster
+
+    :param lead_beats (list): beat times of every lead
+    :param tolerance (float, default=0.1): largest gap within a cluster
+    :param min_leads (int, default=1): leads a cluster has to appear in
+    :return beats (numpy array): consensus beat times
+    '''
+    sizes = [len(beats) for beats in lead_beats]
+    if sum(sizes) == 0:
+        return np.empty(0)
+    times = np.concatenate(lead_beats).astype(float)
+    leads = np.repeat(np.arange(len(lead_beats)), sizes)
+    order = np.argsort(times, kind='stable')
+    times = times[order]
+    leads = leads[order]
+
+    cluster = np.concatenate(([0], np.cumsum(np.diff(times) > tolerance)))
+    num_clusters = cluster[-1] + 1
+    pairs = np.unique(cluster*len(lead_beats) + leads)
+    support = np.bincount(pairs//len(lead_beats), minlength=num_clusters)
+
+    bounds = np.searchsorted(cluster, np.arange(num_clusters + 1))
+    return np.array([np.median(times[bounds[i]:bounds[i + 1]])
+                     for i in np.flatnonzero(support >= min_leads)])
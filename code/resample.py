@@ -0,0 +1,116 @@
+"""Resampling of ECG traces onto a uniform time grid.
+
+The beat detection treats sample indices as time lags, so it assumes
+uniform sampling. Traces with dropped samples, gaps or jittered clocks are
+interpolated onto a uniform grid first, and traces sampled faster than the
+beat detection needs can be decimated onto a coarser one, which shortens
+every later stage. Traces that already are uniform at the requested rate
+are passed through without copying.
+"""
+
+import numpy as np
+
+CHUNK_SIZE = 65536
+
+
+def is_uniform(time, tolerance=0.45, chunk_size=CHUNK_SIZE):
+    '''Checks that samples lie on a uniform grid. Every time is compared to
+    the grid of equal steps from the first to the last time, chunk by
+    chunk, stopping at the first chunk that is off the grid. Below half an
+    interval every sample is nearest to its own grid point, so timestamps
+    rounded to less than a sampling interval, e.g. to the millisecond,
+    still count as uniform while a dropped sample does not
+
+    :param time (array): sampled times
+    :param tolerance (float, default=0.45): largest distance from the grid,
+        in sampling intervals
+    :param chunk_size (int, default=65536): samples compared at once
+    :return uniform (boolean): whether all times are within tolerance
+    '''
+    time = np.asarray(time)
+    size = time.size
+    if size < 3:
+        return size < 2 or time[1] > time[0]
+    step = (time[-1] - time[0])/(size - 1)
+    if not step > 0:
+        return False
+    for start in range(0, size, chunk_size):
+        chunk = time[start:start + chunk_size]
+        grid = time[0] + step*np.arange(start, start + chunk.size)
+        if not np.all(np.abs(chunk - grid) <= tolerance*step):
+            return False
+    return True
+
+
+def sample_interval(time):
+    '''Estimates the sampling interval of a trace as its duration over the
+    number of intervals, counting the samples missing from steps longer
+    than 1.5 mean steps. Unlike the median step, this is not thrown off by
+    rounded timestamps
+
+    :param time (array): sampled times, increasing
+    :return interval (float): sampling interval
+    '''
+    steps = np.diff(time)
+    span = time[-1] - time[0]
+    gaps = steps[steps > 1.5*span/steps.size]
+    missing = np.sum(np.round(gaps*steps.size/span)) - gaps.size
+    return float(span/(steps.size + missing))
+
+
+def resample(time, voltage, rate=None, tolerance=0.45):
+    '''Puts a trace on a uniform time grid
+
+    Non-uniform traces are linearly interpolated onto a grid starting at
+    the first time. When decimating, the voltage is first averaged over the
+    samples of one new interval, so that the spikes are not aliased
+
+    :param time (array): sampled times, increasing
+    :param voltage (array): sampled voltages, as many as times
+    :param rate (float, default=None): samples per time unit of the grid.
+        None keeps the sampling interval of the trace
+    :param tolerance (float, default=0.45): see is_uniform
+    :return time (numpy array): uniform times, the input itself when it
+        was uniform at the rate already
+    :return voltage (numpy array): voltages at those times, of the input
+        dtype
+    '''
+    time = np.asarray(time)
+    voltage = np.asarray(voltage)
+    if time.shape != voltage.shape or time.ndim != 1:
+        raise ValueError('time and voltage must be 1-D and of the same '
+                         'length')
+    if time.size < 2:
+        return time, voltage
+    uniform = is_uniform(time, tolerance)
+    if uniform:
+        interval = (time[-1] - time[0])/(time.size - 1)
+    else:
+        if np.any(np.diff(time) <= 0):
+            raise ValueError('times must increase to be resampled')
+        interval = sample_interval(time)
+    new_interval = interval if rate is None else 1/rate
+    if uniform and abs(new_interval - interval) <= 1e-6*interval:
+        return time, voltage
+
+    factor = new_interval/interval
+    if factor >= 2:
+        # odd, so that the average is centred on the sample
+        voltage = _moving_average(voltage, 2*int(factor//2) + 1)
+    size = int(np.floor((time[-1] - time[0])/new_interval + 1e-9)) + 1
+    new_time = time[0] + new_interval*np.arange(size)
+    new_voltage = np.interp(new_time, time, voltage)
+    return new_time, new_voltage.astype(voltage.dtype, copy=False)
+
+
+def _moving_average(voltage, width):
+    '''Centred running mean over an odd number of samples, narrowed
+    symmetrically at the ends
+    '''
+    sums = np.concatenate(([0.0], np.cumsum(voltage, dtype=np.float64)))
+    index = np.arange(voltage.size)
+    half = np.minimum(np.minimum(index, index[::-1]), width//2)
+    low = index - half
+    high = index + half + 1
+    return ((sums[high] - sums[low])/(high - low)).astype(voltage.dtype,
+                                                          copy=False)
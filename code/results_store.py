@@ -0,0 +1,243 @@
+"""Columnar, array-backed store of the results of many ECG analyses.
+
+Each summary field is one numpy array with a row per recording. The beat
+times of all recordings are concatenated into a single ragged array, with
+an offsets array giving where the beats of each recording start, so that
+thousands of results take a handful of arrays instead of one JSON file
+each. A store is saved as one .npy file per array and memory-mapped when
+loaded.
+
+Usage:
+    store = ResultsStore()
+    store.extend(analyze_many(paths, keep_beats=True))
+    fast = store.select(store['mean_hr_bpm'] > 120)
+    store.save('results')
+    store = ResultsStore.load('results')
+"""
+
+import os
+
+import numpy as np
+
+# numeric columns: name -> (dtype, shape of one row)
+COLUMNS = {'duration': (np.float64, ()),
+           'voltage_extremes': (np.float64, (2,)),
+           'num_beats': (np.int64, ()),
+           'mean_hr_bpm': (np.float64, ())}
+TEXT_COLUMNS = ('filename', 'error')
+
+
+class ResultsStore:
+    '''Growable table of per-recording summaries with ragged beat times
+
+    Rows are appended in amortized constant time: the arrays are allocated
+    with spare capacity which is doubled when it runs out. Columns are
+    returned as views on the filled rows, so queries are plain vectorized
+    numpy expressions, e.g. store['mean_hr_bpm'] > 120.
+
+    :attribute offsets (numpy array): the beats of recording i are
+        all_beats[offsets[i]:offsets[i + 1]]
+    :attribute all_beats (numpy array): beat times of every recording
+    '''
+    def __init__(self, capacity=1024, beat_capacity=65536):
+        '''__init__ method of the ResultsStore class
+
+        :param capacity (int, default=1024): recordings allocated up front
+        :param beat_capacity (int, default=65536): beats allocated up front
+        '''
+        self._size = 0
+        self._num_beats = 0
+        self._text = {name: [] for name in TEXT_COLUMNS}
+        self._columns = {name: np.empty((max(capacity, 1),) + shape, dtype)
+                         for name, (dtype, shape) in COLUMNS.items()}
+        self._offsets = np.zeros(max(capacity, 1) + 1, dtype=np.int64)
+        self._beats = np.empty(max(beat_capacity, 1))
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, name):
+        '''Column of the filled rows
+
+        :param name (str): 'filename', 'error' or one of COLUMNS
+        :return column (numpy array): view of a numeric column, or an array
+            of strings ('' for recordings without error)
+        '''
+        if name in self._text:
+            return np.array(self._text[name], dtype=str)
+        return self._columns[name][:self._size]
+
+    @property
+    def offsets(self):
+        return self._offsets[:self._size + 1]
+
+    @property
+    def all_beats(self):
+        return self._beats[:self._num_beats]
+
+    @property
+    def failed(self):
+        '''Boolean mask of the recordings whose analysis failed
+        '''
+        return np.array([error != '' for error in self._text['error']],
+                        dtype=bool)
+
+    def beats(self, index):
+        '''Beat times of one recording
+
+        :param index (int): row of the recording
+        :return beats (numpy array): view into all_beats
+        '''
+        if not -self._size <= index < self._size:
+            raise IndexError('recording index out of range')
+        index %= self._size
+        return self._beats[self._offsets[index]:self._offsets[index + 1]]
+
+    def beat_owner(self):
+        '''Row of the recording every beat of all_beats belongs to, to
+        group or filter beats across recordings without a loop
+
+        :return owner (numpy array): recording index per beat
+        '''
+        return np.repeat(np.arange(self._size), np.diff(self.offsets))
+
+    def append(self, summary):
+        '''Adds the results of one recording
+
+        :param summary (dict): as returned by batch.summarize, with the
+            'beats' entry when the beats should be stored. Failed analyses
+            (error not None) get NaN fields and no beats
+        '''
+        beats = np.asarray(summary.get('beats', ()), dtype=np.float64)
+        error = summary.get('error')
+        if error:
+            beats = beats[:0]
+        self._reserve(self._size + 1, self._num_beats + beats.size)
+
+        row = self._size
+        self._text['filename'].append(str(summary['filename']))
+        self._text['error'].append(error or '')
+        for name, (dtype, shape) in COLUMNS.items():
+            if error:
+                value = 0 if name == 'num_beats' else np.nan
+            else:
+                value = summary[name]
+            self._columns[name][row] = value
+        self._beats[self._num_beats:self._num_beats + beats.size] = beats
+        self._num_beats += beats.size
+        self._size += 1
+        self._offsets[self._size] = self._num_beats
+
+    def extend(self, summaries):
+        '''Adds the results of many recordings, see append
+
+        :param summaries (iterable): summary dicts
+        '''
+        for summary in summaries:
+            self.append(summary)
+
+    def summary(self, index):
+        '''Results of one recording in the form of batch.summarize
+
+        :param index (int): row of the recording
+        :return summary (dict): filename, error, the numeric columns and
+            the beats
+        '''
+        index = range(self._size)[index]
+        error = self._text['error'][index]
+        summary = {'filename': self._text['filename'][index],
+                   'error': error or None}
+        if not error:
+            summary['duration'] = float(self._columns['duration'][index])
+            summary['voltage_extremes'] = \
+                self._columns['voltage_extremes'][index].tolist()
+            summary['num_beats'] = int(self._columns['num_beats'][index])
+            summary['mean_hr_bpm'] = float(
+                self._columns['mean_hr_bpm'][index])
+        summary['beats'] = self.beats(index)
+        return summary
+
+    def select(self, rows):
+        '''New store holding a subset of the recordings
+
+        :param rows (array): boolean mask over the recordings or their
+            indices, e.g. store['mean_hr_bpm'] > 120
+        :return store (ResultsStore): the selected recordings, in order
+        '''
+        rows = np.arange(self._size)[rows]
+        counts = np.diff(self.offsets)[rows]
+        offsets = np.zeros(rows.size + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        # position of every selected beat in all_beats
+        shift = np.repeat(self._offsets[rows] - offsets[:-1], counts)
+        take = np.arange(offsets[-1]) + shift
+
+        subset = ResultsStore(capacity=rows.size, beat_capacity=take.size)
+        subset._size = rows.size
+        subset._num_beats = take.size
+        for name in TEXT_COLUMNS:
+            subset._text[name] = [self._text[name][row] for row in rows]
+        for name, column in self._columns.items():
+            subset._columns[name][:rows.size] = column[rows]
+        subset._offsets[:rows.size + 1] = offsets
+        subset._beats[:take.size] = self._beats[take]
+        return subset
+
+    def save(self, directory):
+        '''Writes the store as one .npy file per array
+
+        :param directory (str): folder to write, created if needed
+        '''
+        os.makedirs(directory, exist_ok=True)
+        arrays = {name: self[name] for name in TEXT_COLUMNS}
+        arrays.update((name, self[name]) for name in COLUMNS)
+        arrays['offsets'] = self.offsets
+        arrays['beats'] = self.all_beats
+        for name, array in arrays.items():
+            np.save(os.path.join(directory, name + '.npy'), array)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        '''Reads a store written by save
+
+        :param directory (str): folder written by save
+        :param mmap (boolean, default=True): memory-map the numeric columns
+            and beats read-only instead of reading them. They are copied
+            once more recordings are appended
+        :return store (ResultsStore): the stored results
+        '''
+        mode = 'r' if mmap else None
+
+        def read(name):
+            return np.load(os.path.join(directory, name + '.npy'),
+                           mmap_mode=mode)
+
+        store = cls(capacity=1, beat_capacity=1)
+        for name in TEXT_COLUMNS:
+            store._text[name] = read(name).tolist()
+        for name in COLUMNS:
+            store._columns[name] = read(name)
+        store._offsets = read('offsets')
+        store._beats = read('beats')
+        store._size = len(store._text['filename'])
+        store._num_beats = int(store._offsets[-1])
+        return store
+
+    def _reserve(self, size, num_beats):
+        '''Grows the arrays, doubling them, to hold size recordings and
+        num_beats beats. Memory-mapped arrays are copied on first growth
+        '''
+        capacity = self._offsets.size - 1
+        if size > capacity or not self._offsets.flags.writeable:
+            capacity = max(2*capacity, size)
+            for name, column in self._columns.items():
+                grown = np.empty((capacity,) + column.shape[1:], column.dtype)
+                grown[:self._size] = column[:self._size]
+                self._columns[name] = grown
+            offsets = np.zeros(capacity + 1, dtype=np.int64)
+            offsets[:self._size + 1] = self._offsets[:self._size + 1]
+            self._offsets = offsets
+        if num_beats > self._beats.size or not self._beats.flags.writeable:
+            beats = np.empty(max(2*self._beats.size, num_beats))
+            beats[:self._num_beats] = self._beats[:self._num_beats]
+            self._beats = beats
@@ -0,0 +1,174 @@
+"""Beat detection in overlapping windows for very long recordings.
+
+ECG.find_beats estimates one beat period for the whole trace, so its
+memory grows with the recording and a heart rate that changes partway
+through a long Holter recording breaks its single-period assumption.
+find_segmented_beats splits the trace into overlapping windows instead. In
+every window the baseline is removed and the beat period is estimated from
+the autocorrelation of the window. The beats are the peaks, at least 0.8
+local periods apart, of the correlation of the window with a template: the
+first beat periods of the trace, as ECG.extend uses. Matching one template
+keeps the beats of all windows in the phase ECG reports them in, whatever
+the length of the window.
+
+Windows after the first one are independent and can run in a process
+pool. Every window keeps the beats of its own stretch of the trace, up to
+the middle of its overlaps with its neighbours, and a beat found on both
+sides of a seam is kept once.
+"""
+
+import logging
+
+import numpy as np
+
+from autocorrelation import autocorrelate, cross_correlate, estimate_period
+from baseline import remove_baseline
+from detect_peaks import detect_peaks
+from signal_quality import mean_energy
+
+logger = logging.getLogger(__name__)
+
+WINDOW = 20.0
+OVERLAP = 4.0
+# beat periods in the template, as heart_rate.TEMPLATE_PERIODS
+TEMPLATE_PERIODS = 4
+
+
+def segment_bounds(time, window=WINDOW, overlap=OVERLAP):
+    '''Splits a trace into overlapping windows. Windows start every
+    window - overlap, and the last one stretches to the end of the trace
+    rather than leaving a short window
+
+    :param time (array): sampled times, increasing
+    :param window (float, default=20.0): window length, in time units
+    :param overlap (float, default=4.0): overlap of consecutive windows
+    :return bounds (list): per window, the first and one past the last
+        sample index, and the times from and up to which its beats are
+        kept, the middles of its overlaps
+    '''
+    if not 0 <= overlap < window:
+        raise ValueError('overlap must be non-negative and shorter than the '
+                         'window')
+    step = window - overlap
+    span = time[-1] - time[0]
+    count = max(1, int(round((span - overlap)/step)))
+    bounds = []
+    for k in range(count):
+        start = time[0] + k*step
+        stop = start + window if k < count - 1 else time[-1]
+        keep_from = start + overlap/2 if k else -np.inf
+        keep_to = stop - overlap/2 if k < count - 1 else np.inf
+        bounds.append((int(np.searchsorted(time, start)),
+                       int(np.searchsorted(time, stop, side='right')),
+                       keep_from, keep_to))
+    return bounds
+
+
+def window_beats(time, voltage, template=None, baseline='polyfit',
+                 autocorr='fft', units='sec', min_rate=0.3):
+    '''Finds the beats of one window, see the module docstring
+
+    :param time (array): sampled times of the window
+    :param voltage (array): sampled voltages of the window
+    :param template (array, default=None): baseline-free start of the trace
+        to match. None takes the first TEMPLATE_PERIODS periods of the
+        window, for the first window of a trace
+    :param baseline (str or callable, default='polyfit'): baseline removal
+    :param autocorr (str, default='fft'): autocorrelation method
+    :param units (str, default='sec'): time units, 'sec' or 'min'
+    :param min_rate (float, default=0.3): lowest beat rate, per second
+    :return beat_ind (numpy array): sample indices of the beats in the
+        window, empty without a beat period
+    :return period (int): beat period in samples, None if not found
+    :return template (numpy array): the template used, None if none was
+        given and no period was found
+    '''
+    duration = (time[-1] - time[0])*(60 if units == 'min' else 1)
+    # times from zero keep the polynomial fit well conditioned
+    voltage = remove_baseline(time - time[0], voltage, baseline, units=units)
+    mean, norm = mean_energy(voltage)
+    unbias = voltage - mean
+    auto_corr = autocorrelate(unbias, method=autocorr, norm=norm)
+    candidates = detect_peaks(auto_corr, mpd=5, mph=0)
+    period = estimate_period(auto_corr, candidates, duration, min_rate)
+    if period is None:
+        return np.empty(0, dtype=int), None, template
+    period = int(period)
+    if template is None:
+        template = unbias[:TEMPLATE_PERIODS*period].copy()
+    correlation = cross_correlate(template, unbias)
+    beat_ind = detect_peaks(correlation, mpd=0.8*period, mph=0)
+    return beat_ind, period, template
+
+
+def _window_task(time, voltage, options):
+    return window_beats(time, voltage, **options)[:2]
+
+
+def find_segmented_beats(time, voltage, window=WINDOW, overlap=OVERLAP,
+                         workers=1, units='sec', **options):
+    '''Finds the beats of a trace window by window, see the module
+    docstring. A process analyzes one window at a time, so its memory is
+    bounded by the window length rather than the trace length
+
+    :param time (array): sampled times, increasing
+    :param voltage (array): sampled voltages
+    :param window (float, default=20.0): window length in seconds. Should
+        span many beats, yet be short enough for the polynomial baseline
+        to follow the drift
+    :param overlap (float, default=4.0): overlap of consecutive windows in
+        seconds. Should exceed two beat periods
+    :param workers (int, default=1): processes analyzing the windows after
+        the first. 1 runs serially in the calling process, None uses one
+        per CPU
+    :param units (str, default='sec'): time units, 'sec' or 'min'
+    :param options: baseline, autocorr and min_rate, see window_beats
+    :return beats (numpy array): beat times
+    '''
+    scale = 1/60 if units == 'min' else 1
+    bounds = segment_bounds(time, window*scale, overlap*scale)
+    slices = [(time[start:stop], voltage[start:stop])
+              for start, stop, _, _ in bounds]
+    options = dict(options, units=units)
+
+    # the first window with a beat period provides the template
+    results = []
+    template = None
+    while template is None and len(results) < len(slices):
+        beat_ind, period, template = window_beats(*slices[len(results)],
+                                                  **options)
+        results.append((beat_ind, period))
+    rest = slices[len(results):]
+    options['template'] = template
+    if workers == 1 or len(rest) < 2:
+        results.extend(_window_task(t, v, options) for t, v in rest)
+    else:
+        # imported here so that importing heart_rate stays cheap
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results.extend(executor.map(_window_task, *zip(*rest),
+                                        [options]*len(rest)))
+    return _merge(bounds, slices, results)
+
+
+def _merge(bounds, slices, results):
+    '''Joins the beats the windows keep, dropping beats closer than half a
+    beat period to the beat before them, found on both sides of a seam
+    '''
+    beats = []
+    last = -np.inf
+    for (_, _, keep_from, keep_to), (time, _), (beat_ind, period) in \
+            zip(bounds, slices, results):
+        if period is None:
+            logger.warning('No beat period found in the window from %g to %g'
+                           % (time[0], time[-1]))
+            continue
+        times = time[beat_ind]
+        times = times[(times >= keep_from) & (times < keep_to)]
+        # beats of one window are at least 0.8 periods apart already
+        min_gap = 0.5*period*(time[-1] - time[0])/max(time.size - 1, 1)
+        times = times[times - last >= min_gap]
+        if times.size:
+            beats.append(times)
+            last = times[-1]
+    return np.concatenate(beats) if beats else np.empty(0)
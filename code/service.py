@@ -0,0 +1,296 @@
+"""Local asyncio HTTP service running ECG analyses in a process pool.
+
+Requests:
+    GET /health
+    POST /analyze?mode=summary  with a JSON body {"path": "test_data1.csv"}
+    POST /analyze?mode=full     with the CSV trace itself as body
+
+The response holds the fields export_json writes for the mode ('summary'
+leaves out the time and voltage arrays). The event loop only parses HTTP;
+the analyses and the JSON encoding run in a bounded process pool. At most
+`workers` analyses run at once, and when `max_pending` requests are
+already waiting or running, new ones are refused with 503 straight away
+instead of queueing without bound.
+
+Usage: python service.py [--port 8000 | --unix PATH] [--workers N]
+                         [--max-pending N] [--root DIR]
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from heart_rate import ECG, configure_logging
+
+MODES = ('summary', 'full')
+# folder served by default, where ECG looks files up
+DATA_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         '../test_data')
+
+
+def analyze(path=None, data=None, mode='summary', **ecg_args):
+    '''Analyzes one recording in a worker process
+
+    :param path (str, default=None): CSV file, looked up as ECG does
+    :param data (bytes, default=None): uploaded CSV trace, used instead of
+        path. It is parsed in memory
+    :param mode (str, default='summary'): fields returned, see
+        ECG.export_json
+    :param ecg_args: keyword arguments passed on to ECG
+    :return status (int): HTTP status of the response
+    :return body (bytes): JSON response
+    '''
+    try:
+        if data is not None:
+            ecg = ECG.from_path(io.BytesIO(data), filename='upload.csv',
+                                **ecg_args)
+        else:
+            ecg = ECG(filename=path, **ecg_args)
+        if not hasattr(ecg, 'time'):
+            return 404, _error('Import file not found')
+        result = ecg._summary_dict()
+        if mode == 'full':
+            result['time'] = ecg.time.tolist()
+            result['voltage'] = ecg.voltage.tolist()
+        return 200, json.dumps(result, sort_keys=True).encode()
+    except Exception as err:
+        return 422, _error('%s: %s' % (type(err).__name__, err))
+
+
+def _error(message):
+    return json.dumps({'error': message}).encode()
+
+
+class AnalysisService:
+    '''HTTP front-end offloading ECG analyses to a process pool
+
+    :attribute pending (int): requests waiting for or running an analysis
+    '''
+    def __init__(self, workers=None, max_pending=64, max_body=64 << 20,
+                 root=None, **ecg_args):
+        '''__init__ method of the AnalysisService class
+
+        :param workers (int, default=None): worker processes, and analyses
+            run at once. None uses one per CPU
+        :param max_pending (int, default=64): requests waiting for or
+            running an analysis beyond which 503 is returned
+        :param max_body (int, default=64 MiB): largest accepted upload
+        :param root (str, default=None): folder requested paths must lie
+            in, relative paths being looked up in it. None serves the
+            'test_data' folder ECG reads by default
+        :param ecg_args: keyword arguments passed on to ECG
+        '''
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.max_body = max_body
+        self.root = os.path.realpath(DATA_ROOT if root is None else root)
+        self.ecg_args = ecg_args
+        self.pending = 0
+        self._executor = None
+        self._limit = None
+        self._server = None
+
+    async def start(self, host='127.0.0.1', port=8000, unix=None):
+        '''Starts listening on a TCP port or, given unix, a Unix socket
+
+        :return server (asyncio.Server): the listening server
+        '''
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._limit = asyncio.Semaphore(self.workers)
+        if unix is not None:
+            self._server = await asyncio.start_unix_server(self._handle,
+                                                           path=unix)
+        else:
+            self._server = await asyncio.start_server(self._handle, host,
+                                                      port)
+        return self._server
+
+    async def close(self):
+        '''Stops listening and shuts the worker processes down
+        '''
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request = await _read_request(reader, self.max_body)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                if body is None:
+                    status, payload = 413, _error('Upload too large')
+                else:
+                    status, payload = await self._dispatch(method, target,
+                                                           headers, body)
+                keep_alive = (headers.get('connection', '').lower() !=
+                              'close' and body is not None)
+                _write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, target, headers, body):
+        url = urlsplit(target)
+        if url.path == '/health' and method == 'GET':
+            return 200, json.dumps({'pending': self.pending}).encode()
+        if url.path != '/analyze':
+            return 404, _error('Unknown resource')
+        if method != 'POST':
+            return 405, _error('Use POST')
+
+        mode = parse_qs(url.query).get('mode', ['summary'])[0]
+        if mode not in MODES:
+            return 400, _error('Unknown mode: %s' % mode)
+        task = {'mode': mode}
+        if headers.get('content-type', '').startswith('application/json'):
+            try:
+                task['path'] = str(json.loads(body)['path'])
+            except (ValueError, KeyError, TypeError):
+                return 400, _error('Expected {"path": ...}')
+            task['path'] = self._resolve(task['path'])
+            if task['path'] is None:
+                return 403, _error('Path outside of the served folder')
+        else:
+            task['data'] = body
+
+        if self.pending >= self.max_pending:
+            return 503, _error('Too many pending requests')
+        self.pending += 1
+        try:
+            async with self._limit:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(
+                    self._executor, _run, task, self.ecg_args)
+        finally:
+            self.pending -= 1
+
+    def _resolve(self, path):
+        '''Path to analyze, None if it lies outside of root
+        '''
+        full = os.path.realpath(os.path.join(self.root, path))
+        if os.path.commonpath([full, self.root]) != self.root:
+            return None
+        return full
+
+
+def _run(task, ecg_args):
+    return analyze(**task, **ecg_args)
+
+
+async def _read_request(reader, max_body):
+    '''Reads one HTTP/1.1 request, None once the client closed the
+    connection. The body is None when it exceeds max_body
+    '''
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    method, target, _ = request_line.decode('latin-1').split()
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0))
+    if length > max_body:
+        return method, target, headers, None
+    body = await reader.readexactly(length)
+    return method, target, headers, body
+
+
+def _write_response(writer, status, payload, keep_alive=True):
+    head = ['HTTP/1.1 %d %s' % (status, HTTPStatus(status).phrase),
+            'Content-Type: application/json',
+            'Content-Length: %d' % len(payload),
+            'Connection: %s' % ('keep-alive' if keep_alive else 'close')]
+    if status == 503:
+        head.append('Retry-After: 1')
+    writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1'))
+    writer.write(payload)
+
+
+async def fetch(method, target, body=b'', host='127.0.0.1', port=8000,
+                unix=None, content_type='text/csv'):
+    '''Minimal client sending one request on a new connection, for tests
+    and load testing
+
+    :return status (int): HTTP status
+    :return payload (dict): decoded JSON response
+    '''
+    if unix is not None:
+        reader, writer = await asyncio.open_unix_connection(unix)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    try:
+        head = ['%s %s HTTP/1.1' % (method, target), 'Host: %s' % host,
+                'Content-Type: %s' % content_type,
+                'Content-Length: %d' % len(body), 'Connection: close']
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1'))
+        writer.write(body)
+        await writer.drain()
+        status_line = await reader.readline()
+        status = int(status_line.split()[1])
+        length = 0
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            if name.strip().lower() == 'content-length':
+                length = int(value)
+        payload = await reader.readexactly(length)
+    finally:
+        writer.close()
+    return status, json.loads(payload)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='ECG analysis service')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--unix', help='Unix socket to listen on instead')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes (default: one per CPU)')
+    parser.add_argument('--max-pending', type=int, default=64,
+                        help='pending requests beyond which 503 is returned')
+    parser.add_argument('--root', help='folder requested paths must lie in '
+                                       '(default: the test_data folder)')
+    parser.add_argument('--units', default='sec', help='time units of files')
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    service = AnalysisService(workers=args.workers,
+                              max_pending=args.max_pending, root=args.root,
+                              units=args.units)
+
+    async def serve():
+        server = await service.start(args.host, args.port, args.unix)
+        try:
+            await server.serve_forever()
+        finally:
+            await service.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""Summary statistics and signal-quality checks of an ECG trace.
+
+signal_stats walks the time and voltage arrays once, chunk by chunk, and
+gathers everything the analysis and its quality checks need: the voltage
+extremes, mean and energy, the number of non-finite samples, the
+regularity of the sampling intervals and the samples stuck at the voltage
+extremes. The per-chunk results are merged with the pairwise update of
+Chan et al., so the mean and energy are as accurate as a two-pass
+computation while every chunk stays in cache.
+
+assess turns the statistics into a report of problems, and flags traces
+whose beat search would be meaningless.
+"""
+
+import numpy as np
+
+CHUNK_SIZE = 65536
+
+
+def mean_energy(x, chunk_size=CHUNK_SIZE):
+    '''Finds the mean of a signal and its energy about the mean in one
+    chunked pass, i.e. np.mean(x) and np.sum((x - np.mean(x))**2) without
+    a full-size temporary
+
+    :param x (array): 1-D signal, assumed finite
+    :param chunk_size (int, default=65536): samples per chunk
+    :return mean (float): mean of the samples
+    :return energy (float): sum of the squared deviations from the mean
+    '''
+    moments = (0, 0.0, 0.0)
+    for start in range(0, len(x), chunk_size):
+        moments = _merge_moments(moments, x[start:start + chunk_size])
+    return moments[1], moments[2]
+
+
+def _merge_moments(moments, chunk):
+    '''Adds a chunk to (count, mean, energy), see Chan, Golub and LeVeque,
+    "Updating formulae and a pairwise algorithm for computing sample
+    variances", 1979
+    '''
+    count, mean, energy = moments
+    size = chunk.size
+    if size == 0:
+        return moments
+    chunk_mean = np.mean(chunk, dtype=np.float64)
+    deviation = chunk - chunk_mean
+    chunk_energy = np.dot(deviation, deviation)
+    total = count + size
+    delta = chunk_mean - mean
+    return (total, mean + delta*size/total,
+            energy + chunk_energy + delta*delta*count*size/total)
+
+
+def _merge_extreme(extreme, count, chunk, find):
+    '''Adds a chunk to the running extreme of find (np.min or np.max) and
+    the number of samples equal to it
+    '''
+    value = find(chunk)
+    hits = np.count_nonzero(chunk == value)
+    if count == 0 or value == extreme:
+        return value, count + hits
+    if find(np.asarray([value, extreme])) == value:
+        return value, hits
+    return extreme, count
+
+
+def signal_stats(time, voltage, chunk_size=CHUNK_SIZE, gap_factor=2.0):
+    '''Computes the summary statistics of a trace in one chunked pass
+
+    :param time (array): sampled times
+    :param voltage (array): sampled voltages, as many as times
+    :param chunk_size (int, default=65536): samples per chunk
+    :param gap_factor (float, default=2.0): sampling intervals longer than
+        gap_factor times the mean interval count as gaps
+    :return stats (dict): 'num_samples'; 'non_finite', the samples whose
+        time or voltage is NaN or infinite; 'voltage_min', 'voltage_max',
+        'voltage_mean' and 'voltage_energy' (sum of squared deviations from
+        the mean) of the finite voltages; 'at_min' and 'at_max', the
+        samples equal to the extremes; 'sample_interval', the mean
+        interval; 'interval_jitter', the standard deviation of the
+        intervals relative to their mean; 'gaps', the intervals longer than
+        gap_factor mean intervals; 'non_increasing', the intervals <= 0
+    '''
+    time = np.asarray(time)
+    voltage = np.asarray(voltage)
+    if time.shape != voltage.shape or voltage.ndim != 1:
+        raise ValueError('time and voltage must be 1-D and of the same '
+                         'length')
+    size = voltage.size
+    interval = (float(time[-1] - time[0])/(size - 1) if size > 1
+                else np.nan)
+
+    non_finite = gaps = non_increasing = 0
+    low = high = np.nan
+    at_min = at_max = 0
+    moments = dt_moments = (0, 0.0, 0.0)
+    for start in range(0, size, chunk_size):
+        stop = min(start + chunk_size, size)
+        t = time[start:stop]
+        v = voltage[start:stop]
+        finite = np.isfinite(t) & np.isfinite(v)
+        if not finite.all():
+            non_finite += stop - start - np.count_nonzero(finite)
+            v = v[np.isfinite(v)]
+        if v.size:
+            moments = _merge_moments(moments, v)
+            low, at_min = _merge_extreme(low, at_min, v, np.min)
+            high, at_max = _merge_extreme(high, at_max, v, np.max)
+
+        # intervals ending in this chunk
+        dt = np.diff(time[max(start - 1, 0):stop])
+        dt = dt[np.isfinite(dt)]
+        non_increasing += np.count_nonzero(dt <= 0)
+        gaps += np.count_nonzero(dt > gap_factor*interval)
+        dt_moments = _merge_moments(dt_moments, dt)
+
+    jitter = np.nan
+    if dt_moments[0] and interval > 0:
+        jitter = np.sqrt(dt_moments[2]/dt_moments[0])/interval
+    return {'num_samples': size,
+            'non_finite': int(non_finite),
+            'voltage_min': low,
+            'voltage_max': high,
+            'voltage_mean': moments[1] if moments[0] else np.nan,
+            'voltage_energy': moments[2],
+            'at_min': int(at_min),
+            'at_max': int(at_max),
+            'sample_interval': interval,
+            'interval_jitter': float(jitter),
+            'gaps': int(gaps),
+            'non_increasing': int(non_increasing)}
+
+
+def assess(stats, max_jitter=0.5, clip_fraction=0.001, ecg_range=300):
+    '''Lists the quality problems of a trace from its signal_stats
+
+    :param stats (dict): as returned by signal_stats
+    :param max_jitter (float, default=0.5): largest acceptable
+        interval_jitter
+    :param clip_fraction (float, default=0.001): fraction of the samples
+        which, stuck at the minimum or maximum voltage, indicates clipping
+    :param ecg_range (float, default=300): largest plausible voltage range
+    :return usable (boolean): False when no beats can be searched for, i.e.
+        with fewer than two samples, non-finite samples or a flat voltage
+    :return problems (list): descriptions of the problems found
+    '''
+    fatal, problems = [], []
+    if stats['num_samples'] < 2:
+        fatal.append('fewer than two samples')
+    if stats['non_finite']:
+        fatal.append('%d non-finite samples' % stats['non_finite'])
+    if stats['voltage_max'] == stats['voltage_min']:
+        fatal.append('flat voltage')
+    if stats['non_increasing']:
+        problems.append('%d non-increasing times' % stats['non_increasing'])
+    if stats['gaps']:
+        problems.append('%d gaps in the sampling' % stats['gaps'])
+    if stats['interval_jitter'] > max_jitter:
+        problems.append('irregular sampling intervals (jitter %.3g)'
+                        % stats['interval_jitter'])
+    clipped = max(stats['at_min'], stats['at_max'])
+    if clipped > max(1, clip_fraction*stats['num_samples']):
+        problems.append('%d samples at a voltage extreme, clipped' % clipped)
+    if stats['voltage_max'] - stats['voltage_min'] > ecg_range:
+        problems.append('voltage range exceeds ECG specifications')
+    return not fatal, fatal + problems
@@ -0,0 +1,176 @@
+"""Streaming beat detection for ECG samples that arrive in chunks."""
+
+import numpy as np
+
+from autocorrelation import autocorrelate
+from detect_peaks import detect_peaks
+
+
+class StreamingBeatDetector:
+    '''Detects heart beats in an unbounded ECG stream with bounded memory.
+
+    Samples are pushed in chunks and kept in a fixed-size ring buffer. Each
+    analysis removes a running (moving-average) baseline from the buffer,
+    estimates the beat period from a short autocorrelation and picks the
+    highest peak of the rectified signal in every beat period. A beat is
+    only reported once `latency` seconds of newer samples have arrived, so
+    later samples can no longer change the decision.
+
+    :attribute buffer_size (int): number of samples held in the ring buffer
+    :attribute latency (float): seconds between a beat and its report
+    :attribute period (float): current beat period estimate in seconds
+    :attribute last_beat (float): time of the last reported beat
+    :attribute num_beats (int): number of beats reported so far
+    '''
+    def __init__(self, buffer_size=8192, latency=2.0, min_period=0.25,
+                 max_period=2.0, baseline_window=0.75, hop=0.5,
+                 threshold=0.3):
+        '''__init__ method of the StreamingBeatDetector class
+
+        :param buffer_size (int, default=8192): ring buffer length in
+            samples. It should span at least two max_period
+        :param latency (float, default=2.0): seconds of signal needed after
+            a beat before it is reported. Should exceed 0.8*max_period
+        :param min_period (float, default=0.25): shortest beat period
+            considered, in seconds (240 bpm)
+        :param max_period (float, default=2.0): longest beat period
+            considered, in seconds (30 bpm)
+        :param baseline_window (float, default=0.75): length in seconds of
+            the moving average used as the running baseline
+        :param hop (float, default=0.5): seconds of new signal collected
+            before the buffer is analysed again
+        :param threshold (float, default=0.3): minimum peak height as a
+            fraction of the largest rectified sample in the buffer
+        '''
+        self.buffer_size = int(buffer_size)
+        self.latency = latency
+        self.min_period = min_period
+        self.max_period = max_period
+        self.baseline_window = baseline_window
+        self.hop = hop
+        self.threshold = threshold
+
+        self._time = np.empty(self.buffer_size)
+        self._voltage = np.empty(self.buffer_size)
+        self._head = 0  # next write position
+        self._count = 0  # valid samples in the buffer
+        self._analysed = -np.inf  # newest time at the last analysis
+        self._settled = -np.inf  # beats up to this time were decided
+
+        self.period = None
+        self.last_beat = -np.inf
+        self.num_beats = 0
+
+    def push(self, time, voltage):
+        '''Adds a chunk of samples and returns the beats that became final
+
+        :param time (array): sample times of the chunk, increasing
+        :param voltage (array): sampled voltages of the chunk
+        :return beats (numpy array): times of the newly reported beats
+        '''
+        time = np.atleast_1d(np.asarray(time, dtype=float))
+        voltage = np.atleast_1d(np.asarray(voltage, dtype=float))
+        good = ~(np.isnan(time) | np.isnan(voltage))
+        if not good.all():
+            time = time[good]
+            voltage = voltage[good]
+        if time.size == 0:
+            return np.array([])
+        self._append(time, voltage)
+
+        if time[-1] - self._analysed < self.hop:
+            return np.array([])
+        return self._analyse(time[-1] - self.latency)
+
+    def flush(self):
+        '''Reports the beats still waiting for their latency to elapse
+
+        :return beats (numpy array): times of the remaining beats
+        '''
+        if self._count == 0:
+            return np.array([])
+        return self._analyse(np.inf)
+
+    def process(self, chunks):
+        '''Runs the detector over an iterable of (time, voltage) chunks
+
+        :param chunks (iterable): yields pairs of time and voltage arrays
+        :return beats (generator): beat times as they become final,
+            including the flushed tail
+        '''
+        for time, voltage in chunks:
+            for beat in self.push(time, voltage):
+                yield beat
+        for beat in self.flush():
+            yield beat
+
+    def _append(self, time, voltage):
+        if time.size >= self.buffer_size:
+            time = time[-self.buffer_size:]
+            voltage = voltage[-self.buffer_size:]
+        stop = self._head + time.size
+        first = min(stop, self.buffer_size) - self._head
+        self._time[self._head:self._head + first] = time[:first]
+        self._voltage[self._head:self._head + first] = voltage[:first]
+        self._time[:time.size - first] = time[first:]
+        self._voltage[:time.size - first] = voltage[first:]
+        self._head = stop % self.buffer_size
+        self._count = min(self._count + time.size, self.buffer_size)
+
+    def _ordered(self):
+        start = (self._head - self._count) % self.buffer_size
+        if start + self._count <= self.buffer_size:
+            index = slice(start, start + self._count)
+            return self._time[index], self._voltage[index]
+        return (np.concatenate((self._time[start:], self._time[:self._head])),
+                np.concatenate((self._voltage[start:],
+                                self._voltage[:self._head])))
+
+    def _analyse(self, settle_until):
+        time, voltage = self._ordered()
+        self._analysed = time[-1]
+        if time.size < 3:
+            return np.array([])
+        dt = (time[-1] - time[0])/(time.size - 1)
+
+        width = max(int(round(self.baseline_window/dt)), 1)
+        cumulative = np.cumsum(np.insert(voltage, 0, 0))
+        low = np.clip(np.arange(time.size) - width//2, 0, time.size)
+        high = np.clip(low + width, 0, time.size)
+        signal = voltage - (cumulative[high] - cumulative[low])/(high - low)
+
+        self._update_period(signal, dt)
+        if self.period is None:
+            return np.array([])
+
+        rectified = np.abs(signal)
+        mpd = 0.8*self.period/dt
+        ind = detect_peaks(rectified, mph=self.threshold*rectified.max(),
+                           mpd=mpd)
+        beats = []
+        for beat in time[ind]:
+            if beat <= self._settled or beat > settle_until:
+                continue
+            if beat - self.last_beat < 0.8*self.period:
+                continue
+            beats.append(beat)
+            self.last_beat = beat
+        self._settled = max(self._settled, min(settle_until, time[-1]))
+        self.num_beats += len(beats)
+        return np.asarray(beats)
+
+    def _update_period(self, signal, dt):
+        max_lag = int(self.max_period/dt)
+        if signal.size < 2*max_lag:
+            return
+        unbias = signal - np.mean(signal)
+        if not np.any(unbias):
+            return
+        auto_corr = autocorrelate(unbias, max_lag=max_lag)
+        ind = detect_peaks(auto_corr, mph=0)
+        ind = ind[ind >= self.min_period/dt]
+        if ind.size:
+            # the shortest lag nearly as high as the highest, as beats of
+            # alternating heights make twice the period correlate best
+            ind = ind[auto_corr[ind] >= 0.9*auto_corr[ind].max()]
+            self.period = ind[0]*dt
@@ -0,0 +1,256 @@
+"""Parameter sweeps of the beat detection over one or many recordings.
+
+Tuning the detection by creating an ECG per parameter combination repeats
+the import, baseline removal and autocorrelation for every combination.
+sweep evaluates a grid of detection parameters instead, running the steps
+of ECG.find_beats once per intermediate and sharing it between the grid
+points that depend on it:
+
+    import -> baseline and autocorrelation (degree)
+           -> candidate peaks (mpd, mph) -> period (min_rate) -> beats
+
+so only the cheap peak detection steps run per grid point. degree is the
+option of the 'polyfit' baseline; the other ECG options, e.g. baseline,
+resample_rate or low_memory, hold for the whole sweep. The work is split
+into one task per recording and polynomial degree, and the tasks run in a
+process pool.
+
+Usage: python sweep.py FILE [FILE ...] [--degree 5 7 9] [--mpd 3 5]
+                       [--mph 0 0.1] [--min-rate 0.2 0.3] [--workers N]
+                       [--baseline METHOD] [--output FILE]
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from autocorrelation import estimate_period
+from heart_rate import (ECG, average_hr_bpm, beat_indices, candidate_peaks,
+                        configure_logging, detrend, trace_autocorrelation)
+
+# detection parameters and the values ECG.find_beats uses
+PARAMETERS = ('degree', 'mpd', 'mph', 'min_rate')
+DEFAULTS = {'degree': 7, 'mpd': 5, 'mph': 0, 'min_rate': 0.3}
+
+
+def parameter_grid(**values):
+    '''Lists every combination of the given parameter values
+
+    :param values: sequence of values for any of PARAMETERS, e.g.
+        degree=(5, 7, 9). Parameters left out take their DEFAULTS value
+    :return points (list): one dict per combination holding every
+        parameter, with the last parameters varying fastest
+    '''
+    unknown = set(values) - set(PARAMETERS)
+    if unknown:
+        raise ValueError('Unknown parameters: %s' % ', '.join(sorted(unknown)))
+    axes = [values.get(name, (DEFAULTS[name],)) for name in PARAMETERS]
+    return [dict(zip(PARAMETERS, combination))
+            for combination in itertools.product(*axes)]
+
+
+def sweep(paths, points=None, workers=None, keep_beats=False, **ecg_args):
+    '''Finds the beats of recordings for every point of a parameter grid
+
+    :param paths (str or iterable): CSV file or files to analyze, looked
+        up as batch.summarize does
+    :param points (list, default=None): parameter dicts, e.g. from
+        parameter_grid. Missing parameters take their DEFAULTS value. By
+        default only the DEFAULTS point
+    :param workers (int, default=None): number of worker processes, each
+        analyzing one recording at one polynomial degree at a time. None
+        uses one per CPU, 1 runs serially in the calling process and also
+        shares the import between degrees
+    :param keep_beats (boolean, default=False): also return the beat times
+        under 'beats'
+    :param ecg_args: keyword arguments passed on to ECG, e.g. units,
+        baseline, resample_rate or low_memory. segment is not supported
+    :return rows (list): one dict per recording and point, recording by
+        recording in the order of points, see sweep_recording
+    '''
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    paths = [os.fspath(path) for path in paths]
+    if points is None:
+        points = [{}]
+    points = [dict(DEFAULTS, **point) for point in points]
+    _check_options(points, ecg_args)
+
+    if workers == 1:
+        return [row for path in paths
+                for row in sweep_recording(path, points, keep_beats,
+                                           **ecg_args)]
+
+    degrees = list(dict.fromkeys(point['degree'] for point in points))
+    tasks = [(path, [i for i, point in enumerate(points)
+                     if point['degree'] == degree])
+             for path in paths for degree in degrees]
+    rows = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(sweep_recording, path,
+                                   [points[i] for i in indices], keep_beats,
+                                   **ecg_args)
+                   for path, indices in tasks]
+        for (path, indices), future in zip(tasks, futures):
+            try:
+                results = future.result()
+            except Exception as err:  # e.g. a worker process died
+                results = [_row(path, points[i], err) for i in indices]
+            rows.update(((path, i), row) for i, row in zip(indices, results))
+    return [rows[path, i] for path in paths for i in range(len(points))]
+
+
+def sweep_recording(path, points, keep_beats=False, **ecg_args):
+    '''Finds the beats of one recording for several parameter points. The
+    recording is imported once, and the baseline, autocorrelation,
+    candidate peaks, period and beats are each computed once for all
+    points sharing the parameters they depend on
+
+    :param path (str): CSV file to analyze, see sweep
+    :param points (list): parameter dicts holding every one of PARAMETERS
+    :param keep_beats (boolean, default=False): see sweep
+    :param ecg_args: see sweep
+    :return rows (list): per point, the filename, the parameters, the
+        'period' in samples (None if no period was found), 'num_beats',
+        'mean_hr_bpm' and 'error', which is None when the analysis
+        succeeded and a description of the failure otherwise
+    '''
+    _check_options(points, ecg_args)
+    try:
+        full_path = os.path.abspath(path) if os.path.isfile(path) else path
+        ecg = ECG(filename=full_path, **ecg_args)
+        if not hasattr(ecg, 'time'):
+            raise FileNotFoundError('Import file not found: %s' % path)
+        duration = ecg.duration
+        usable = ecg.quality['usable']
+        time, voltage = ecg.analysis_samples() if usable else (None, None)
+    except Exception as err:
+        return [_row(path, point, err) for point in points]
+
+    rows = [None]*len(points)
+    degrees = {}
+    for i, point in enumerate(points):
+        degrees.setdefault(point['degree'], []).append(i)
+    for degree, indices in degrees.items():
+        try:
+            if usable:
+                beats = _sweep_degree(ecg, time, voltage, degree,
+                                      [points[i] for i in indices])
+            else:
+                # as ECG.find_beats, no beat search in an unusable trace
+                beats = [(None, ecg.time[:1])]*len(indices)
+        except Exception as err:
+            beats = [err]*len(indices)
+        for i, result in zip(indices, beats):
+            if isinstance(result, Exception):
+                rows[i] = _row(path, points[i], result)
+                continue
+            period, beat_times = result
+            rows[i] = _row(path, points[i])
+            rows[i]['period'] = None if period is None else int(period)
+            rows[i]['num_beats'] = int(beat_times.size)
+            rows[i]['mean_hr_bpm'] = float(average_hr_bpm(beat_times,
+                                                          duration))
+            if keep_beats:
+                rows[i]['beats'] = beat_times
+    return rows
+
+
+def _check_options(points, ecg_args):
+    '''Raises ValueError for ECG options the sweep cannot follow
+    '''
+    if ecg_args.get('segment') is not None:
+        raise ValueError('sweep does not support segment, the segmented '
+                         'search finds a period per window')
+    baseline = ecg_args.get('baseline', 'polyfit')
+    if baseline != 'polyfit' and any(point['degree'] != DEFAULTS['degree']
+                                     for point in points):
+        raise ValueError('degree is an option of the polyfit baseline, not '
+                         'of %r' % (baseline,))
+
+
+def _sweep_degree(ecg, time, voltage, degree, points):
+    '''Period and beat times for points sharing one polynomial degree, with
+    the steps of ECG.find_beats
+    '''
+    options = {'degree': degree} if ecg.baseline == 'polyfit' else {}
+    voltage = detrend(time, voltage, ecg.baseline, ecg.units, ecg.low_memory,
+                      **options)
+    auto_corr = trace_autocorrelation(voltage, ecg.autocorr,
+                                      in_place=ecg.low_memory)[1]
+
+    candidates, periods, beats, results = {}, {}, {}, []
+    for point in points:
+        key = (point['mpd'], point['mph'])
+        if key not in candidates:
+            candidates[key] = candidate_peaks(auto_corr, mpd=point['mpd'],
+                                              mph=point['mph'])
+        key += (point['min_rate'],)
+        if key not in periods:
+            periods[key] = estimate_period(auto_corr, candidates[key[:2]],
+                                           ecg.duration,
+                                           min_rate=point['min_rate'])
+        period = periods[key]
+        if (period, point['mph']) not in beats:
+            beat_ind = beat_indices(auto_corr, period, mph=point['mph'])
+            beats[period, point['mph']] = time[beat_ind]
+        results.append((period, beats[period, point['mph']]))
+    return results
+
+
+def _row(path, point, error=None):
+    row = {'filename': path}
+    row.update((name, point[name]) for name in PARAMETERS)
+    row['error'] = None if error is None else \
+        '%s: %s' % (type(error).__name__, error)
+    return row
+
+
+def main(argv=None):
+    '''Command line entry point, returns 1 if any analysis failed
+    '''
+    parser = argparse.ArgumentParser(
+        description='Sweep beat detection parameters over ECG recordings')
+    parser.add_argument('paths', nargs='+', help='CSV files to analyze')
+    parser.add_argument('--degree', type=int, nargs='+',
+                        help='polynomial baseline degrees')
+    parser.add_argument('--mpd', type=float, nargs='+',
+                        help='candidate peak distances, in samples')
+    parser.add_argument('--mph', type=float, nargs='+',
+                        help='minimum autocorrelation peak heights')
+    parser.add_argument('--min-rate', type=float, nargs='+',
+                        help='lowest accepted beats per second')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes (default: one per CPU)')
+    parser.add_argument('--units', default='sec', help='time units of files')
+    parser.add_argument('--baseline', default='polyfit',
+                        help='baseline removal, --degree only applies to '
+                             'polyfit')
+    parser.add_argument('--output', help='JSON file for the results '
+                                         '(default: standard output)')
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    values = {name: getattr(args, name) for name in PARAMETERS
+              if getattr(args, name) is not None}
+    rows = sweep(args.paths, parameter_grid(**values), workers=args.workers,
+                 units=args.units, baseline=args.baseline)
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(rows, fp, indent=4)
+    else:
+        json.dump(rows, sys.stdout, indent=4)
+        print()
+
+    failed = [row for row in rows if row['error'] is not None]
+    for row in failed:
+        print('%s failed: %s' % (row['filename'], row['error']),
+              file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,67 @@
+def test_fft_matches_direct():
+    import numpy as np
+    from autocorrelation import autocorrelate
+
+    x = np.random.RandomState(0).randn(1001)
+    x = x - np.mean(x)
+    direct = autocorrelate(x, method='direct')
+    fft = autocorrelate(x, method='fft')
+
+    assert direct.size == x.size
+    assert direct[0] == 1
+    assert np.allclose(direct, fft)
+
+
+def test_max_lag():
+    import numpy as np
+    from autocorrelation import autocorrelate
+
+    x = np.sin(np.linspace(0, 40*np.pi, 2000))
+    full = autocorrelate(x, method='direct')
+    for method in ['direct', 'fft']:
+        short = autocorrelate(x, method=method, max_lag=300)
+        assert short.size == 301
+        assert np.allclose(short, full[:301])
+
+
+def test_backends_find_same_beats():
+    import glob
+    import os
+    from heart_rate import ECG
+    csv_loc = os.path.join(os.path.dirname(__file__), '../test_data/*.csv')
+    for csv_file in glob.glob(csv_loc):
+        filename = os.path.basename(csv_file)
+        direct = ECG(filename=filename, autocorr='direct')
+        fft = ECG(filename=filename, autocorr='fft')
+        assert direct.num_beats == fft.num_beats
+
+
+def test_estimate_period():
+    import numpy as np
+    from autocorrelation import autocorrelate, estimate_period
+    from detect_peaks import detect_peaks
+
+    x = np.sin(2*np.pi*np.arange(5000)/50)
+    x = x + 0.5*np.sin(2*np.pi*np.arange(5000)/10)
+    auto_corr = autocorrelate(x - np.mean(x))
+    candidates = detect_peaks(auto_corr, mpd=5, mph=0)
+
+    assert estimate_period(auto_corr, candidates, duration=50) == 50
+    # a floor of 400 beats in 50 seconds rules out every longer lag
+    assert estimate_period(auto_corr, candidates, duration=50,
+                           min_rate=8) == candidates[0] == 9
+    assert estimate_period(auto_corr, [], duration=50) is None
+
+
+def test_next_fast_len():
+    from autocorrelation import _next_fast_len
+
+    lengths = [_next_fast_len(n) for n in range(1, 2000)]
+    assert all(length >= n for n, length in enumerate(lengths, 1))
+    for length in lengths:
+        for factor in (2, 3, 5):
+            while length % factor == 0:
+                length //= factor
+        assert length == 1
+    assert _next_fast_len(1000001) == 1012500
+    assert _next_fast_len(97) == 100
@@ -0,0 +1,93 @@
+def test_polyfit_matches_numpy():
+    import numpy as np
+    from baseline import remove_baseline
+
+    time = np.linspace(0, 10, 1000)
+    voltage = np.sin(time) + 0.01*time**3
+    expected = voltage - np.polyval(np.polyfit(time, voltage, 7), time)
+
+    assert np.array_equal(remove_baseline(time, voltage), expected)
+    assert np.array_equal(remove_baseline(time, voltage, 'none'), voltage)
+
+
+def test_drift_is_removed():
+    import numpy as np
+    import pytest
+    from baseline import remove_baseline
+
+    time = np.arange(0, 60, 0.004)
+    spikes = np.exp(-0.5*(((time + 0.4) % 0.8 - 0.4)/0.01)**2)
+    drift = 0.5*np.sin(2*np.pi*0.05*time) + 0.01*time
+    for method in ['median', 'highpass']:
+        residual = remove_baseline(time, spikes + drift, method) - spikes
+        assert np.median(abs(residual)) < 0.05
+
+    with pytest.raises(ValueError):
+        remove_baseline(time, spikes, 'spline')
+
+
+def test_baseline_units():
+    import numpy as np
+    from baseline import remove_baseline
+    from heart_rate import ECG
+
+    time = np.arange(0, 60, 0.004)
+    voltage = np.exp(-0.5*(((time + 0.4) % 0.8 - 0.4)/0.01)**2) + 0.01*time
+    for method in ['median', 'highpass']:
+        seconds = remove_baseline(time, voltage, method)
+        minutes = remove_baseline(time/60, voltage, method, units='min')
+        assert np.allclose(minutes, seconds)
+        out = np.empty(time.size)
+        remove_baseline(time/60, voltage, method, out=out, units='min')
+        assert np.allclose(out, seconds)
+
+    test = ECG(filename='test_data8.csv', baseline='median')
+    minutes = ECG.from_arrays(test.time/60, test.voltage, units='min',
+                              baseline='median')
+    assert minutes.num_beats == test.num_beats
+
+
+def test_ecg_baseline_methods():
+    from heart_rate import ECG
+
+    for method in ['polyfit', 'median']:
+        assert ECG(filename='test_data8.csv', baseline=method).num_beats == 33
+
+
+def test_batched_leads():
+    import os
+    import numpy as np
+    from autocorrelation import autocorrelate
+    from baseline import remove_baseline
+    from ecg_io import read_csv
+
+    csv_loc = os.path.join(os.path.dirname(__file__), '../test_data')
+    leads = [read_csv(os.path.join(csv_loc, 'test_data%d.csv' % i))
+             for i in (1, 2, 3)]
+    time = leads[0][0]
+    voltage = np.array([lead[1] for lead in leads])
+    for method in ('polyfit', 'median', 'highpass'):
+        batched = remove_baseline(time, voltage, method)
+        for row, lead in zip(batched, voltage):
+            assert np.allclose(row, remove_baseline(time, lead, method))
+
+    batched = autocorrelate(voltage.T, axis=0)
+    for column, lead in zip(batched.T, voltage):
+        assert np.allclose(column, autocorrelate(lead))
+
+
+def test_remove_baseline_into():
+    import numpy as np
+    from baseline import remove_baseline
+
+    time = np.linspace(0, 20, 20001)
+    voltage = 0.3*np.sin(7*time) + 0.02*time**2 - 0.4*time
+    for method in ('polyfit', 'median', 'highpass', 'none'):
+        expected = remove_baseline(time, voltage, method)
+        out = np.empty(time.size)
+        assert remove_baseline(time, voltage, method, out=out) is out
+        assert np.allclose(out, expected, atol=1e-6)
+        single = remove_baseline(time, voltage.astype(np.float32), method,
+                                 out=np.empty(time.size, np.float32))
+        assert single.dtype == np.float32
+        assert np.allclose(single, expected, atol=1e-3)
@@ -0,0 +1,24 @@
+def test_parallel_matches_serial():
+    import glob
+    import os
+    from batch import analyze_many
+    csv_loc = os.path.join(os.path.dirname(__file__), '../test_data/*.csv')
+    paths = sorted(glob.glob(csv_loc))[:8]
+
+    serial = analyze_many(paths, workers=1)
+    parallel = analyze_many(paths, workers=2)
+
+    assert serial == parallel
+    assert all(summary['error'] is None for summary in serial)
+
+
+def test_failures_are_reported():
+    from batch import analyze_many
+
+    summaries = analyze_many(['test_data1.csv', 'no_such_file.csv'],
+                             workers=2)
+
+    assert summaries[0]['error'] is None
+    assert summaries[0]['num_beats'] == 35
+    assert summaries[1]['filename'] == 'no_such_file.csv'
+    assert 'FileNotFoundError' in summaries[1]['error']
@@ -0,0 +1,107 @@
+def test_suppression_matches_reference():
+    import numpy as np
+    from detect_peaks import (detect_peaks, _suppress_close_peaks,
+                              _suppress_close_peaks_reference)
+
+    rand = np.random.RandomState(590)
+    for trial in range(200):
+        # small integer alphabets give plenty of equal-height peaks
+        x = rand.randint(0, 6, size=rand.randint(3, 300)).astype(float)
+        ind = detect_peaks(x, edge='both')
+        mpd = rand.choice([2, 3, 4.8, 10, 57.5])
+        for kpsh in [False, True]:
+            fast = _suppress_close_peaks(x, ind, mpd, kpsh)
+            slow = _suppress_close_peaks_reference(x, ind, mpd, kpsh)
+            assert np.array_equal(fast, slow)
+
+
+def test_minimum_peak_distance():
+    import numpy as np
+    from detect_peaks import detect_peaks
+
+    x = [0, 1, 0, 2, 0, 3, 0, 2, 0, 1, 0]
+    assert np.array_equal(detect_peaks(x, mpd=2), [1, 5, 9])
+    x = [0, 2, 0, 2, 0, 1, 0]
+    assert np.array_equal(detect_peaks(x, mpd=2), [3])
+    assert np.array_equal(detect_peaks(x, mpd=2, kpsh=True), [1, 3])
+
+
+def _random_trace(rand):
+    import numpy as np
+
+    # small integer alphabets give flat peaks and equal-height peaks
+    x = rand.randint(-3, 4, size=rand.randint(0, 200)).astype(float)
+    if x.size and rand.rand() < 0.5:
+        x[rand.randint(0, x.size, size=3)] = np.nan
+    if x.size and rand.rand() < 0.3:
+        x[rand.randint(0, x.size, size=2)] = rand.choice([np.inf, -np.inf])
+    if rand.rand() < 0.2:
+        x = x.astype(np.float32)
+    return x
+
+
+def test_detect_peaks_matches_reference():
+    import numpy as np
+    from detect_peaks import detect_peaks, _detect_peaks_reference
+
+    rand = np.random.RandomState(125)
+    # infinite samples give NaN differences, as in the reference
+    with np.errstate(invalid='ignore'):
+        for trial in range(500):
+            x = _random_trace(rand)
+            options = {'edge': [None, 'rising', 'falling', 'both'][trial % 4],
+                       'kpsh': bool(rand.rand() < 0.5),
+                       'valley': bool(rand.rand() < 0.5),
+                       'mph': rand.choice([None, -1, 0, 1.5]),
+                       'threshold': rand.choice([0, 0.5, 2]),
+                       'mpd': rand.choice([1, 2, 3.5, 10])}
+            fast = detect_peaks(list(x) if trial % 7 == 0 else x, **options)
+            slow = _detect_peaks_reference(x, **options)
+            assert fast.dtype.kind == 'i'
+            assert np.array_equal(fast, slow), options
+
+
+def test_peak_kernels_agree():
+    import itertools
+    import numpy as np
+    from detect_peaks import _peak_candidates, _peak_loop
+
+    rand = np.random.RandomState(38)
+    with np.errstate(invalid='ignore'):
+        for trial in range(300):
+            x = _random_trace(rand).astype(float)
+            for edge, sign in itertools.product(range(-1, 4), [1.0, -1.0]):
+                out = np.empty(x.size, dtype=np.intp)
+                loop = out[:_peak_loop(x, sign, edge, 0.0, 0.5, out)]
+                vector = _peak_candidates(sign*x, edge, 0.0, 0.5)
+                assert np.array_equal(loop, vector)
+
+
+def test_compiled_kernels_agree():
+    import itertools
+    import numpy as np
+    import pytest
+    pytest.importorskip('numba')
+    from detect_peaks import (_peak_candidates, _peak_loop_compiled,
+                              _suppress_loop, _suppress_loop_compiled)
+
+    rand = np.random.RandomState(71)
+    with np.errstate(invalid='ignore'):
+        for trial in range(300):
+            x = _random_trace(rand).astype(float)
+            for edge, sign in itertools.product(range(-1, 4), [1.0, -1.0]):
+                out = np.empty(x.size, dtype=np.intp)
+                loop = out[:_peak_loop_compiled(x, sign, edge, 0.0, 0.5, out)]
+                vector = _peak_candidates(sign*x, edge, 0.0, 0.5)
+                assert np.array_equal(loop, vector)
+
+            ind = _peak_candidates(x, 1, -np.inf, 0)
+            ind = ind[np.argsort(x[ind])][::-1]
+            width = int(rand.choice([1, 2, 5, 20]))
+            for kpsh in [False, True]:
+                keep = [np.zeros(ind.size, dtype=bool) for _ in range(2)]
+                for suppress, kept in zip([_suppress_loop,
+                                           _suppress_loop_compiled], keep):
+                    suppress(ind, x[ind], width, kpsh,
+                             np.zeros(x.size, dtype=bool), kept)
+                assert np.array_equal(*keep)
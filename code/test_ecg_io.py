@@ -0,0 +1,49 @@
+def test_read_csv_reports_dropped_rows():
+    import io
+    import numpy as np
+    from ecg_io import read_csv, _read_coerce
+
+    text = '0,1\n0.1,\n0.2,bad data\nNaN,2\n\n0.5, x\n0.6,3\nbad,bad data\n'
+    time, voltage, dropped = read_csv(io.StringIO(text))
+
+    assert np.array_equal(time, [0, 0.6])
+    assert np.array_equal(voltage, [1, 3])
+    assert dropped == {'non_numeric': 3, 'missing': 3}
+    assert _read_coerce(io.StringIO(text), 0)[2] == dropped
+
+
+def test_read_csv_without_pandas(monkeypatch):
+    import io
+    import numpy as np
+    import ecg_io
+
+    texts = ['0,1\n0.1,\n0.2,bad data\nNaN,2\n\n0.5, x\n0.6,3\nbad,bad data\n',
+             '0,1\n\n 0.1 , 2\n0.2,NA\n0.3,4', '0,1\n0.1,2\n']
+    expected = [ecg_io.read_csv(io.StringIO(text)) for text in texts]
+
+    monkeypatch.setattr(ecg_io, '_pandas', lambda: None)
+    for text, (time, voltage, dropped) in zip(texts, expected):
+        result = ecg_io.read_csv(io.StringIO(text))
+        assert np.array_equal(result[0], time)
+        assert np.array_equal(result[1], voltage)
+        assert result[2] == dropped
+    assert ecg_io._read_lines(io.StringIO(texts[1]), 0)[2] == \
+        {'non_numeric': 0, 'missing': 2}
+
+
+def test_read_csv_text_in_large_file():
+    import io
+    import warnings
+    import numpy as np
+    from ecg_io import read_csv
+
+    rows = ['%d,%d' % (i, i % 7) for i in range(200000)]
+    rows[150000] = '150000,bad data'
+    rows[199990] = '199990,'
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        time, voltage, dropped = read_csv(io.StringIO('\n'.join(rows)))
+
+    assert dropped == {'non_numeric': 1, 'missing': 1}
+    assert time.size == 199998
+    assert np.array_equal(voltage, time % 7)
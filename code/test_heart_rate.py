@@ -14,6 +14,17 @@ def test_import():
     assert second_set.voltage[-1] == -1.7725
 
 
+def test_import_drops_bad_rows():
+    from heart_rate import ECG
+    strings = ECG(filename='test_data30.csv')
+    assert strings.dropped_rows == {'non_numeric': 2, 'missing': 0}
+    assert strings.time.size == 9998
+
+    gaps = ECG(filename='test_data31.csv')
+    assert gaps.dropped_rows == {'non_numeric': 0, 'missing': 4}
+    assert gaps.time.size == gaps.voltage.size == 9996
+
+
 def test_attributes():
     from heart_rate import ECG
     first_set = ECG(filename='test_data8.csv')
@@ -65,3 +76,240 @@ def test_export():
         json_import = json.load(fp)
 
     assert np.allclose(test.voltage, json_import['voltage'])
+
+
+def test_lazy_attributes():
+    from heart_rate import ECG
+
+    calls = []
+
+    class CountingECG(ECG):
+        def find_beats(self):
+            calls.append(1)
+            ECG.find_beats(self)
+
+    test = CountingECG(filename='test_data8.csv')
+    assert test.duration == 27.775
+    assert calls == []
+
+    assert test.num_beats == len(test.beats) == 33
+    assert test.mean_hr_bpm > 0
+    assert calls == [1]
+
+    test.voltage = test.voltage[:5000]
+    test.time = test.time[:5000]
+    assert test.num_beats < 33
+    assert test.duration < 27.775
+    assert calls == [1, 1]
+
+
+def test_heart_rate_series():
+    import numpy as np
+    from heart_rate import ECG
+    test = ECG(filename='test_data20.csv')
+
+    starts, hr_bpm = test.heart_rate_series(window=3)
+    assert np.allclose(np.diff(starts), 3)
+    assert starts[-1] + 3 <= test.time[-1]
+    assert np.all(abs(hr_bpm - 81)/81 < 0.15)
+
+    starts, hr_bpm = test.heart_rate_series(window=3, step=0.5)
+    assert np.allclose(np.diff(starts), 0.5)
+    assert abs(np.mean(hr_bpm) - 81)/81 < 0.05
+
+    times, hr_bpm = test.heart_rate_series(instantaneous=True)
+    assert np.array_equal(times, test.beats[1:])
+    assert abs(np.median(hr_bpm) - 81)/81 < 0.05
+
+    test.find_mean_hr_bpm(time_dur=5)
+    assert test.mean_hr_bpm == 60*np.sum(test.beats <= 5)/5
+
+    # the same trace in minutes gives the same rates
+    minutes = ECG.from_arrays(test.time/60, test.voltage, units='min')
+    assert np.allclose(minutes.beats, test.beats/60)
+    # windows not ending on beats, which rounding could move across them
+    starts, hr_bpm = minutes.heart_rate_series(window=2.9/60)
+    assert np.allclose(hr_bpm, test.heart_rate_series(window=2.9)[1])
+    times, hr_bpm = minutes.heart_rate_series(instantaneous=True)
+    assert abs(np.median(hr_bpm) - 81)/81 < 0.05
+
+
+def test_heart_rate_series_validation():
+    import pytest
+    from heart_rate import ECG
+    test = ECG(filename='test_data20.csv')
+
+    for window, step in [(0, None), (-3, None), (3, 0), (3, -1)]:
+        with pytest.raises(ValueError):
+            test.heart_rate_series(window=window, step=step)
+
+
+def test_export_modes(tmp_path):
+    from heart_rate import ECG
+    import json
+    import numpy as np
+
+    test = ECG(filename='test_data28.csv')
+    full_file = str(tmp_path / 'full.json')
+    test.export_json(path=full_file)
+    with open(full_file, 'r') as fp:
+        full = json.load(fp)
+
+    test.export_json(mode='stream', path=str(tmp_path / 'stream.json'),
+                     chunk_size=1000)
+    with open(str(tmp_path / 'stream.json'), 'r') as fp:
+        assert json.load(fp) == full
+
+    test.export_json(mode='summary', path=str(tmp_path / 'summary.json'))
+    with open(str(tmp_path / 'summary.json'), 'r') as fp:
+        summary = json.load(fp)
+    assert 'voltage' not in summary and 'time' not in summary
+    assert summary['num_beats'] == full['num_beats']
+    assert summary['beats'] == full['beats']
+
+    test.export_npz(path=str(tmp_path / 'trace.npz'), float32=True)
+    archive = np.load(str(tmp_path / 'trace.npz'))
+    assert archive['voltage'].dtype == np.float32
+    assert np.allclose(archive['voltage'], full['voltage'])
+    assert archive['num_beats'] == full['num_beats']
+
+
+def test_extend():
+    from heart_rate import ECG
+    import numpy as np
+
+    for name in ('test_data8.csv', 'test_data16.csv'):
+        full = ECG(filename=name)
+        test = ECG(filename=name)
+        time, voltage = test.time, test.voltage
+        test.time, test.voltage = time[:5000], voltage[:5000]
+        test.num_beats
+        test.voltage_extremes
+        for start in range(5000, time.size, 1500):
+            test.extend(time[start:start + 1500], voltage[start:start + 1500])
+
+        assert np.array_equal(test.time, full.time)
+        assert test.duration == full.duration
+        assert test.voltage_extremes == full.voltage_extremes
+        assert test.num_beats == full.num_beats
+        assert np.max(np.abs(test.beats - full.beats)) < 0.05
+        assert abs(test.mean_hr_bpm - full.mean_hr_bpm) < 1e-9
+
+
+def test_tail(tmp_path):
+    from heart_rate import ECG
+    import os
+
+    source = os.path.join(os.path.dirname(__file__), '../test_data',
+                          'test_data8.csv')
+    with open(source, 'r') as fp:
+        lines = fp.readlines()
+    growing = str(tmp_path / 'growing.csv')
+    with open(growing, 'w') as fp:
+        fp.writelines(lines[:4000])
+
+    test = ECG(filename=growing)
+    test.num_beats
+    with open(growing, 'a') as fp:
+        fp.writelines(lines[4000:7000] + ['bad data,1\n', lines[7000][:5]])
+    assert test.tail() == 3000
+    assert test.dropped_rows['non_numeric'] == 1
+    with open(growing, 'a') as fp:
+        fp.write(lines[7000][5:])
+        fp.writelines(lines[7001:])
+    assert test.tail() == len(lines) - 7000
+    assert test.tail() == 0
+
+    full = ECG(filename='test_data8.csv')
+    assert test.time.size == full.time.size
+    assert test.num_beats == full.num_beats
+
+
+def test_constructors(tmp_path):
+    from heart_rate import ECG
+    import io
+    import os
+    import shutil
+    import numpy as np
+
+    reference = ECG(filename='test_data8.csv')
+    time, voltage = reference.time, reference.voltage
+
+    from_arrays = ECG.from_arrays(time, voltage)
+    assert from_arrays.time is time and from_arrays.voltage is voltage
+    assert np.array_equal(from_arrays.beats, reference.beats)
+
+    buffer = np.column_stack((time, voltage)).tobytes()
+    from_buffer = ECG.from_buffer(buffer)
+    assert np.shares_memory(from_buffer.voltage, np.frombuffer(buffer))
+    assert np.array_equal(from_buffer.beats, reference.beats)
+    columns = memoryview(np.concatenate((time, voltage)))
+    assert ECG.from_buffer(columns, interleaved=False).num_beats == 33
+
+    source = os.path.join(os.path.dirname(__file__), '../test_data',
+                          'test_data8.csv')
+    copy = tmp_path / 'elsewhere.csv'
+    shutil.copy(source, str(copy))
+    from_path = ECG.from_path(copy)
+    assert from_path.filename == str(copy)
+    assert np.array_equal(from_path.beats, reference.beats)
+    assert from_path.tail() == 0
+
+    with open(source, 'rb') as fp:
+        from_file = ECG.from_path(io.BytesIO(fp.read()))
+    assert from_file.filename == 'stream.csv'
+    assert np.array_equal(from_file.beats, reference.beats)
+
+
+def test_low_memory():
+    from heart_rate import ECG
+    import numpy as np
+    from instrumentation import StageStats
+
+    for i in (1, 5, 8, 12, 31):
+        name = 'test_data%d.csv' % i
+        default = ECG(filename=name)
+        compact = ECG(filename=name, low_memory=True)
+        assert compact.voltage.dtype == np.float32
+        assert compact.time.dtype == np.float64
+        assert compact.num_beats == default.num_beats
+
+    # long enough for the buffers to outweigh the fixed overheads
+    reference = ECG(filename='test_data1.csv')
+    step = reference.time[1] - reference.time[0]
+    voltage = np.tile(reference.voltage, 30)
+    time = reference.time[0] + step*np.arange(voltage.size)
+    beats, peak = [], []
+    for low_memory in (False, True):
+        stats = StageStats(memory=True)
+        ecg = ECG.from_arrays(time, voltage, low_memory=low_memory,
+                              stats=stats)
+        beats.append(ecg.beats)
+        peak.extend(record['peak_bytes'] for record in stats.to_records()
+                    if record['stage'] == 'find_beats')
+    assert np.array_equal(beats[0], beats[1])
+    assert peak[1] < peak[0]/2
+
+    ecg.extend(time[-1] + step, [0.0])
+    assert ecg.voltage.dtype == np.float32
+
+
+def test_low_memory_export(tmp_path):
+    from heart_rate import ECG
+    import numpy as np
+    import pytest
+
+    ecg = ECG(filename='test_data1.csv', low_memory=True)
+    ecg.export_npz(path=str(tmp_path / 'trace.npz'))
+    archive = np.load(str(tmp_path / 'trace.npz'))
+    assert archive['time'].dtype == np.float64
+    assert np.array_equal(archive['time'], ecg.time)
+    assert archive['voltage'].dtype == np.float32
+    ecg.export_npz(path=str(tmp_path / 'single.npz'), float32=True)
+    assert np.load(str(tmp_path / 'single.npz'))['time'].dtype == np.float32
+
+    parquet = pytest.importorskip('pyarrow.parquet')
+    ecg.export_parquet(path=str(tmp_path / 'trace.parquet'))
+    table = parquet.read_table(str(tmp_path / 'trace.parquet'))
+    assert str(table.column('time').type) == 'double'
+    assert str(table.column('voltage').type) == 'float'
@@ -0,0 +1,55 @@
+def test_stage_records():
+    from heart_rate import ECG
+    from instrumentation import StageStats
+
+    received = []
+    stats = StageStats(callback=received.append)
+    ecg = ECG(filename='test_data1.csv', stats=stats)
+    ecg.num_beats
+
+    stages = [record['stage'] for record in stats.records]
+    assert stages[0] == 'import_csv'
+    for name in ('baseline', 'autocorrelation', 'candidate_peaks', 'period',
+                 'beat_peaks', 'find_beats', 'find_num_beats'):
+        assert name in stages
+    assert received == stats.records
+
+    by_name = {record['stage']: record for record in stats.records}
+    assert by_name['find_beats']['depth'] == 1
+    assert by_name['autocorrelation']['depth'] == 2
+    assert by_name['import_csv']['size'] == ecg.voltage.size
+    assert all(record['seconds'] >= 0 for record in stats.records)
+    assert (by_name['find_beats']['seconds'] >=
+            by_name['autocorrelation']['seconds'])
+
+
+def test_stage_memory():
+    import json
+    import tracemalloc
+    from heart_rate import ECG
+
+    ecg = ECG(filename='test_data1.csv')
+    assert ecg.stats is None
+
+    from instrumentation import StageStats
+    stats = StageStats(memory=True)
+    try:
+        ecg = ECG(filename='test_data1.csv', stats=stats)
+        ecg.beats
+    finally:
+        tracemalloc.stop()
+    by_name = {record['stage']: record for record in stats.records}
+    assert by_name['autocorrelation']['peak_bytes'] > 0
+    assert (by_name['find_beats']['peak_bytes'] >=
+            by_name['autocorrelation']['peak_bytes'])
+    assert json.loads(stats.to_json()) == stats.to_records()
+    assert set(stats.totals()) == set(by_name)
+
+
+def test_no_logging_setup():
+    import logging
+    from heart_rate import ECG
+
+    handlers = list(logging.getLogger().handlers)
+    ECG(filename='test_data1.csv')
+    assert logging.getLogger().handlers == handlers
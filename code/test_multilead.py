@@ -0,0 +1,51 @@
+def write_leads(path, names, header=True):
+    import os
+    import numpy as np
+    from ecg_io import read_csv
+
+    columns = []
+    for name in names:
+        time, voltage, _ = read_csv(os.path.join(os.path.dirname(__file__),
+                                                 '../test_data', name))
+        columns.append(voltage)
+    np.savetxt(path, np.column_stack([time] + columns), fmt='%.10g',
+               delimiter=',', comments='',
+               header='time,' + ','.join(names) if header else '')
+
+
+def test_leads_match_single_lead(tmp_path):
+    import numpy as np
+    from heart_rate import ECG
+    from multilead import MultiLeadECG
+
+    names = ['test_data1.csv', 'test_data3.csv', 'test_data7.csv',
+             'test_data8.csv']
+    write_leads(str(tmp_path / 'leads.csv'), names)
+    test = MultiLeadECG(str(tmp_path / 'leads.csv'))
+
+    assert test.lead_names == names
+    assert test.voltage.shape == (4, 10000)
+    for name, beats, low, high in zip(names, test.lead_beats,
+                                      *test.voltage_extremes):
+        single = ECG(filename=name)
+        assert np.array_equal(beats, single.beats)
+        assert (low, high) == single.voltage_extremes
+
+
+def test_consensus(tmp_path):
+    import numpy as np
+    from heart_rate import ECG
+    from multilead import MultiLeadECG, consensus_beats
+
+    names = ['test_data8.csv', 'test_data8.csv', 'test_data1.csv']
+    write_leads(str(tmp_path / 'leads.csv'), names, header=False)
+    test = MultiLeadECG(str(tmp_path / 'leads.csv'))
+
+    assert test.lead_names == ['lead 1', 'lead 2', 'lead 3']
+    single = ECG(filename='test_data8.csv')
+    assert np.array_equal(test.beats, single.beats)
+    assert test.mean_hr_bpm == single.mean_hr_bpm
+
+    beats = consensus_beats([[1.0, 2.0, 3.0], [1.04, 3.02], [2.08, 5.0]],
+                            tolerance=0.1, min_leads=2)
+    assert np.allclose(beats, [1.02, 2.04, 3.01])
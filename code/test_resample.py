@@ -0,0 +1,49 @@
+def test_is_uniform():
+    import numpy as np
+    from resample import is_uniform
+
+    time = 0.5 + np.arange(10000)/360
+    assert is_uniform(time, chunk_size=999)
+    assert is_uniform(np.round(time, 3))
+    dropped = np.delete(time, 5000)
+    assert not is_uniform(dropped)
+    assert not is_uniform(time[::-1])
+
+
+def test_resample():
+    import numpy as np
+    from resample import resample, sample_interval
+
+    time = np.arange(3600)/360
+    voltage = np.sin(2*np.pi*time)
+    same_time, same_voltage = resample(time, voltage)
+    assert same_time is time and same_voltage is voltage
+    assert resample(time, voltage, rate=360)[0] is time
+
+    dropped = np.delete(np.arange(time.size), [100, 101, 2000])
+    assert np.isclose(sample_interval(time[dropped]), 1/360)
+    new_time, new_voltage = resample(time[dropped], voltage[dropped])
+    assert np.allclose(new_time, time)
+    assert np.allclose(new_voltage, voltage, atol=1e-3)
+
+    new_time, new_voltage = resample(time, voltage.astype(np.float32),
+                                     rate=90)
+    assert np.allclose(np.diff(new_time), 1/90)
+    assert new_voltage.dtype == np.float32
+    assert np.allclose(new_voltage, np.sin(2*np.pi*new_time), atol=1e-3)
+
+
+def test_ecg_resample_rate():
+    import numpy as np
+    from heart_rate import ECG
+
+    ecg = ECG(filename='test_data1.csv')
+    uniform = ECG(filename='test_data1.csv', resample_rate='uniform')
+    assert np.array_equal(uniform.beats, ecg.beats)
+    decimated = ECG(filename='test_data1.csv', resample_rate=120)
+    assert decimated.num_beats == ecg.num_beats
+    assert np.allclose(decimated.beats, ecg.beats, atol=2/120)
+
+    gaps = ECG(filename='test_data28.csv', resample_rate='uniform')
+    assert abs(gaps.num_beats - ECG(filename='test_data28.csv').num_beats) \
+        <= 1
@@ -0,0 +1,82 @@
+def make_summaries():
+    import numpy as np
+
+    summaries = []
+    for i in range(50):
+        beats = np.arange(i % 7)*0.8 + i
+        summaries.append({'filename': 'rec%d.csv' % i, 'error': None,
+                          'duration': 10.0 + i,
+                          'voltage_extremes': [-1.0 - i, 1.0 + i],
+                          'num_beats': beats.size,
+                          'mean_hr_bpm': 60.0 + 2*i, 'beats': beats})
+    summaries.append({'filename': 'missing.csv',
+                      'error': 'FileNotFoundError: missing.csv'})
+    return summaries
+
+
+def test_append_and_query():
+    import numpy as np
+    from results_store import ResultsStore
+
+    summaries = make_summaries()
+    store = ResultsStore(capacity=2, beat_capacity=4)
+    store.extend(summaries)
+
+    assert len(store) == len(summaries)
+    assert store.offsets[-1] == store.all_beats.size == \
+        sum(s.get('num_beats', 0) for s in summaries)
+    assert np.array_equal(store.failed, [False]*50 + [True])
+    for i, summary in enumerate(summaries[:-1]):
+        assert np.array_equal(store.beats(i), summary['beats'])
+        assert store.summary(i)['mean_hr_bpm'] == summary['mean_hr_bpm']
+    assert store.summary(-1)['error'] == summaries[-1]['error']
+    owner = store.beat_owner()
+    assert np.array_equal(np.bincount(owner, minlength=len(store)),
+                          np.diff(store.offsets))
+
+    fast = store.select(store['mean_hr_bpm'] > 120)
+    expected = [s for s in summaries[:-1] if s['mean_hr_bpm'] > 120]
+    assert list(fast['filename']) == [s['filename'] for s in expected]
+    assert np.array_equal(fast.all_beats,
+                          np.concatenate([s['beats'] for s in expected]))
+    assert np.array_equal(fast['voltage_extremes'],
+                          [s['voltage_extremes'] for s in expected])
+
+
+def test_save_load(tmpdir):
+    import numpy as np
+    from results_store import ResultsStore
+
+    summaries = make_summaries()
+    store = ResultsStore()
+    store.extend(summaries)
+    store.save(str(tmpdir))
+
+    loaded = ResultsStore.load(str(tmpdir))
+    assert isinstance(loaded['duration'], np.memmap)
+    assert list(loaded['filename']) == list(store['filename'])
+    assert list(loaded['error']) == list(store['error'])
+    for name in ('duration', 'num_beats', 'offsets', 'all_beats'):
+        a = store[name] if name in ('duration', 'num_beats') else \
+            getattr(store, name)
+        b = loaded[name] if name in ('duration', 'num_beats') else \
+            getattr(loaded, name)
+        assert np.array_equal(a, b, equal_nan=name == 'duration')
+
+    loaded.append(summaries[3])
+    assert len(loaded) == len(store) + 1
+    assert np.array_equal(loaded.beats(-1), summaries[3]['beats'])
+    assert np.array_equal(loaded.beats(3), summaries[3]['beats'])
+
+
+def test_batch_store(tmpdir):
+    import numpy as np
+    from batch import main
+    from results_store import ResultsStore
+
+    output = str(tmpdir.join('summary.json'))
+    main(['test_data1.csv', 'test_data8.csv', '--workers', '1',
+          '--output', output, '--store', str(tmpdir.join('store'))])
+    store = ResultsStore.load(str(tmpdir.join('store')))
+    assert list(store['num_beats']) == [35, 33]
+    assert np.array_equal(np.diff(store.offsets), [35, 33])
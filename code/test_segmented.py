@@ -0,0 +1,57 @@
+def _rate_change_trace():
+    import numpy as np
+    # 60 bpm for two minutes, then 110 bpm for two minutes, at 250 Hz
+    time = np.arange(0, 240, 1/250)
+    beats = np.concatenate((np.arange(0.5, 120, 1.0),
+                            np.arange(120.5, 240, 60/110)))
+    nearest = beats[np.clip(np.searchsorted(beats, time), 0, beats.size - 1)]
+    previous = beats[np.clip(np.searchsorted(beats, time) - 1, 0,
+                             beats.size - 1)]
+    voltage = (np.exp(-0.5*((time - nearest)/0.012)**2) +
+               np.exp(-0.5*((time - previous)/0.012)**2))
+    voltage += 0.3*np.sin(2*np.pi*0.05*time)
+    voltage += 0.02*np.random.RandomState(0).randn(time.size)
+    return time, voltage, beats
+
+
+def test_segment_bounds():
+    import numpy as np
+    from segmented import segment_bounds
+
+    time = np.arange(0, 100, 0.01)
+    bounds = segment_bounds(time, window=20, overlap=4)
+    assert len(bounds) == 6
+    assert bounds[0][0] == 0 and bounds[-1][1] == time.size
+    for left, right in zip(bounds[:-1], bounds[1:]):
+        stop, keep_to = left[1], left[3]
+        start, keep_from = right[0], right[2]
+        assert start < stop
+        assert keep_to == keep_from
+        assert time[start] < keep_from < time[stop - 1]
+
+
+def test_rate_change():
+    import numpy as np
+    from heart_rate import ECG
+    from segmented import find_segmented_beats
+
+    time, voltage, beats = _rate_change_trace()
+    found = find_segmented_beats(time, voltage)
+    assert abs(found.size - beats.size) <= 0.02*beats.size
+    assert np.all(np.diff(found) > 0.4)
+    assert np.array_equal(find_segmented_beats(time, voltage, workers=2),
+                          found)
+
+    ecg = ECG.from_arrays(time, voltage, segment=20)
+    assert np.array_equal(ecg.beats, found)
+    whole = ECG.from_arrays(time, voltage)
+    assert abs(whole.num_beats - beats.size) > abs(found.size - beats.size)
+
+
+def test_ecg_segment_on_bundled_data():
+    from heart_rate import ECG
+
+    for name in ('test_data1.csv', 'test_data8.csv', 'test_data27.csv'):
+        default = ECG(filename=name)
+        segmented = ECG(filename=name, segment={'window': 20, 'overlap': 4})
+        assert abs(segmented.num_beats - default.num_beats) <= 1
@@ -0,0 +1,80 @@
+def run_service(scenario, **options):
+    import asyncio
+    from service import AnalysisService
+
+    async def main():
+        service = AnalysisService(**options)
+        server = await service.start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            return await scenario(port)
+        finally:
+            await service.close()
+
+    return asyncio.run(main())
+
+
+def test_analyze_path_and_upload():
+    import asyncio
+    import json
+    import os
+    from service import fetch
+
+    source = os.path.join(os.path.dirname(__file__), '../test_data',
+                          'test_data8.csv')
+    with open(source, 'rb') as fp:
+        upload = fp.read()
+
+    async def scenario(port):
+        by_path = fetch('POST', '/analyze', json.dumps(
+            {'path': 'test_data1.csv'}).encode(), port=port,
+            content_type='application/json')
+        by_upload = fetch('POST', '/analyze?mode=full', upload, port=port)
+        missing = fetch('POST', '/analyze', b'{"path": "nothing.csv"}',
+                        port=port, content_type='application/json')
+        outside = fetch('POST', '/analyze', json.dumps(
+            {'path': os.path.abspath(__file__)}).encode(), port=port,
+            content_type='application/json')
+        responses = await asyncio.gather(by_path, by_upload, missing,
+                                         outside)
+        return responses + [await fetch('GET', '/health', port=port)]
+
+    by_path, by_upload, missing, outside, health = run_service(scenario,
+                                                               workers=2)
+    assert by_path[0] == 200
+    assert by_path[1]['num_beats'] == 35
+    assert 'voltage' not in by_path[1]
+    assert by_upload[0] == 200
+    assert by_upload[1]['num_beats'] == 33
+    assert len(by_upload[1]['voltage']) == 10000
+    assert missing[0] == 404
+    # only the test_data folder is served by default
+    assert outside[0] == 403
+    assert health == (200, {'pending': 0})
+
+
+def test_backpressure_and_root():
+    import asyncio
+    import json
+    import os
+    from service import fetch
+
+    root = os.path.join(os.path.dirname(__file__), '../test_data')
+
+    async def scenario(port):
+        body = json.dumps({'path': 'test_data1.csv'}).encode()
+        requests = [fetch('POST', '/analyze', body, port=port,
+                          content_type='application/json')
+                    for _ in range(6)]
+        outside = fetch('POST', '/analyze', b'{"path": "../README.md"}',
+                        port=port, content_type='application/json')
+        return await asyncio.gather(outside, *requests)
+
+    outside, *responses = run_service(scenario, workers=1, max_pending=2,
+                                      root=root)
+    assert outside[0] == 403
+    statuses = sorted(status for status, _ in responses)
+    assert statuses.count(200) >= 2
+    assert 503 in statuses
+    assert all(payload['num_beats'] == 35
+               for status, payload in responses if status == 200)
@@ -0,0 +1,62 @@
+def test_stats_match_numpy():
+    import numpy as np
+    from signal_quality import mean_energy, signal_stats
+
+    rng = np.random.default_rng(3)
+    time = np.cumsum(rng.uniform(0.9, 1.1, 10001))
+    voltage = 1e3 + rng.normal(size=time.size)
+    stats = signal_stats(time, voltage, chunk_size=777)
+
+    assert stats['num_samples'] == time.size
+    assert stats['voltage_min'] == np.amin(voltage)
+    assert stats['voltage_max'] == np.amax(voltage)
+    assert np.isclose(stats['voltage_mean'], np.mean(voltage))
+    energy = np.sum((voltage - np.mean(voltage))**2)
+    assert np.isclose(stats['voltage_energy'], energy)
+    assert np.isclose(mean_energy(voltage, chunk_size=777)[1], energy)
+    dt = np.diff(time)
+    assert np.isclose(stats['sample_interval'], np.mean(dt))
+    assert np.isclose(stats['interval_jitter'], np.std(dt)/np.mean(dt))
+    assert stats['gaps'] == stats['non_increasing'] == stats['non_finite'] \
+        == 0
+
+
+def test_problems_are_found():
+    import numpy as np
+    from signal_quality import assess, signal_stats
+
+    time = np.arange(5000, dtype=float)
+    time[2000:] += 10
+    time[3000] = time[2999]
+    voltage = np.sin(time/10)
+    voltage[100:120] = 2
+    voltage[4000] = np.nan
+    stats = signal_stats(time, voltage, chunk_size=512)
+
+    assert stats['non_finite'] == 1
+    assert stats['at_max'] == 20
+    assert stats['gaps'] == 1
+    assert stats['non_increasing'] == 1
+    usable, problems = assess(stats)
+    assert not usable
+    assert len(problems) == 4
+
+    usable, problems = assess(signal_stats(time, np.nan_to_num(voltage)))
+    assert usable
+    assert not assess(signal_stats(time, np.zeros(time.size)))[0]
+
+
+def test_ecg_quality():
+    import numpy as np
+    from heart_rate import ECG
+
+    ecg = ECG(filename='test_data1.csv')
+    assert ecg.quality['usable']
+    assert ecg.voltage_extremes == (np.amin(ecg.voltage),
+                                    np.amax(ecg.voltage))
+
+    voltage = ecg.voltage.copy()
+    voltage[10] = np.nan
+    broken = ECG.from_arrays(ecg.time, voltage)
+    assert not broken.quality['usable']
+    assert np.array_equal(broken.beats, ecg.time[:1])
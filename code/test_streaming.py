@@ -0,0 +1,97 @@
+# recordings where the detectors disagree, with the reason. ECG reads its
+# beats off the lags of one autocorrelation, a grid of a single period
+# starting at the first sample, while the detector picks R peaks
+KNOWN_DIFFERENT = {
+    7: 'ECG locks onto a third of the 1 s period, 83 beats for 31 R peaks',
+    24: 'ECG loses the beats from 3 to 6.5 s, 69 beats for 79 R peaks',
+    30: 'test_data24 with rows dropped',
+    25: 'irregular rhythm, RR intervals of 0.4 to 2 s fit no single period',
+    26: 'irregular rhythm, RR intervals of 0.8 to 1.4 s fit no single period',
+}
+
+
+def _stream_beats(ecg):
+    import numpy as np
+    from streaming import StreamingBeatDetector
+
+    detector = StreamingBeatDetector()
+    chunks = ((ecg.time[i:i + 500], ecg.voltage[i:i + 500])
+              for i in range(0, ecg.time.size, 500))
+    beats = np.array(list(detector.process(chunks)))
+    assert detector.num_beats == beats.size
+    assert np.all(np.diff(beats) > 0)
+    return beats
+
+
+def _distance(times, reference):
+    import numpy as np
+
+    j = np.clip(np.searchsorted(reference, times), 1, reference.size - 1)
+    return np.minimum(np.abs(times - reference[j - 1]),
+                      np.abs(times - reference[j]))
+
+
+def test_streaming_matches_ecg():
+    import numpy as np
+    from heart_rate import ECG
+
+    for number in range(1, 33):
+        if number in KNOWN_DIFFERENT:
+            continue
+        ecg = ECG(filename='test_data%d.csv' % number)
+        beats = _stream_beats(ecg)
+        # ECG also counts the first sample as a beat
+        assert abs(beats.size - ecg.num_beats) <= max(1, 0.08*ecg.num_beats)
+
+        # shift the beats by their mean phase after the ECG beats, after
+        # which most lie within a quarter period of an ECG beat. ECG keeps
+        # a fixed period, so the rest drift with the heart rate variability
+        period = np.median(np.diff(ecg.beats))
+        before = ecg.beats[np.searchsorted(ecg.beats, beats, 'right') - 1]
+        phase = np.angle(np.mean(np.exp(2j*np.pi*(beats - before)/period)))
+        shifted = beats - phase/(2*np.pi)*period
+        near = _distance(shifted, ecg.beats) < 0.25*period
+        assert np.mean(near) >= 0.75, number
+
+
+def test_streaming_known_different():
+    import numpy as np
+    from baseline import remove_baseline
+    from detect_peaks import detect_peaks
+    from heart_rate import ECG
+
+    for number in KNOWN_DIFFERENT:
+        ecg = ECG(filename='test_data%d.csv' % number)
+        beats = _stream_beats(ecg)
+        # R peaks of the whole recording as reference
+        voltage = remove_baseline(ecg.time, ecg.voltage, 'median')
+        interval = np.median(np.diff(ecg.time))
+        r_peaks = ecg.time[detect_peaks(voltage, mph=0.5*voltage.max(),
+                                        mpd=0.3/interval)]
+        on_peak = _distance(beats, r_peaks) < 0.05
+        if number in (25, 26):
+            assert np.mean(on_peak) >= 0.7, number
+        else:
+            assert abs(beats.size - r_peaks.size) <= 0.1*r_peaks.size
+            assert np.mean(on_peak) >= 0.9, number
+
+
+def test_streaming_chunk_size():
+    import numpy as np
+    from heart_rate import ECG
+    from streaming import StreamingBeatDetector
+
+    ecg = ECG(filename='test_data16.csv')
+    sample_wise = StreamingBeatDetector(buffer_size=4096)
+    beats = []
+    for t, v in zip(ecg.time, ecg.voltage):
+        beats.extend(sample_wise.push(t, v))
+    beats.extend(sample_wise.flush())
+
+    chunked = StreamingBeatDetector(buffer_size=4096)
+    chunks = ((ecg.time[i:i + 1000], ecg.voltage[i:i + 1000])
+              for i in range(0, ecg.time.size, 1000))
+    reference = list(chunked.process(chunks))
+
+    assert sample_wise._time.size == 4096
+    assert abs(len(beats) - len(reference)) <= 1
@@ -0,0 +1,60 @@
+def test_default_point_matches_ecg():
+    import glob
+    import os
+    import numpy as np
+    from heart_rate import ECG
+    from sweep import sweep
+    csv_loc = os.path.join(os.path.dirname(__file__), '../test_data/*.csv')
+    paths = sorted(glob.glob(csv_loc))[:6]
+
+    rows = sweep(paths, workers=1, keep_beats=True)
+
+    assert len(rows) == len(paths)
+    for path, row in zip(paths, rows):
+        ecg = ECG(filename=os.path.abspath(path))
+        assert row['error'] is None
+        assert np.array_equal(row['beats'], ecg.beats)
+        assert row['num_beats'] == ecg.num_beats
+        assert row['mean_hr_bpm'] == ecg.mean_hr_bpm
+
+
+def test_grid_parallel_matches_separate():
+    from sweep import parameter_grid, sweep, sweep_recording
+
+    points = parameter_grid(degree=(5, 7), mpd=(3, 8), min_rate=(0.2, 0.3))
+    assert len(points) == 8
+    assert points[0] == {'degree': 5, 'mpd': 3, 'mph': 0, 'min_rate': 0.2}
+    paths = ['test_data1.csv', 'no_such_file.csv', 'test_data12.csv']
+
+    rows = sweep(paths, points, workers=2)
+
+    assert len(rows) == len(paths)*len(points)
+    separate = [row for path in paths for point in points
+                for row in sweep_recording(path, [point])]
+    assert rows == separate
+    assert all('FileNotFoundError' in row['error']
+               for row in rows[len(points):2*len(points)])
+    assert rows[0]['filename'] == 'test_data1.csv'
+    assert rows[0]['num_beats'] > 0
+
+
+def test_ecg_options_match_ecg():
+    import numpy as np
+    import pytest
+    from heart_rate import ECG
+    from sweep import parameter_grid, sweep
+
+    for path, ecg_args in [('test_data7.csv', {'baseline': 'median'}),
+                           ('test_data1.csv', {'resample_rate': 100}),
+                           ('test_data2.csv', {'low_memory': True})]:
+        row, = sweep(path, workers=1, keep_beats=True, **ecg_args)
+        ecg = ECG(filename=path, **ecg_args)
+        assert row['error'] is None
+        assert np.array_equal(row['beats'], ecg.beats)
+        assert row['mean_hr_bpm'] == ecg.mean_hr_bpm
+
+    with pytest.raises(ValueError):
+        sweep('test_data1.csv', workers=1, segment=20)
+    with pytest.raises(ValueError):
+        sweep('test_data1.csv', parameter_grid(degree=(5, 7)),
+              baseline='median')
@@ -0,0 +1,57 @@
+def test_cache_round_trip(tmp_path):
+    import os
+    import shutil
+    import numpy as np
+    from ecg_io import read_csv
+    from trace_cache import load_trace, invalidate, default_cache_dir
+
+    csv_file = str(tmp_path / 'trace.csv')
+    shutil.copy(os.path.join(os.path.dirname(__file__),
+                             '../test_data/test_data30.csv'), csv_file)
+    expected = read_csv(csv_file)
+
+    first = load_trace(csv_file)
+    second = load_trace(csv_file)
+    assert not isinstance(first[0], np.memmap)
+    assert isinstance(second[0], np.memmap)
+    for result in [first, second]:
+        assert np.array_equal(result[0], expected[0])
+        assert np.array_equal(result[1], expected[1])
+        assert result[2] == expected[2]
+
+    assert len(os.listdir(default_cache_dir(csv_file))) == 2
+    assert invalidate(csv_file) == 1
+    assert os.listdir(default_cache_dir(csv_file)) == []
+
+
+def test_cache_prune(tmp_path):
+    import os
+    import shutil
+    from trace_cache import load_trace, prune, default_cache_dir
+
+    csv_file = str(tmp_path / 'trace.csv')
+    shutil.copy(os.path.join(os.path.dirname(__file__),
+                             '../test_data/test_data1.csv'), csv_file)
+    load_trace(csv_file)
+    cache_dir = default_cache_dir(csv_file)
+    assert prune(cache_dir) == 0
+    assert prune(cache_dir, max_age=-1) == 1
+
+    load_trace(csv_file)
+    with open(csv_file, 'a') as fp:
+        fp.write('27.778,0.72\n')
+    os.utime(csv_file, ns=(0, 0))
+    assert prune(cache_dir) == 1
+
+
+def test_ecg_uses_cache(tmp_path):
+    import numpy as np
+    from heart_rate import ECG
+
+    plain = ECG(filename='test_data8.csv')
+    cached = ECG(filename='test_data8.csv', cache=str(tmp_path))
+    reopened = ECG(filename='test_data8.csv', cache=str(tmp_path))
+
+    assert isinstance(reopened.voltage, np.memmap)
+    assert np.array_equal(reopened.voltage, plain.voltage)
+    assert cached.num_beats == reopened.num_beats == plain.num_beats
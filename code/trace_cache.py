@@ -0,0 +1,150 @@
+"""On-disk binary cache of imported ECG traces.
+
+The first import of a CSV writes its validated columns to a .npy sidecar
+file, keyed by the absolute path, modification time and size of the CSV.
+Later imports memory-map that file instead of parsing the text again.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+from ecg_io import read_csv
+
+CACHE_DIR_NAME = '.trace_cache'
+
+
+def default_cache_dir(path):
+    '''Cache folder used for a CSV, next to the file itself
+
+    :param path (str): CSV file
+    :return cache_dir (str): the '.trace_cache' folder beside the CSV
+    '''
+    return os.path.join(os.path.dirname(os.path.abspath(path)),
+                        CACHE_DIR_NAME)
+
+
+def cache_key(path, dtype=np.float64):
+    '''Key of the cache entry of a CSV in its current state
+
+    :param path (str): CSV file
+    :param dtype (numpy dtype, default=float64): stored sample type
+    :return key (str): hash of the absolute path, modification time, size
+        and dtype. Editing the file changes the key
+    '''
+    stat = os.stat(path)
+    identity = '%s|%d|%d|%s' % (os.path.abspath(path), stat.st_mtime_ns,
+                                stat.st_size, np.dtype(dtype).name)
+    return hashlib.sha1(identity.encode()).hexdigest()[:20]
+
+
+def load_trace(path, cache_dir=None, dtype=np.float64):
+    '''Imports a CSV through the cache
+
+    :param path (str): CSV file
+    :param cache_dir (str, default=None): cache folder, by default
+        default_cache_dir(path)
+    :param dtype (numpy dtype, default=float64): type the samples are
+        stored and returned as
+    :return time (numpy array): sampled times, read-only memory map when
+        the cache was hit
+    :return voltage (numpy array): sampled voltages, as time
+    :return dropped (dict): rows dropped on the original import, see
+        ecg_io.read_csv
+    '''
+    if cache_dir is None:
+        cache_dir = default_cache_dir(path)
+    key = cache_key(path, dtype)
+    data_file = os.path.join(cache_dir, key + '.npy')
+    meta_file = os.path.join(cache_dir, key + '.json')
+
+    if os.path.isfile(meta_file):
+        with open(meta_file, 'r') as fp:
+            meta = json.load(fp)
+        trace = np.load(data_file, mmap_mode='r')
+        os.utime(meta_file)  # marks the entry as recently used for prune
+        return trace[0], trace[1], meta['dropped']
+
+    time_vec, voltage_vec, dropped = read_csv(path)
+    trace = np.empty((2, time_vec.size), dtype=dtype)
+    trace[0] = time_vec
+    trace[1] = voltage_vec
+
+    os.makedirs(cache_dir, exist_ok=True)
+    stat = os.stat(path)
+    meta = {'source': os.path.abspath(path),
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'dtype': np.dtype(dtype).name,
+            'dropped': dropped}
+    # the metadata is written last, so an entry is only used once complete
+    _write_atomic(data_file, lambda fp: np.save(fp, trace))
+    _write_atomic(meta_file, lambda fp: fp.write(json.dumps(meta).encode()))
+    return trace[0], trace[1], dropped
+
+
+def invalidate(path, cache_dir=None):
+    '''Removes every cache entry of a CSV, whatever its version
+
+    :param path (str): CSV file
+    :param cache_dir (str, default=None): cache folder, by default
+        default_cache_dir(path)
+    :return removed (int): number of entries removed
+    '''
+    if cache_dir is None:
+        cache_dir = default_cache_dir(path)
+    source = os.path.abspath(path)
+    return _remove_where(cache_dir, lambda meta, age: meta['source'] == source)
+
+
+def prune(cache_dir, max_age=None):
+    '''Removes the stale entries of a cache folder
+
+    :param cache_dir (str): cache folder
+    :param max_age (float, default=None): also remove entries not used for
+        this many seconds
+    :return removed (int): number of entries removed. Entries are stale
+        when their CSV was deleted or changed since they were written
+    '''
+    def stale(meta, age):
+        try:
+            stat = os.stat(meta['source'])
+        except OSError:
+            return True
+        if (stat.st_mtime_ns, stat.st_size) != (meta['mtime_ns'],
+                                                meta['size']):
+            return True
+        return max_age is not None and age > max_age
+
+    return _remove_where(cache_dir, stale)
+
+
+def _remove_where(cache_dir, condition):
+    if not os.path.isdir(cache_dir):
+        return 0
+    removed = 0
+    now = time.time()
+    for name in os.listdir(cache_dir):
+        if not name.endswith('.json'):
+            continue
+        meta_file = os.path.join(cache_dir, name)
+        data_file = meta_file[:-len('.json')] + '.npy'
+        with open(meta_file, 'r') as fp:
+            meta = json.load(fp)
+        age = now - os.stat(meta_file).st_mtime
+        if condition(meta, age):
+            for entry in [meta_file, data_file]:
+                if os.path.exists(entry):
+                    os.remove(entry)
+            removed += 1
+    return removed
+
+
+def _write_atomic(filename, write):
+    temp_file = '%s.%d.tmp' % (filename, os.getpid())
+    with open(temp_file, 'wb') as fp:
+        write(fp)
+    os.replace(temp_file, filename)